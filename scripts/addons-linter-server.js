@@ -0,0 +1,59 @@
+// vim:se ft=javascript sts=2 sw=2 et:
+//
+// Validate add-ons with the addons-linter without starting node for each of
+// them, see `olympia.devhub.linter`.
+//
+//   node addons-linter-server.js /path/to/node_modules/addons-linter
+//
+// Reads one JSON request per line on stdin:
+//
+//   {"path": "/path/to/addon.xpi", "selfHosted": false}
+//
+// and writes one JSON response per line on stdout, in the same order:
+//
+//   {"output": <the linter results>} or {"error": "<message>"}
+"use strict";
+
+const readline = require("readline");
+
+const linter = require(process.argv[2] || "addons-linter");
+
+// stdout only carries the responses, anything the linter logs goes to
+// stderr.
+const respond = process.stdout.write.bind(process.stdout);
+console.log = console.info = console.warn = console.error;
+
+function lint(line) {
+  let request;
+  try {
+    request = JSON.parse(line);
+  } catch (e) {
+    return Promise.resolve({error: "Invalid request: " + e.message});
+  }
+
+  let instance = linter.createInstance({
+    config: {
+      _: [request.path],
+      boring: true,
+      logLevel: "fatal",
+      metadata: false,
+      output: "none",
+      pretty: false,
+      selfHosted: Boolean(request.selfHosted),
+      stack: false,
+      warningsAsErrors: false,
+    },
+    runAsBinary: false,
+  });
+  return instance.run().then(
+    output => ({output: output}),
+    error => ({error: String((error && error.stack) || error)}));
+}
+
+// Requests are handled one at a time, so that responses come in order.
+let queue = Promise.resolve();
+readline.createInterface({input: process.stdin}).on("line", line => {
+  queue = queue
+    .then(() => lint(line))
+    .then(response => respond(JSON.stringify(response) + "\n"));
+});
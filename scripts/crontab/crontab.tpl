@@ -12,6 +12,7 @@ HOME=/tmp
 25 * * * * %(z_cron)s update_collections_votes
 45 * * * * %(z_cron)s update_addon_appsupport
 50 * * * * %(z_cron)s cleanup_extracted_file
+52 * * * * %(z_cron)s cleanup_validation_cache
 55 * * * * %(z_cron)s unhide_disabled_files
 
 
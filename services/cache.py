@@ -0,0 +1,113 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from time import time
+
+import memcache
+
+from django.utils.encoding import force_bytes
+
+from services.utils import settings
+
+
+class LRUBackend(object):
+    """A bounded, per-process least recently used cache."""
+
+    def __init__(self, size):
+        self.size = size
+        self.data = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            try:
+                expires, value = self.data.pop(key)
+            except KeyError:
+                return None
+            if expires < time():
+                return None
+            # Re-insert to mark the key as the most recently used one.
+            self.data[key] = (expires, value)
+            return value
+
+    def set(self, key, value, timeout):
+        with self.lock:
+            self.data.pop(key, None)
+            self.data[key] = (time() + timeout, value)
+            while len(self.data) > self.size:
+                self.data.popitem(last=False)
+
+
+class MemcachedBackend(object):
+    """A cache shared between workers, using the site's memcached servers."""
+
+    def __init__(self, servers=None):
+        if servers is None:
+            servers = settings.CACHES['default']['LOCATION']
+        if isinstance(servers, basestring):
+            servers = servers.split(';')
+        self.client = memcache.Client(servers)
+
+    def get(self, key):
+        return self.client.get(key)
+
+    def set(self, key, value, timeout):
+        self.client.set(key, value, timeout)
+
+    def get_generation(self, key):
+        # The generation is written by the Django cache, which prefixes and
+        # versions keys with `default_key_func`.
+        key = '%s:%s:%s' % (
+            settings.CACHES['default'].get('KEY_PREFIX', ''), 1, key)
+        return self.client.get(key) or 0
+
+
+class ResponseCache(object):
+    """
+    A tiered response cache for services endpoints.
+
+    Lookups go through `backends` in order and results found in a later
+    backend are copied into the earlier ones. Every key embeds a generation
+    counter, read from `generation_backend` at most every `generation_ttl`
+    seconds, so bumping the counter on the Django side invalidates every
+    cached response at once.
+    """
+
+    def __init__(self, prefix, generation_key, backends, generation_backend,
+                 timeout=60 * 60, generation_ttl=10):
+        self.prefix = prefix
+        self.generation_key = generation_key
+        self.backends = backends
+        self.generation_backend = generation_backend
+        self.timeout = timeout
+        self.generation_ttl = generation_ttl
+        self._generation = (0, None)
+
+    def get_generation(self):
+        checked, generation = self._generation
+        now = time()
+        if generation is None or now - checked > self.generation_ttl:
+            generation = self.generation_backend.get_generation(
+                self.generation_key)
+            self._generation = (now, generation)
+        return generation
+
+    def make_key(self, *parts):
+        key = ':'.join(force_bytes(part) for part in
+                       [self.prefix, self.get_generation()] + list(parts))
+        # Use md5 to make sure the memcached key is clean.
+        return '%s:%s' % (self.prefix,
+                          hashlib.md5(force_bytes(key)).hexdigest())
+
+    def get(self, key):
+        for i, backend in enumerate(self.backends):
+            value = backend.get(key)
+            if value is not None:
+                for earlier in self.backends[:i]:
+                    earlier.set(key, value, self.timeout)
+                return value
+        return None
+
+    def set(self, key, value):
+        for backend in self.backends:
+            backend.set(key, value, self.timeout)
@@ -1,6 +1,4 @@
-from collections import defaultdict
 from email.Utils import formatdate
-import re
 from string import Template
 import sys
 from time import time
@@ -45,65 +43,88 @@ xml_template = """\
 </RDF:RDF>
 """
 
-quicktime_re = re.compile(r'^image/(pict|png|tiff|x-(macpaint|pict|png|quicktime|sgi|targa|tiff))$')
-java_re = re.compile(r'^application/x-java-.*$')
+# The plugins we know where to get, by the mimetypes they handle.
+FLASH = dict(name='Adobe Flash Player',
+             manualInstallationURL='https://get.adobe.com/flashplayer/')
+SHOCKWAVE = dict(name='Adobe Shockwave Player',
+                 manualInstallationURL='https://get.adobe.com/shockwave/')
+# We don't have a plugin that can handle any of those mimetypes, but the
+# Apple Quicktime plugin can. Point the user to the Quicktime download page.
+QUICKTIME = dict(
+    name='Apple Quicktime',
+    manualInstallationURL='https://www.apple.com/quicktime/download/')
+# We don't want to link users directly to the Java plugin because we want to
+# warn them about ongoing security problems first. Link to SUMO.
+JAVA = dict(
+    name='Java Runtime Environment',
+    manualInstallationURL='https://support.mozilla.org/kb/use-java-plugin-to-view-interactive-content')
+UNKNOWN = dict(name='-1', manualInstallationURL='')
+
+PLUGINS = {
+    'application/x-shockwave-flash': FLASH,
+    'application/futuresplash': FLASH,
+    'application/x-director': SHOCKWAVE,
+}
+QUICKTIME_MIMETYPES = [
+    'image/pict', 'image/png', 'image/tiff', 'image/x-macpaint',
+    'image/x-pict', 'image/x-png', 'image/x-quicktime', 'image/x-sgi',
+    'image/x-targa', 'image/x-tiff']
+JAVA_PREFIX = 'application/x-java-'
+
+REQUIRED = ['mimetype', 'appID', 'appVersion', 'clientOS', 'chromeLocale']
+
+
+def compile_plugin(plugin):
+    """Split the response for `plugin` around the requested mimetype, which
+    is the only part that varies."""
+    # Nothing else in the template looks like this.
+    marker = '\0mimetype\0'
+    return Template(xml_template).substitute(
+        plugin, mimetype=marker).split(marker)
+
+
+FRAGMENTS = dict((plugin['name'], compile_plugin(plugin))
+                 for plugin in (FLASH, SHOCKWAVE, QUICKTIME, JAVA, UNKNOWN))
+
+
+def render(plugin, mimetype):
+    return unicode(mimetype).join(FRAGMENTS[plugin['name']])
+
+
+# The whole responses for the mimetypes we know, rendered once.
+RESPONSES = dict((mimetype, render(plugin, mimetype))
+                 for mimetype, plugin in PLUGINS.items())
+RESPONSES.update((mimetype, render(QUICKTIME, mimetype))
+                 for mimetype in QUICKTIME_MIMETYPES)
+
+
+def find_plugin(mimetype):
+    """The plugin for a mimetype that isn't in RESPONSES as is."""
+    # Like the `$` of a regexp, QuickTime and Java mimetypes can have one
+    # trailing newline.
+    if mimetype.endswith('\n'):
+        mimetype = mimetype[:-1]
+    if mimetype in QUICKTIME_MIMETYPES:
+        return QUICKTIME
+    if mimetype.startswith(JAVA_PREFIX) and '\n' not in mimetype:
+        return JAVA
+    return UNKNOWN
 
-def get_output(data):
-    g = defaultdict(str, [(k, jinja2.escape(v)) for k, v in data.iteritems()])
-
-    required = ['mimetype', 'appID', 'appVersion', 'clientOS', 'chromeLocale']
-
-    # Some defaults we override depending on what we find below.
-    plugin = dict(mimetype='-1', name='-1',
-                  manualInstallationURL='')
-
-    # Special case for mimetype if they are provided.
-    plugin['mimetype'] = g['mimetype'] or '-1'
 
-    output = Template(xml_template)
+def get_output(data):
+    mimetype = jinja2.escape(data.get('mimetype', '')) or '-1'
 
-    for s in required:
+    for s in REQUIRED:
         if s not in data:
             # A sort of 404, matching what was returned in the original PHP.
-            return output.substitute(plugin)
-
-    # Figure out what plugins we've got, and what plugins we know where
-    # to get.
-
-    # Begin our huge and embarrassing if-else statement.
-    if g['mimetype'] in ['application/x-shockwave-flash',
-                         'application/futuresplash']:
-        # Tell the user where they can go to get the installer.
-
-        plugin.update(
-            name='Adobe Flash Player',
-            manualInstallationURL='https://get.adobe.com/flashplayer/')
-
-    elif g['mimetype'] == 'application/x-director':
-        plugin.update(
-            name='Adobe Shockwave Player',
-            manualInstallationURL='https://get.adobe.com/shockwave/')
-    elif quicktime_re.match(g['mimetype']):
-        # Well, we don't have a plugin that can handle any of those
-        # mimetypes, but the Apple Quicktime plugin can. Point the user to
-        # the Quicktime download page.
-
-        plugin.update(
-            name='Apple Quicktime',
-            InstallerShowsUI='true',
-            manualInstallationURL='https://www.apple.com/quicktime/download/')
-
-    elif java_re.match(g['mimetype']):
-        # We don't want to link users directly to the Java plugin because
-        # we want to warn them about ongoing security problems first. Link
-        # to SUMO.
-
-        plugin.update(
-            name='Java Runtime Environment',
-            manualInstallationURL='https://support.mozilla.org/kb/use-java-plugin-to-view-interactive-content')
-
-    # End ridiculously huge and embarrassing if-else block.
-    return output.substitute(plugin)
+            return render(UNKNOWN, mimetype)
+
+    # Only the mimetype tells which plugin we know where to get.
+    output = RESPONSES.get(mimetype)
+    if output is None:
+        output = render(find_plugin(mimetype), mimetype)
+    return output
+
 
 def format_date(secs):
     return '%s GMT' % formatdate(time() + secs)[:25]
@@ -8,6 +8,7 @@ from wsgiref.handlers import format_date_time
 
 from olympia.constants import base
 
+from services.cache import LRUBackend, MemcachedBackend, ResponseCache
 from services.utils import log_configure, log_exception, mypool
 from services.utils import settings, user_media_path, user_media_url
 
@@ -18,9 +19,50 @@ log_configure()
 from django_statsd.clients import statsd
 
 
+_theme_update_cache = None
+_icon_store = None
+
+
+def get_theme_update_cache():
+    """
+    Return this process' response cache for theme update checks, or None if
+    it is disabled by `SERVICES_THEME_UPDATE_CACHE`.
+
+    The JSON bodies are kept in a local LRU in front of memcached and keyed
+    on the `theme_update:generation` counter bumped by
+    `olympia.addons.models.clear_theme_update_cache`.
+    """
+    global _theme_update_cache
+    if not settings.SERVICES_THEME_UPDATE_CACHE:
+        return None
+    if _theme_update_cache is None:
+        memcached = MemcachedBackend()
+        _theme_update_cache = ResponseCache(
+            'theme_update', 'theme_update:generation',
+            [LRUBackend(settings.SERVICES_THEME_UPDATE_CACHE_SIZE), memcached],
+            memcached, timeout=settings.SERVICES_THEME_UPDATE_CACHE_TIMEOUT,
+            generation_ttl=(
+                settings.SERVICES_THEME_UPDATE_CACHE_GENERATION_TTL))
+    return _theme_update_cache
+
+
+def get_icon_store():
+    """
+    Return this process' store of base64 encoded theme icons, keyed on the
+    icon path and the theme's `modified`, or None if the theme update cache
+    is disabled.
+    """
+    global _icon_store
+    if not settings.SERVICES_THEME_UPDATE_CACHE:
+        return None
+    if _icon_store is None:
+        _icon_store = LRUBackend(settings.SERVICES_THEME_ICON_STORE_SIZE)
+    return _icon_store
+
+
 class ThemeUpdate(object):
 
-    def __init__(self, locale, id_, qs=None):
+    def __init__(self, locale, id_, qs=None, cache=None, icons=None):
         self.conn, self.cursor = None, None
         self.from_gp = qs == 'src=gp'
         self.data = {
@@ -32,12 +74,25 @@ class ThemeUpdate(object):
             'atype': base.ADDON_PERSONA,
             'row': {}
         }
-        if not self.cursor:
-            self.conn = mypool.connect()
-            self.cursor = self.conn.cursor()
+        # An optional ResponseCache, see get_theme_update_cache().
+        self.cache = cache
+        # An optional LRUBackend, see get_icon_store().
+        self.icons = icons
 
     def base64_icon(self, addon_id):
         path = self.image_path('icon.jpg')
+        if self.icons is not None:
+            # The icon can only change along with the theme's `modified`.
+            key = '%s:%s' % (path, self.data['row']['modified'])
+            icon = self.icons.get(key)
+            if icon is None:
+                icon = self.read_base64_icon(path)
+                self.icons.set(key, icon,
+                               settings.SERVICES_THEME_UPDATE_CACHE_TIMEOUT)
+            return icon
+        return self.read_base64_icon(path)
+
+    def read_base64_icon(self, path):
         if not os.path.isfile(path):
             return ''
 
@@ -74,13 +129,20 @@ class ThemeUpdate(object):
 
         """
 
+        if not self.cursor:
+            self.conn = mypool.connect()
+            self.cursor = self.conn.cursor()
+
+        # The `en-US` name and description are fetched along, as a fallback.
         sql = """
         SELECT p.persona_id, a.id, a.slug, v.version,
             t_name.localized_string AS name,
             t_desc.localized_string AS description,
             p.display_username, p.header,
             p.footer, p.accentcolor, p.textcolor,
-            UNIX_TIMESTAMP(a.modified) AS modified
+            UNIX_TIMESTAMP(a.modified) AS modified,
+            t_en_name.localized_string AS en_name,
+            t_en_desc.localized_string AS en_description
         FROM addons AS a
         LEFT JOIN personas AS p ON p.addon_id=a.id
         LEFT JOIN versions AS v ON a.current_version=v.id
@@ -88,6 +150,10 @@ class ThemeUpdate(object):
             ON t_name.id=a.name AND t_name.locale=%(locale)s
         LEFT JOIN translations AS t_desc
             ON t_desc.id=a.summary AND t_desc.locale=%(locale)s
+        LEFT JOIN translations AS t_en_name
+            ON t_en_name.id=a.name AND t_en_name.locale='en-US'
+        LEFT JOIN translations AS t_en_desc
+            ON t_en_desc.id=a.summary AND t_en_desc.locale='en-US'
         WHERE p.{primary_key}=%(id)s AND
             a.addontype_id=%(atype)s AND a.status=4 AND a.inactive=0
         """.format(primary_key=self.data['primary_key'])
@@ -98,27 +164,42 @@ class ThemeUpdate(object):
         row_to_dict = lambda row: dict(zip((
             'persona_id', 'addon_id', 'slug', 'current_version', 'name',
             'description', 'username', 'header', 'footer', 'accentcolor',
-            'textcolor', 'modified'),
+            'textcolor', 'modified', 'en_name', 'en_description'),
             list(row)))
 
         if row:
-            self.data['row'] = row_to_dict(row)
+            self.data['row'] = row = row_to_dict(row)
 
             # Fall back to `en-US` if the name was null for our locale.
-            # TODO: Write smarter SQL and don't rerun the whole query.
-            if not self.data['row']['name']:
+            if not row['name']:
                 self.data['locale'] = 'en-US'
-                self.cursor.execute(sql, self.data)
-                row = self.cursor.fetchone()
-                if row:
-                    self.data['row'] = row_to_dict(row)
+                row['name'] = row['en_name']
+                row['description'] = row['en_description']
 
             return True
 
         return False
 
-    # TODO: Cache on row['modified']
+    def get_cache_key(self):
+        return self.cache.make_key(self.data['primary_key'], self.data['id'],
+                                   self.data['locale'])
+
     def get_json(self):
+        if self.cache is not None:
+            # A theme that isn't found is cached too, as an empty body.
+            key = self.get_cache_key()
+            output = self.cache.get(key)
+            if output is not None:
+                statsd.incr('services.theme_update.cache.hit')
+                return output or None
+            statsd.incr('services.theme_update.cache.miss')
+
+        output = self.get_uncached_json()
+        if self.cache is not None:
+            self.cache.set(key, output or '')
+        return output
+
+    def get_uncached_json(self):
         if not self.get_update():
             # Persona not found.
             return
@@ -215,7 +296,9 @@ def application(environ, start_response):
             return ['']
 
         try:
-            update = ThemeUpdate(locale, id_, environ.get('QUERY_STRING'))
+            update = ThemeUpdate(locale, id_, environ.get('QUERY_STRING'),
+                                 cache=get_theme_update_cache(),
+                                 icons=get_icon_store())
             output = update.get_json()
             if not output:
                 start_response('404 Not Found', [])
@@ -2,12 +2,16 @@ import smtplib
 import sys
 import traceback
 
+from bisect import bisect_right
+from collections import namedtuple
+
 from django.utils.encoding import force_bytes
 from email.Utils import formatdate
 from email.mime.text import MIMEText
 from time import time
 from urlparse import parse_qsl
 
+from services.cache import LRUBackend, MemcachedBackend, ResponseCache
 from services.utils import mypool, settings
 
 # This has to be imported after the settings so statsd knows where to log to.
@@ -17,19 +21,18 @@ import commonware.log
 import MySQLdb as mysql
 import sqlalchemy.pool as pool
 
-try:
-    from compare import version_int
-except ImportError:
-    from olympia.versions.compare import version_int
-
 from olympia.constants import applications, base
+from olympia.constants.platforms import PLATFORM_ALL
 
 from utils import (
-    APP_GUIDS, get_cdn_url, log_configure, PLATFORMS)
+    APP_GUIDS, get_cdn_url, log_configure, PLATFORMS, version_int)
 
 # Go configure the log.
 log_configure()
 
+# Fields an update request must have to get anything but bad_rdf.
+REQUIRED = ('reqVersion', 'id', 'appID', 'appVersion')
+
 good_rdf = """<?xml version="1.0"?>
 <RDF:RDF xmlns:RDF="http://www.w3.org/1999/02/22-rdf-syntax-ns#"
          xmlns:em="http://www.mozilla.org/2004/em-rdf#">
@@ -79,26 +82,337 @@ timing_log = commonware.log.getLogger('z.timer')
 error_log = commonware.log.getLogger('z.services')
 
 
+# One row of the in-memory update index: a listed, non-deleted version file
+# together with the appversion range it declares for a given application.
+IndexEntry = namedtuple('IndexEntry', [
+    'version_id', 'min_int', 'max_int', 'min', 'max', 'file_id',
+    'file_status', 'hash', 'filename', 'datestatuschanged', 'strict_compat',
+    'binary_components', 'releasenotes', 'version'])
+
+# An incompatible_versions row, as used by the `normal` compat mode.
+IncompatibleEntry = namedtuple('IncompatibleEntry', [
+    'app_id', 'min', 'max', 'min_int', 'max_int'])
+
+
+def _ci(value):
+    """Normalize a string the way MySQL's utf8_general_ci compares it."""
+    return (value or u'').lower().rstrip(u' ')
+
+
+class UpdateIndex(object):
+    """
+    A compact, per-process copy of everything `Update` needs to answer an
+    update check without touching the database.
+
+    Versions are grouped per (addon id, app id, platform id) and sorted by the
+    `version_int` of their minimum appversion, so that a lookup only has to
+    bisect to the versions a client is new enough for and then pick the most
+    recent one that passes the compat mode filters.
+
+    The index is rebuilt whenever the watermark returned by `get_watermark()`
+    moves, checked at most every `SERVICES_UPDATE_INDEX_POLL` seconds, and
+    unconditionally every `SERVICES_UPDATE_INDEX_MAX_AGE` seconds.
+    """
+
+    def __init__(self):
+        # (addons, versions, current_files, incompatible), swapped as a whole
+        # so that concurrent requests never see a half built index.
+        self.tables = None
+        self.watermark = None
+        self.checked = 0
+        self.loaded = 0
+
+    def get_watermark(self, cursor):
+        cursor.execute("""
+            SELECT
+                (SELECT MAX(modified) FROM addons),
+                (SELECT MAX(modified) FROM versions),
+                (SELECT MAX(modified) FROM files),
+                (SELECT COUNT(*) FROM files),
+                (SELECT COUNT(*) FROM applications_versions),
+                (SELECT MAX(id) FROM applications_versions),
+                (SELECT MAX(modified) FROM incompatible_versions),
+                (SELECT COUNT(*) FROM incompatible_versions);""")
+        return tuple(cursor.fetchone())
+
+    def refresh(self):
+        """Reload the index if it is missing or stale."""
+        now = time()
+        if (self.tables is not None and
+                now - self.checked < settings.SERVICES_UPDATE_INDEX_POLL):
+            return
+        self.checked = now
+        conn = mypool.connect()
+        cursor = conn.cursor()
+        try:
+            watermark = self.get_watermark(cursor)
+            max_age = settings.SERVICES_UPDATE_INDEX_MAX_AGE
+            if (self.tables is None or watermark != self.watermark or
+                    now - self.loaded > max_age):
+                with statsd.timer('services.update.index.load'):
+                    self.load(cursor)
+                self.watermark = watermark
+        finally:
+            cursor.close()
+            conn.close()
+
+    def load(self, cursor):
+        params = {
+            'STATUS_DELETED': base.STATUS_DELETED,
+            'STATUS_DISABLED': base.STATUS_DISABLED,
+            'STATUS_PUBLIC': base.STATUS_PUBLIC,
+            'STATUS_BETA': base.STATUS_BETA,
+            'RELEASE_CHANNEL_LISTED': base.RELEASE_CHANNEL_LISTED,
+        }
+
+        # Same filters as `Update.is_valid()`.
+        cursor.execute("""
+            SELECT id, status, addontype_id, guid FROM addons
+            WHERE inactive = 0 AND
+                  status NOT IN (%(STATUS_DELETED)s, %(STATUS_DISABLED)s);""",
+                       params)
+        addons = {}
+        for row in cursor.fetchall():
+            addons[_ci(row[3])] = tuple(row)
+
+        # Every file `Update.get_update()` could possibly return, before the
+        # per-request filters are applied.
+        cursor.execute("""
+            SELECT
+                versions.addon_id, applications_versions.application_id,
+                files.platform_id, versions.id, appmin.version_int,
+                appmax.version_int, appmin.version, appmax.version, files.id,
+                files.status, files.hash, files.filename,
+                files.datestatuschanged, files.strict_compatibility,
+                files.binary_components, versions.releasenotes,
+                versions.version
+            FROM versions
+            INNER JOIN addons
+                ON addons.id = versions.addon_id AND addons.inactive = 0 AND
+                   addons.status NOT IN (%(STATUS_DELETED)s,
+                                         %(STATUS_DISABLED)s)
+            INNER JOIN applications_versions
+                ON applications_versions.version_id = versions.id
+            INNER JOIN appversions appmin
+                ON appmin.id = applications_versions.min AND
+                   appmin.application_id =
+                       applications_versions.application_id
+            INNER JOIN appversions appmax
+                ON appmax.id = applications_versions.max AND
+                   appmax.application_id =
+                       applications_versions.application_id
+            INNER JOIN files
+                ON files.version_id = versions.id
+            WHERE
+                versions.deleted = 0 AND
+                versions.channel = %(RELEASE_CHANNEL_LISTED)s AND
+                files.status IN (%(STATUS_PUBLIC)s, %(STATUS_BETA)s)
+            ORDER BY appmin.version_int, versions.id DESC, files.id;""",
+                       params)
+        versions = {}
+        for row in cursor.fetchall():
+            key, entry = tuple(row[:3]), IndexEntry(*row[3:])
+            if entry.min_int is None:
+                # Never matches `appmin.version_int <= %(version_int)s`.
+                continue
+            versions.setdefault(key, []).append(entry)
+        for key, entries in versions.items():
+            versions[key] = (tuple(e.min_int for e in entries),
+                             tuple(entries))
+
+        # The user's current version decides between the beta and the public
+        # update channel. Only versions having beta files need an entry, any
+        # other version string behaves as if it had no beta file.
+        cursor.execute("""
+            SELECT versions.addon_id, versions.version,
+                   SUM(IFNULL(files.status, -1) = %(STATUS_BETA)s),
+                   SUM(IFNULL(files.status, -1) != %(STATUS_BETA)s)
+            FROM versions
+            LEFT JOIN files ON files.version_id = versions.id
+            GROUP BY versions.addon_id, versions.version
+            HAVING SUM(IFNULL(files.status, -1) = %(STATUS_BETA)s) > 0;""",
+                       params)
+        current_files = {}
+        for addon_id, version, beta, other in cursor.fetchall():
+            key = (addon_id, _ci(version))
+            has_beta, has_other = current_files.get(key, (False, False))
+            current_files[key] = (has_beta or bool(beta),
+                                  has_other or bool(other))
+
+        cursor.execute("""
+            SELECT version_id, app_id, min_app_version, max_app_version,
+                   min_app_version_int, max_app_version_int
+            FROM incompatible_versions;""")
+        incompatible = {}
+        for row in cursor.fetchall():
+            incompatible.setdefault(row[0], []).append(
+                IncompatibleEntry(*row[1:]))
+
+        self.tables = (addons, versions, current_files, incompatible)
+        self.loaded = time()
+
+    def get_addon(self, guid):
+        """Return (id, status, type, guid) for a valid add-on, or None."""
+        return self.tables[0].get(_ci(guid))
+
+    def is_incompatible(self, version_id, app_id, version_int):
+        # This mirrors the `incompatible_versions` subquery in
+        # `Update.get_update()` exactly, including the fact that the
+        # `app_id` condition only applies to its first OR branch.
+        for row in self.tables[3].get(version_id, ()):
+            if (row.app_id == app_id and row.min == '0' and
+                    row.max_int is not None and row.max_int >= version_int):
+                return True
+            if (row.min_int is not None and row.min_int <= version_int and
+                    (row.max == '*' or (row.max_int is not None and
+                                        row.max_int >= version_int))):
+                return True
+        return False
+
+    def find(self, data, compat_mode):
+        """
+        Return the IndexEntry `Update.get_update()` would have found for
+        `data`, or None.
+        """
+        addons, versions, current_files, incompatible = self.tables
+        app_version_int = data['version_int']
+
+        has_beta, has_other = current_files.get(
+            (data['id'], _ci(data['version'])), (False, True))
+        allowed = set()
+        if has_beta and data['addon_status'] == base.STATUS_PUBLIC:
+            allowed.add(base.STATUS_BETA)
+        if has_other:
+            allowed.add(base.STATUS_PUBLIC)
+        if not allowed:
+            return None
+
+        d2c_max = applications.D2C_MAX_VERSIONS.get(data['app_id'])
+        d2c_max = version_int(d2c_max) if d2c_max else None
+
+        required_version = None
+        if data['guid'] == 'firefox-hotfix@mozilla.org':
+            required_version = get_hotfix_version(data)
+
+        platform_ids = [PLATFORM_ALL.id]
+        if data.get('appOS'):
+            platform_ids.append(data['appOS'])
+
+        found = None
+        for platform_id in platform_ids:
+            keys, entries = versions.get(
+                (data['id'], data['app_id'], platform_id), ((), ()))
+            for entry in entries[:bisect_right(keys, app_version_int)]:
+                if found and (entry.version_id, -entry.file_id) <= (
+                        found.version_id, -found.file_id):
+                    continue
+                if entry.file_status not in allowed:
+                    continue
+                if (required_version is not None and
+                        entry.version != required_version):
+                    continue
+                if compat_mode == 'ignore':
+                    pass
+                elif compat_mode == 'normal':
+                    if ((entry.strict_compat or entry.binary_components) and
+                            entry.max_int < app_version_int):
+                        continue
+                    if d2c_max and entry.max_int < d2c_max:
+                        continue
+                    if self.is_incompatible(
+                            entry.version_id, data['app_id'],
+                            app_version_int):
+                        continue
+                elif entry.max_int < app_version_int:
+                    continue
+                found = entry
+        return found
+
+
+_update_index = None
+
+
+def get_update_index():
+    """
+    Return this process' `UpdateIndex`, refreshed if needed, or None if the
+    index is disabled by `SERVICES_UPDATE_INDEX`.
+    """
+    global _update_index
+    if not settings.SERVICES_UPDATE_INDEX:
+        return None
+    if _update_index is None:
+        _update_index = UpdateIndex()
+    _update_index.refresh()
+    return _update_index
+
+
+_update_cache = None
+
+
+def get_update_cache():
+    """
+    Return this process' response cache for update checks, or None if it is
+    disabled by `SERVICES_UPDATE_CACHE`.
+
+    Responses are kept in a local LRU in front of memcached and keyed on the
+    `update:generation` counter bumped by
+    `olympia.addons.models.clear_update_cache`.
+    """
+    global _update_cache
+    if not settings.SERVICES_UPDATE_CACHE:
+        return None
+    if _update_cache is None:
+        memcached = MemcachedBackend()
+        _update_cache = ResponseCache(
+            'update', 'update:generation',
+            [LRUBackend(settings.SERVICES_UPDATE_CACHE_SIZE), memcached],
+            memcached, timeout=settings.SERVICES_UPDATE_CACHE_TIMEOUT,
+            generation_ttl=settings.SERVICES_UPDATE_CACHE_GENERATION_TTL)
+    return _update_cache
+
+
+def get_hotfix_version(data):
+    """
+    Special case for bug 1031516: the version of the hotfix add-on the client
+    must be offered, or None to offer the newest one as usual.
+    """
+    app_version = data['version_int']
+    hotfix_version = data['version']
+    if version_int('10') <= app_version <= version_int('16.0.1'):
+        if hotfix_version < '20121019.01':
+            return '20121019.01'
+        elif hotfix_version < '20130826.01':
+            return '20130826.01'
+    elif version_int('16.0.2') <= app_version <= version_int('24.*'):
+        if hotfix_version < '20130826.01':
+            return '20130826.01'
+    return None
+
+
 class Update(object):
 
-    def __init__(self, data, compat_mode='strict'):
+    def __init__(self, data, compat_mode='strict', index=None, cache=None):
         self.conn, self.cursor = None, None
         self.data = data.copy()
         self.data['row'] = {}
         self.version_int = 0
         self.compat_mode = compat_mode
+        # An optional UpdateIndex, see get_update_index().
+        self.index = index
+        # An optional ResponseCache, see get_update_cache().
+        self.cache = cache
 
     def is_valid(self):
         # If you accessing this from unit tests, then before calling
         # is valid, you can assign your own cursor.
-        if not self.cursor:
+        if not self.cursor and self.index is None:
             self.conn = mypool.connect()
             self.cursor = self.conn.cursor()
 
         data = self.data
         # Version can be blank.
         data['version'] = data.get('version', '')
-        for field in ['reqVersion', 'id', 'appID', 'appVersion']:
+        for field in REQUIRED:
             if field not in data:
                 return False
 
@@ -106,17 +420,21 @@ class Update(object):
         if not data['app_id']:
             return False
 
-        sql = """SELECT id, status, addontype_id, guid FROM addons
-                 WHERE guid = %(guid)s AND
-                       inactive = 0 AND
-                       status NOT IN (%(STATUS_DELETED)s, %(STATUS_DISABLED)s)
-                 LIMIT 1;"""
-        self.cursor.execute(sql, {
-            'guid': self.data['id'],
-            'STATUS_DELETED': base.STATUS_DELETED,
-            'STATUS_DISABLED': base.STATUS_DISABLED,
-        })
-        result = self.cursor.fetchone()
+        if self.index is not None:
+            result = self.index.get_addon(self.data['id'])
+        else:
+            sql = """SELECT id, status, addontype_id, guid FROM addons
+                     WHERE guid = %(guid)s AND
+                           inactive = 0 AND
+                           status NOT IN (%(STATUS_DELETED)s,
+                                          %(STATUS_DISABLED)s)
+                     LIMIT 1;"""
+            self.cursor.execute(sql, {
+                'guid': self.data['id'],
+                'STATUS_DELETED': base.STATUS_DELETED,
+                'STATUS_DISABLED': base.STATUS_DISABLED,
+            })
+            result = self.cursor.fetchone()
         if result is None:
             return False
 
@@ -134,6 +452,16 @@ class Update(object):
         return True
 
     def get_update(self):
+        if self.index is not None:
+            entry = self.index.find(self.data, self.compat_mode)
+            if entry is None:
+                return False
+            return self.set_row([
+                self.data['guid'], self.data['type'], 0, entry.min, entry.max,
+                entry.file_id, entry.file_status, entry.hash, entry.filename,
+                entry.version_id, entry.datestatuschanged,
+                entry.strict_compat, entry.releasenotes, entry.version])
+
         data = self.data
 
         data['STATUS_PUBLIC'] = base.STATUS_PUBLIC
@@ -248,16 +576,9 @@ class Update(object):
 
         # Special case for bug 1031516.
         if data['guid'] == 'firefox-hotfix@mozilla.org':
-            app_version = data['version_int']
-            hotfix_version = data['version']
-            if version_int('10') <= app_version <= version_int('16.0.1'):
-                if hotfix_version < '20121019.01':
-                    sql.append("AND versions.version = '20121019.01' ")
-                elif hotfix_version < '20130826.01':
-                    sql.append("AND versions.version = '20130826.01' ")
-            elif version_int('16.0.2') <= app_version <= version_int('24.*'):
-                if hotfix_version < '20130826.01':
-                    sql.append("AND versions.version = '20130826.01' ")
+            hotfix_version = get_hotfix_version(data)
+            if hotfix_version:
+                sql.append("AND versions.version = '%s' " % hotfix_version)
 
         sql.append('ORDER BY versions.id DESC LIMIT 1;')
 
@@ -265,24 +586,48 @@ class Update(object):
         result = self.cursor.fetchone()
 
         if result:
-            row = dict(zip([
-                'guid', 'type', 'disabled_by_user', 'min', 'max',
-                'file_id', 'file_status', 'hash', 'filename', 'version_id',
-                'datestatuschanged', 'strict_compat', 'releasenotes',
-                'version'],
-                list(result)))
-            row['type'] = base.ADDON_SLUGS_UPDATE[row['type']]
-            row['url'] = get_cdn_url(data['id'], row)
-            row['appguid'] = applications.APPS_ALL[data['app_id']].guid
-            data['row'] = row
-            return True
+            return self.set_row(list(result))
 
         return False
 
+    def set_row(self, result):
+        data = self.data
+        row = dict(zip([
+            'guid', 'type', 'disabled_by_user', 'min', 'max',
+            'file_id', 'file_status', 'hash', 'filename', 'version_id',
+            'datestatuschanged', 'strict_compat', 'releasenotes',
+            'version'],
+            result))
+        row['type'] = base.ADDON_SLUGS_UPDATE[row['type']]
+        row['url'] = get_cdn_url(data['id'], row)
+        row['appguid'] = applications.APPS_ALL[data['app_id']].guid
+        data['row'] = row
+        return True
+
     def get_bad_rdf(self):
         return bad_rdf
 
+    def get_cache_key(self):
+        data = self.data
+        return self.cache.make_key(
+            data.get('id'), data.get('version', ''), data.get('appID'),
+            data.get('appVersion'), data.get('appOS'), self.compat_mode)
+
     def get_rdf(self):
+        # Malformed requests aren't cached: the key doesn't tell them apart
+        # from the valid ones.
+        cache = self.cache
+        if any(field not in self.data for field in REQUIRED):
+            cache = None
+        if cache is not None:
+            # The key has to be computed before is_valid() rewrites the data.
+            key = self.get_cache_key()
+            rdf = cache.get(key)
+            if rdf is not None:
+                statsd.incr('services.update.cache.hit')
+                return rdf
+            statsd.incr('services.update.cache.miss')
+
         if self.is_valid():
             if self.get_update():
                 rdf = self.get_good_rdf()
@@ -290,9 +635,12 @@ class Update(object):
                 rdf = self.get_no_updates_rdf()
         else:
             rdf = self.get_bad_rdf()
-        self.cursor.close()
+        if self.cursor:
+            self.cursor.close()
         if self.conn:
             self.conn.close()
+        if cache is not None:
+            cache.set(key, rdf)
         return rdf
 
     def get_no_updates_rdf(self):
@@ -353,7 +701,8 @@ def application(environ, start_response):
         data = dict(parse_qsl(environ['QUERY_STRING']))
         compat_mode = data.pop('compatMode', 'strict')
         try:
-            update = Update(data, compat_mode)
+            update = Update(data, compat_mode, index=get_update_index(),
+                            cache=get_update_cache())
             output = force_bytes(update.get_rdf())
             start_response(status, update.get_headers(len(output)))
         except:
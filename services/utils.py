@@ -12,7 +12,6 @@ if settingmodule.startswith(('zamboni',  # typical git clone destination
 
 
 import posixpath
-import re
 import sys
 
 import MySQLdb as mysql
@@ -28,6 +27,8 @@ from olympia.lib.log_settings_base import formatters, handlers
 # remove all this.
 from olympia.constants.applications import APPS_ALL
 from olympia.constants.platforms import PLATFORMS
+# Shared with the site, so that both get the same cached conversions.
+from olympia.versions.compare import version_int  # noqa
 
 
 # This is not DRY: it's a copy of amo.helpers.user_media_path, to avoid an
@@ -73,17 +74,6 @@ ADDON_SLUGS_UPDATE = {
     7: 'plugin'}
 
 
-version_re = re.compile(r"""(?P<major>\d+)         # major (x in x.y)
-                            \.(?P<minor1>\d+)      # minor1 (y in x.y)
-                            \.?(?P<minor2>\d+|\*)? # minor2 (z in x.y.z)
-                            \.?(?P<minor3>\d+|\*)? # minor3 (w in x.y.z.w)
-                            (?P<alpha>[a|b]?)      # alpha/beta
-                            (?P<alpha_ver>\d*)     # alpha/beta version
-                            (?P<pre>pre)?          # pre release
-                            (?P<pre_ver>\d)?       # pre release version
-                          """, re.VERBOSE)
-
-
 def get_cdn_url(id, row):
     host = user_media_url('addons')
     url = posixpath.join(host, str(id), row['filename'])
@@ -13,6 +13,46 @@ def match_rules(rules, app, action):
     return False
 
 
+class PermissionSet(object):
+    """
+    The rules of some groups, parsed once so that checking a permission
+    doesn't split them again. Matches like match_rules().
+    """
+
+    def __init__(self, rules):
+        pairs = set()
+        for group_rules in rules:
+            for rule in group_rules.split(','):
+                rule_app, rule_action = rule.split(':')
+                pairs.add((rule_app, rule_action))
+        self.rules = frozenset(pairs)
+        # 'App:%' only asks for any rule of that app.
+        self.apps = frozenset(rule_app for rule_app, rule_action in pairs)
+
+    def allowed(self, app, action):
+        if action == '%':
+            return app in self.apps or '*' in self.apps
+        rules = self.rules
+        return ((app, action) in rules or (app, '*') in rules or
+                ('*', action) in rules or ('*', '*') in rules)
+
+
+def get_permission_set(user):
+    """
+    The PermissionSet of the groups of the user.
+
+    It's cached on the user instance along with the user.groups_list it was
+    built from, and built again when that list is reset (for instance when
+    the user is added to or removed from a group).
+    """
+    groups = user.groups_list
+    cached = getattr(user, '_permission_set', None)
+    if not isinstance(cached, tuple) or cached[0] is not groups:
+        cached = (groups, PermissionSet(group.rules for group in groups))
+        user._permission_set = cached
+    return cached[1]
+
+
 def action_allowed(request, app, action):
     """
     Determines if the request user has permission to do a certain action.
@@ -34,13 +74,13 @@ def action_allowed_user(user, app, action):
     ('Admin:*', 'Admin:%s'%whatever, '*:*',) as rules.
 
     Note: relies in user.groups_list, which is cached on the user instance the
-    first time it's accessed.
+    first time it's accessed, and on the rules compiled from it, see
+    get_permission_set().
     """
     if not user.is_authenticated():
         return False
 
-    return any(
-        match_rules(group.rules, app, action) for group in user.groups_list)
+    return get_permission_set(user).allowed(app, action)
 
 
 def submission_allowed(user, parsed_addon_data):
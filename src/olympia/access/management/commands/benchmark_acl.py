@@ -0,0 +1,76 @@
+import time
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+
+from olympia.access import acl
+
+
+HELP = """\
+Measure the time spent on the permission checks of a typical editor page,
+matching the rules of each group again for every check versus checking them
+against the rules compiled once for the user.
+
+    `./manage.py benchmark_acl --pages=1000`
+"""
+
+# The groups of a senior editor.
+GROUPS = (
+    'Addons:Review,Addons:ReviewUnlisted,Personas:Review,Editors:*',
+    'AddonReviewerMOTD:Edit,ReviewerAdminTools:View,ReviewerTools:View',
+    'SeniorPersonasTools:View,Personas:Review',
+    'Stats:View,CollectionStats:View,Localizers:*',
+)
+
+# The checks done while rendering an editor review page.
+CHECKS = (
+    [('Admin', '%'), ('Addons', 'Review'), ('Addons', 'ReviewUnlisted'),
+     ('Personas', 'Review'), ('SeniorPersonasTools', 'View'),
+     ('Addons', 'Edit'), ('Admin', 'EditAnyAddon')] +
+    [('AddonReviewerMOTD', 'Edit'), ('ReviewerAdminTools', 'View')] * 5)
+
+
+class Group(object):
+
+    def __init__(self, rules):
+        self.rules = rules
+
+
+class User(object):
+
+    def __init__(self, groups):
+        self.groups_list = [Group(rules) for rules in groups]
+
+    def is_authenticated(self):
+        return True
+
+
+class Command(BaseCommand):
+    option_list = BaseCommand.option_list + (
+        make_option('--pages', type='int', default=1000,
+                    help='Number of pages, each with a fresh user.'),
+    )
+    help = HELP
+
+    def handle(self, *args, **kw):
+        count = kw['pages']
+
+        def match_rules(user):
+            for app, action in CHECKS:
+                any(acl.match_rules(group.rules, app, action)
+                    for group in user.groups_list)
+
+        def compiled(user):
+            for app, action in CHECKS:
+                acl.action_allowed_user(user, app, action)
+
+        self.stdout.write('%-12s %12s %14s' % ('scenario', 'checks/page',
+                                               'cpu us/page'))
+        for name, func in (('match_rules', match_rules),
+                           ('compiled', compiled)):
+            users = [User(GROUPS) for i in range(count)]
+            start = time.clock()
+            for user in users:
+                func(user)
+            cpu = (time.clock() - start) * 1000000 / count
+            self.stdout.write('%-12s %12d %14.1f' % (name, len(CHECKS), cpu))
@@ -6,9 +6,11 @@ from olympia.amo.tests import TestCase, req_factory_factory
 from olympia.addons.models import Addon, AddonUser
 from olympia.users.models import UserProfile
 
-from .acl import (action_allowed, check_addon_ownership, check_ownership,
+from .acl import (action_allowed, action_allowed_user,
+                  check_addon_ownership, check_ownership,
                   check_addons_reviewer, check_personas_reviewer,
-                  check_unlisted_addons_reviewer, is_editor, match_rules)
+                  check_unlisted_addons_reviewer, get_permission_set,
+                  is_editor, match_rules, PermissionSet)
 
 
 pytestmark = pytest.mark.django_db
@@ -58,6 +60,24 @@ def test_match_rules():
             "%s == Admin:%% and shouldn't" % rule
 
 
+def test_permission_set():
+    rules = ['Editors:*,Admin:EditAnyAddon', 'Stats:View', '*:Review']
+    permissions = PermissionSet(rules)
+    for app, action in (('Admin', 'EditAnyAddon'), ('Admin', '%'),
+                        ('Editors', 'Anything'), ('Stats', 'View'),
+                        ('Stats', '%'), ('Personas', 'Review')):
+        assert permissions.allowed(app, action)
+        assert any(match_rules(rule, app, action) for rule in rules)
+    for app, action in (('Admin', 'Foo'), ('Stats', 'Edit'),
+                        ('Personas', '%'), ('Personas', 'Edit')):
+        assert not permissions.allowed(app, action)
+        assert not any(match_rules(rule, app, action) for rule in rules)
+
+    assert PermissionSet(['*:*']).allowed('Admin', '%')
+    assert PermissionSet(['*:Review']).allowed('Admin', '%')
+    assert not PermissionSet([]).allowed('Admin', '%')
+
+
 def test_anonymous_user():
     fake_request = req_factory_factory('/')
     assert not action_allowed(fake_request, amo.FIREFOX, 'Admin:%')
@@ -73,6 +93,20 @@ class ACLTestCase(TestCase):
         self.assertLoginRedirects(self.client.get(url), to=url)
 
 
+class TestGetPermissionSet(TestCase):
+
+    def test_cached_until_groups_change(self):
+        user = UserProfile.objects.create(username='bob')
+        assert not action_allowed_user(user, 'Addons', 'Review')
+        permissions = get_permission_set(user)
+        assert get_permission_set(user) is permissions
+
+        self.grant_permission(user, 'Addons:Review')
+        del user.groups_list
+        assert get_permission_set(user) is not permissions
+        assert action_allowed_user(user, 'Addons', 'Review')
+
+
 class TestHasPerm(TestCase):
     fixtures = ['base/users', 'base/addon_3615']
 
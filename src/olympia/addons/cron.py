@@ -1,10 +1,11 @@
+import itertools
 import logging
 import os
 import time
 from datetime import datetime, timedelta
 
 from django.conf import settings
-from django.db import connections
+from django.db import connection, connections
 from django.db.models import Q, F, Avg
 from django.utils.encoding import force_text
 
@@ -45,7 +46,7 @@ def update_addon_average_daily_users():
     cursor.close()
 
     ts = [_update_addon_average_daily_users.subtask(args=[chunk])
-          for chunk in chunked(d, 250)]
+          for chunk in chunked(d, 1000)]
     TaskSet(ts).apply_async()
 
 
@@ -56,23 +57,12 @@ def _update_addon_average_daily_users(data, **kw):
     if not waffle.switch_is_active('local-statistics-processing'):
         return False
 
-    for pk, count in data:
-        try:
-            addon = Addon.objects.get(pk=pk)
-        except Addon.DoesNotExist:
-            # The processing input comes from metrics which might be out of
-            # date in regards to currently existing add-ons
-            m = "Got an ADU update (%s) but the add-on doesn't exist (%s)"
-            task_log.debug(m % (count, pk))
-            continue
-
-        if (count - addon.total_downloads) > 10000:
-            # Adjust ADU to equal total downloads so bundled add-ons don't
-            # skew the results when sorting by users.
-            task_log.info('Readjusted ADU count for addon %s' % addon.slug)
-            addon.update(average_daily_users=addon.total_downloads)
-        else:
-            addon.update(average_daily_users=count)
+    # Adjust ADU to equal total downloads so bundled add-ons don't skew the
+    # results when sorting by users.
+    _bulk_update_addons('adu', data, ['adu'], [
+        ('average_daily_users',
+         'IF(t.adu > addons.totaldownloads + 10000, addons.totaldownloads, '
+         't.adu)')])
 
 
 @cronjobs.register
@@ -96,7 +86,7 @@ def update_addon_download_totals():
     cursor.close()
 
     ts = [_update_addon_download_totals.subtask(args=[chunk])
-          for chunk in chunked(d, 250)]
+          for chunk in chunked(d, 1000)]
     TaskSet(ts).apply_async()
 
 
@@ -108,61 +98,119 @@ def _update_addon_download_totals(data, **kw):
     if not waffle.switch_is_active('local-statistics-processing'):
         return False
 
-    for pk, avg, sum in data:
-        try:
-            addon = Addon.objects.get(pk=pk)
-            # Don't trigger a save unless we have to. Since the query that
-            # sends us data doesn't filter out deleted addons, or the addon may
-            # be unpopular, this can reduce a lot of unnecessary save queries.
-            if (addon.average_daily_downloads != avg or
-                    addon.total_downloads != sum):
-                addon.update(average_daily_downloads=avg, total_downloads=sum)
-        except Addon.DoesNotExist:
-            # The processing input comes from metrics which might be out of
-            # date in regards to currently existing add-ons.
-            m = ("Got new download totals (total=%s,avg=%s) but the add-on"
-                 "doesn't exist (%s)" % (sum, avg, pk))
-            task_log.debug(m)
-
-
-def _change_last_updated(next):
-    # We jump through some hoops here to make sure we only change the add-ons
-    # that really need it, and to invalidate properly.
-    current = dict(Addon.objects.values_list('id', 'last_updated'))
-    changes = {}
-
-    for addon, last_updated in next.items():
-        try:
-            if current[addon] != last_updated:
-                changes[addon] = last_updated
-        except KeyError:
-            pass
-
-    if not changes:
-        return
-
-    log.debug('Updating %s add-ons' % len(changes))
-    # Update + invalidate.
-    qs = Addon.objects.no_cache().filter(id__in=changes).no_transforms()
-    for addon in qs:
-        addon.last_updated = changes[addon.id]
-        addon.save()
+    _bulk_update_addons('download_totals', data, ['avg', 'total'], [
+        ('average_daily_downloads', 't.avg'),
+        ('totaldownloads', 't.total')])
+
+
+def _bulk_update_addons(name, data, columns, assignments):
+    """
+    Update add-ons from `data`, rows of an add-on id followed by values for
+    `columns`, with one INSERT into a temporary table and one join UPDATE.
+
+    `assignments` are (addons column, SQL expression) pairs, where `t` is the
+    temporary table. Add-ons that don't exist or whose values don't change
+    aren't updated. Returns the number of add-ons updated.
+    """
+    from . import tasks
+    if not data:
+        return 0
+    start = time.time()
+    table = 'tmp_%s' % name
+    cursor = connection.cursor()
+    # Values are rounded like the add-on columns when they're staged, so that
+    # unchanged add-ons can be told apart.
+    cursor.execute('DROP TEMPORARY TABLE IF EXISTS %s' % table)
+    cursor.execute('CREATE TEMPORARY TABLE %s (addon_id INT UNSIGNED '
+                   'PRIMARY KEY, %s)' % (table, ', '.join(
+                       '%s INT UNSIGNED' % column for column in columns)))
+    row = '(%s)' % ','.join(['%s'] * (len(columns) + 1))
+    cursor.execute('INSERT INTO %s VALUES %s' % (
+        table, ','.join([row] * len(data))), list(itertools.chain(*data)))
+
+    join = 'addons INNER JOIN %s t ON addons.id = t.addon_id' % table
+    changed = ' OR '.join('addons.%s != %s' % assignment
+                          for assignment in assignments)
+    cursor.execute('SELECT addons.id FROM %s WHERE %s' % (join, changed))
+    ids = [id_ for id_, in cursor.fetchall()]
+    if ids:
+        cursor.execute('UPDATE %s SET %s WHERE addons.id IN (%s)' % (
+            join, ', '.join('addons.%s = %s' % assignment
+                            for assignment in assignments),
+            ','.join(['%s'] * len(ids))), ids)
+    cursor.execute('DROP TEMPORARY TABLE IF EXISTS %s' % table)
+    cursor.close()
+
+    # All our updates were sql, so invalidate and reindex manually.
+    for chunk in chunked(ids, 150):
+        Addon.objects.invalidate(
+            *Addon.objects.no_cache().filter(id__in=chunk).no_transforms())
+        tasks.index_addons.delay(chunk)
+    task_log.info('[%s] Updated %s of %s add-ons in %.2fs.' % (
+        name, len(ids), len(data), time.time() - start))
+    return len(ids)
+
+
+def _change_last_updated(cursor, tables, value, where, params=()):
+    """
+    Set the last_updated of the add-ons of `tables` matching `where` to the
+    SQL expression `value`, return their ids.
+    """
+    cursor.execute('SELECT addons.id FROM %s WHERE %s' % (tables, where),
+                   params)
+    ids = [id_ for id_, in cursor.fetchall()]
+    if ids:
+        # `modified` is bumped like a save() would.
+        cursor.execute('UPDATE %s SET addons.last_updated = %s, '
+                       'addons.modified = NOW() WHERE %s'
+                       % (tables, value, where), params)
+    return ids
 
 
 @cronjobs.register
 @write
 def addon_last_updated():
-    next = {}
-    for q in Addon._last_updated_queries().values():
-        for addon, last_updated in q.values_list('id', 'last_updated'):
-            next[addon] = last_updated
-
-    _change_last_updated(next)
-
+    """
+    Compute the last_updated of every add-on in SQL, with the queries of each
+    status class, and only update, invalidate and reindex the add-ons whose
+    date changed.
+    """
+    from . import tasks
+    start = time.time()
+    cursor = connection.cursor()
+    cursor.execute('DROP TEMPORARY TABLE IF EXISTS tmp_last_updated')
+    cursor.execute('CREATE TEMPORARY TABLE tmp_last_updated (addon_id INT '
+                   'UNSIGNED PRIMARY KEY, last_updated DATETIME)')
+    for qs in Addon._last_updated_queries().values():
+        sql, params = qs.values('id', 'last_updated').query.sql_with_params()
+        cursor.execute('INSERT INTO tmp_last_updated (addon_id, last_updated) '
+                       'SELECT q.id, q.last_updated FROM (%s) q ON DUPLICATE '
+                       'KEY UPDATE last_updated = VALUES(last_updated)'
+                       % sql, params)
+
+    # Add-ons without a date fall back to their creation date straight away,
+    # rather than being set to NULL and then fixed below on every run.
+    value = 'COALESCE(t.last_updated, addons.created)'
+    ids = _change_last_updated(
+        cursor,
+        'addons INNER JOIN tmp_last_updated t ON addons.id = t.addon_id',
+        value, 'NOT (addons.last_updated <=> %s)' % value)
     # Get anything that didn't match above.
-    other = (Addon.objects.no_cache().filter(last_updated__isnull=True)
-             .values_list('id', 'created'))
-    _change_last_updated(dict(other))
+    ids += _change_last_updated(
+        cursor, 'addons', 'addons.created',
+        'addons.last_updated IS NULL AND addons.status != %s',
+        [amo.STATUS_DELETED])
+    cursor.execute('DROP TEMPORARY TABLE IF EXISTS tmp_last_updated')
+    cursor.close()
+
+    ids = sorted(set(ids))
+    log.info('Updated last_updated of %s add-ons in %.2fs.'
+             % (len(ids), time.time() - start))
+    # All our updates were sql, so invalidate manually.
+    for chunk in chunked(ids, 150):
+        Addon.objects.invalidate(
+            *Addon.objects.no_cache().filter(id__in=chunk).no_transforms())
+        tasks.index_addons.delay(chunk)
 
 
 @cronjobs.register
@@ -286,6 +334,54 @@ def reindex_addons(index=None, addon_type=None):
     TaskSet(ts).apply_async()
 
 
+def get_changed_addon_ids(since):
+    """
+    Return the ids of the add-ons whose search document may have changed
+    since `since`: the add-ons themselves, or their versions, files,
+    previews, translations or listed authors were modified since then.
+
+    The comparison is inclusive, as `modified` only has a precision of a
+    second.
+    """
+    from olympia.addons.models import AddonUser, Preview
+    from olympia.translations.models import Translation
+    from olympia.versions.models import Version
+
+    querysets = [
+        Addon.unfiltered.filter(modified__gte=since).values_list('id'),
+        Version.unfiltered.filter(modified__gte=since).values_list('addon'),
+        File.objects.filter(modified__gte=since).values_list('version__addon'),
+        Preview.objects.filter(modified__gte=since).values_list('addon'),
+        AddonUser.objects.filter(
+            listed=True, user__modified__gte=since).values_list('addon'),
+    ]
+    # One query per translated field, each using the index of its column:
+    # OR-ed together, they would scan the whole addons table.
+    translations = set(Translation.objects.filter(modified__gte=since)
+                                          .values_list('id', flat=True))
+    for chunk in chunked(sorted(translations), 1000):
+        for field in ('name', 'summary', 'description', 'homepage',
+                      'support_email', 'support_url', 'eula',
+                      'privacy_policy'):
+            querysets.append(Addon.unfiltered.filter(
+                **{'%s__in' % field: chunk}).values_list('id'))
+        querysets.append(
+            Preview.objects.filter(caption__in=chunk).values_list('addon'))
+    ids = set()
+    for qs in querysets:
+        ids.update(id_ for (id_,) in qs if id_)
+    return ids
+
+
+def reindex_addons_since(since, index=None):
+    """Reindex the add-ons changed since `since`, return how many."""
+    from . import tasks
+    ids = sorted(get_changed_addon_ids(since))
+    for chunk in chunked(ids, 150):
+        tasks.index_addons(chunk, index=index)
+    return len(ids)
+
+
 @cronjobs.register
 def cleanup_image_files():
     """
@@ -183,6 +183,32 @@ class AddonIndexer(BaseSearchIndexer):
             }
         return compatible_apps
 
+    @classmethod
+    def get_documents(cls, ids, objects=None, transforms=None):
+        """Like BaseSearchIndexer.get_documents(), defaulting to the same
+        manager and transforms as the index_addons task."""
+        from olympia.addons.models import (
+            Addon, attach_tags, attach_translations)
+
+        if objects is None:
+            objects = Addon.unfiltered
+        if transforms is None:
+            transforms = (attach_tags, attach_translations)
+        return super(AddonIndexer, cls).get_documents(
+            ids, objects=objects, transforms=transforms)
+
+    @classmethod
+    def get_valid_documents(cls, ids, statuses=amo.VALID_ADDON_STATUSES):
+        """
+        Return the documents of `ids` as a list, in the same order, keeping
+        only valid add-ons with one of `statuses`, like
+        `Addon.objects.valid()` would.
+        """
+        docs = cls.get_documents(ids)
+        return [docs[pk] for pk in ids
+                if pk in docs and docs[pk]['status'] in statuses and
+                not docs[pk]['is_disabled'] and docs[pk]['current_version']]
+
     @classmethod
     def extract_document(cls, obj):
         """Extract indexable attributes from an add-on."""
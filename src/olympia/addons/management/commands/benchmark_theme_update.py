@@ -0,0 +1,95 @@
+import threading
+import time
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+
+from olympia import amo
+from olympia.addons.models import Addon
+
+from services import theme_update
+from services.cache import LRUBackend, MemcachedBackend, ResponseCache
+
+
+HELP = """\
+Measure the throughput and latency of lightweight theme update checks under
+concurrent load, querying MySQL (and reading the icon) for each request
+versus answering from the response cache.
+
+    `./manage.py benchmark_theme_update --threads=8 --requests=500`
+
+The checks are spread over the most popular public themes and a few
+locales, like real update pings.
+"""
+
+LOCALES = ('en-US', 'de', 'fr', 'es', 'ja')
+
+
+class Command(BaseCommand):
+    option_list = BaseCommand.option_list + (
+        make_option('--threads', type='int', default=8,
+                    help='Number of concurrent clients.'),
+        make_option('--requests', type='int', default=500,
+                    help='Number of requests per client and scenario.'),
+        make_option('--themes', type='int', default=100,
+                    help='Number of themes to spread the requests over.'),
+    )
+    help = HELP
+
+    def handle(self, *args, **kw):
+        ids = list(Addon.objects.public()
+                   .filter(type=amo.ADDON_PERSONA)
+                   .order_by('-persona__popularity')
+                   .values_list('id', flat=True)[:kw['themes']])
+        if not ids:
+            self.stdout.write('No public themes to check.')
+            return
+        checks = [(LOCALES[i % len(LOCALES)], id_)
+                  for i, id_ in enumerate(ids * len(LOCALES))]
+
+        memcached = MemcachedBackend()
+        cache = ResponseCache('theme_update_benchmark',
+                              'theme_update:generation',
+                              [LRUBackend(len(checks)), memcached], memcached)
+        icons = LRUBackend(len(ids))
+
+        def uncached(locale, id_):
+            update = theme_update.ThemeUpdate(locale, id_)
+            update.get_json()
+            update.conn.close()
+
+        def cached(locale, id_):
+            update = theme_update.ThemeUpdate(locale, id_, cache=cache,
+                                              icons=icons)
+            update.get_json()
+            if update.conn:
+                update.conn.close()
+
+        self.stdout.write('%-10s %10s %10s %10s %10s' % (
+            'scenario', 'req/s', 'mean ms', 'p99 ms', 'max ms'))
+        for name, func in (('uncached', uncached), ('cached', cached)):
+            timings = []
+            lock = threading.Lock()
+
+            def client(offset):
+                mine = []
+                for i in range(kw['requests']):
+                    start = time.time()
+                    func(*checks[(offset + i) % len(checks)])
+                    mine.append((time.time() - start) * 1000)
+                with lock:
+                    timings.extend(mine)
+
+            threads = [threading.Thread(target=client, args=(i * 7,))
+                       for i in range(kw['threads'])]
+            start = time.time()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = time.time() - start
+
+            timings.sort()
+            self.stdout.write('%-10s %10.1f %10.2f %10.2f %10.2f' % (
+                name, len(timings) / elapsed, sum(timings) / len(timings),
+                timings[int(len(timings) * 0.99)], timings[-1]))
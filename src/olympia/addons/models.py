@@ -10,7 +10,8 @@ from operator import attrgetter
 from datetime import datetime
 
 from django.conf import settings
-from django.core.exceptions import ObjectDoesNotExist
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist, ObjectDoesNotExist
 from django.core.files.storage import default_storage as storage
 from django.db import models, transaction
 from django.db.models import F, Max, Q, signals as dbsignals
@@ -28,7 +29,8 @@ from olympia.amo.models import (
     SlugField, OnChangeMixin, ModelBase, ManagerBase, manual_order)
 from olympia.access import acl
 from olympia.addons.utils import (
-    get_creatured_ids, get_featured_ids, generate_addon_guid)
+    get_creatured_ids, get_featured_ids, generate_addon_guid,
+    is_in_featured_store)
 from olympia.amo import helpers
 from olympia.amo.decorators import use_master, write
 from olympia.amo.utils import (
@@ -46,7 +48,8 @@ from olympia.translations.fields import (
     LinkifiedField, PurifiedField, save_signal, TranslatedField, Translation)
 from olympia.users.models import UserForeignKey, UserProfile
 from olympia.versions.compare import version_int
-from olympia.versions.models import inherit_nomination, Version
+from olympia.versions.models import (
+    ApplicationsVersions, inherit_nomination, Version)
 
 from . import signals
 
@@ -1450,6 +1453,23 @@ def watch_disabled(old_attr=None, new_attr=None, instance=None, sender=None,
             f.hide_disabled_file()
 
 
+@Addon.on_change
+def watch_featured(old_attr=None, new_attr=None, instance=None, sender=None,
+                   **kwargs):
+    """Rebuild the featured add-ons store when a featured add-on changes."""
+    if old_attr is None:
+        old_attr = {}
+    if new_attr is None:
+        new_attr = {}
+    changed = any(
+        field in new_attr and new_attr[field] != old_attr.get(field)
+        for field in ('status', 'disabled_by_user', 'type',
+                      '_current_version', '_current_version_id'))
+    if changed and is_in_featured_store(addon_id=instance.id):
+        from . import tasks
+        tasks.rebuild_featured_ids.delay()
+
+
 @Addon.on_change
 def watch_developer_notes(old_attr=None, new_attr=None, instance=None,
                           sender=None, **kwargs):
@@ -1678,6 +1698,17 @@ class AddonCategory(caching.CachingMixin, models.Model):
         return get_creatured_ids(category, lang)
 
 
+@receiver(dbsignals.post_save, sender=AddonCategory,
+          dispatch_uid='addoncategory.featured')
+@receiver(dbsignals.post_delete, sender=AddonCategory,
+          dispatch_uid='addoncategory.featured')
+def update_featured_categories(sender, instance, **kw):
+    """Rebuild the featured add-ons store when a featured add-on moves."""
+    if not kw.get('raw') and is_in_featured_store(addon_id=instance.addon_id):
+        from . import tasks
+        tasks.rebuild_featured_ids.delay()
+
+
 class AddonUser(caching.CachingMixin, models.Model):
     addon = models.ForeignKey(Addon, on_delete=models.CASCADE)
     user = UserForeignKey()
@@ -2139,6 +2170,63 @@ models.signals.post_delete.connect(update_incompatible_versions,
                                    dispatch_uid='cor_update_incompatible')
 
 
+# The fields read by services/update.py. Saving other fields of these models,
+# like the download counts or the ratings of an add-on, leaves its cached
+# responses alone.
+UPDATE_SERVICE_FIELDS = {
+    Addon: {'guid', 'type', 'status', 'disabled_by_user'},
+    Version: {'addon', 'version', 'releasenotes', 'deleted', 'channel'},
+    File: {'version', 'platform', 'status', 'hash', 'filename',
+           'datestatuschanged', 'strict_compatibility', 'binary_components'},
+}
+
+
+def clear_update_cache(sender, update_fields=None, **kw):
+    # Something served by services/update.py changed; invalidate all of its
+    # cached responses. See services.update.get_update_cache().
+    if update_fields is not None and sender in UPDATE_SERVICE_FIELDS:
+        fields = UPDATE_SERVICE_FIELDS[sender]
+        changed = set()
+        for name in update_fields:
+            try:
+                # Also accepts attnames, like `addon_id`.
+                changed.add(sender._meta.get_field(name).name)
+            except FieldDoesNotExist:
+                changed.add(name)
+        if not changed & fields:
+            return
+    cache.add('update:generation', 1)
+    cache.incr('update:generation')
+
+
+for m in (Addon, Version, File, ApplicationsVersions, CompatOverride,
+          CompatOverrideRange, IncompatibleVersions):
+    models.signals.post_save.connect(
+        clear_update_cache, sender=m,
+        dispatch_uid='update_cache_save_%s' % m.__name__)
+    models.signals.post_delete.connect(
+        clear_update_cache, sender=m,
+        dispatch_uid='update_cache_delete_%s' % m.__name__)
+
+
+def clear_theme_update_cache(sender, instance, **kw):
+    # A theme served by services/theme_update.py changed; invalidate all of
+    # its cached responses. See services.theme_update.get_theme_update_cache().
+    if sender is Addon and instance.type != amo.ADDON_PERSONA:
+        return
+    cache.add('theme_update:generation', 1)
+    cache.incr('theme_update:generation')
+
+
+for m in (Addon, Persona):
+    models.signals.post_save.connect(
+        clear_theme_update_cache, sender=m,
+        dispatch_uid='theme_update_cache_save_%s' % m.__name__)
+    models.signals.post_delete.connect(
+        clear_theme_update_cache, sender=m,
+        dispatch_uid='theme_update_cache_delete_%s' % m.__name__)
+
+
 def track_new_status(sender, instance, *args, **kw):
     if kw.get('raw'):
         # The addon is being loaded from a fixure.
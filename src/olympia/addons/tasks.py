@@ -7,12 +7,14 @@ from django.core.files.storage import default_storage as storage
 from django.db import transaction
 
 from PIL import Image
+from post_request_task.task import PostRequestTask
 
 from olympia import amo
 from olympia.addons.models import (
     Addon, attach_tags, attach_translations, AppSupport, CompatOverride,
     IncompatibleVersions, Persona, Preview)
 from olympia.addons.indexers import AddonIndexer
+from olympia.addons.utils import build_featured_ids
 from olympia.amo.celery import task
 from olympia.amo.decorators import set_modified_on, write
 from olympia.amo.helpers import user_media_path
@@ -36,6 +38,13 @@ def version_changed(addon_id, **kw):
     update_appsupport([addon_id])
 
 
+# Queued until the end of the request, once its transaction is committed.
+@task(base=PostRequestTask)
+def rebuild_featured_ids(**kw):
+    log.info('Rebuilding the featured add-ons store.')
+    build_featured_ids()
+
+
 def update_last_updated(addon_id):
     queries = Addon._last_updated_queries()
     try:
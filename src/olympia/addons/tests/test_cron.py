@@ -8,12 +8,14 @@ from django.test.utils import override_settings
 import mock
 
 from olympia import amo
-from olympia.amo.tests import TestCase
+from olympia.amo.tests import addon_factory, TestCase, user_factory
 from olympia.addons import cron
-from olympia.addons.models import Addon, AppSupport
+from olympia.addons.models import Addon, AddonUser, AppSupport
 from olympia.files.models import File
 from olympia.lib.es.utils import flag_reindexing_amo, unflag_reindexing_amo
 from olympia.stats.models import UpdateCount
+from olympia.translations.models import Translation
+from olympia.users.models import UserProfile
 from olympia.versions.models import Version
 
 
@@ -51,6 +53,22 @@ class TestLastUpdated(TestCase):
         for addon in Addon.objects.filter(status=amo.STATUS_PUBLIC):
             assert addon.last_updated == addon.created
 
+    @mock.patch('olympia.addons.tasks.index_addons.delay')
+    def test_only_changed_addons(self, index_addons_mock):
+        cron.addon_last_updated()
+        addon = Addon.objects.get(pk=3615)
+        last_updated = addon.last_updated
+        index_addons_mock.reset_mock()
+
+        # Nothing changed.
+        cron.addon_last_updated()
+        assert not index_addons_mock.called
+
+        Addon.objects.filter(pk=3615).update(last_updated=None)
+        cron.addon_last_updated()
+        index_addons_mock.assert_called_once_with([3615])
+        assert Addon.objects.get(pk=3615).last_updated == last_updated
+
     def test_appsupport(self):
         ids = Addon.objects.values_list('id', flat=True)
         cron._update_appsupport(ids)
@@ -240,6 +258,45 @@ class AvgDailyUserCountTestCase(TestCase):
         assert addon.average_daily_users == 1234
 
 
+class TestUpdateAddonDownloadTotals(TestCase):
+    fixtures = ['base/addon_3615']
+
+    def setUp(self):
+        super(TestUpdateAddonDownloadTotals, self).setUp()
+        self.create_switch('local-statistics-processing')
+
+    def test_update(self):
+        addon = Addon.objects.get(pk=3615)
+        other = addon_factory(average_daily_downloads=5, total_downloads=50)
+        # Missing add-ons are ignored.
+        cron._update_addon_download_totals(
+            [(3615, 12, 345), (other.pk, 5, 50), (999999, 1, 1)])
+        addon = Addon.objects.get(pk=3615)
+        assert addon.average_daily_downloads == 12
+        assert addon.total_downloads == 345
+        other = Addon.objects.get(pk=other.pk)
+        assert other.average_daily_downloads == 5
+        assert other.total_downloads == 50
+
+    @mock.patch('olympia.addons.tasks.index_addons.delay')
+    def test_unchanged_addons_are_skipped(self, index_addons_mock):
+        addon = Addon.objects.get(pk=3615)
+        other = addon_factory(average_daily_downloads=5, total_downloads=50)
+        index_addons_mock.reset_mock()
+        changed = cron._bulk_update_addons(
+            'download_totals',
+            [(3615, addon.average_daily_downloads + 1,
+              addon.total_downloads), (other.pk, 5, 50)],
+            ['avg', 'total'],
+            [('average_daily_downloads', 't.avg'),
+             ('totaldownloads', 't.total')])
+        assert changed == 1
+        assert Addon.objects.get(pk=3615).average_daily_downloads == (
+            addon.average_daily_downloads + 1)
+        # Only the changed add-on is reindexed.
+        index_addons_mock.assert_called_once_with([3615])
+
+
 class TestCleanupImageFiles(TestCase):
 
     @mock.patch('olympia.addons.cron.os')
@@ -276,3 +333,45 @@ class TestCleanupImageFiles(TestCase):
         assert os_listdir_mock.called
         assert os_stat_mock.called
         assert os_unlink_mock.called
+
+
+class TestChangedAddonIds(TestCase):
+
+    def setUp(self):
+        super(TestChangedAddonIds, self).setUp()
+        self.addons = [addon_factory(), addon_factory()]
+        past = datetime.datetime.now() - datetime.timedelta(days=1)
+        for model in (Addon, Version, File, Translation, UserProfile):
+            model.objects.update(modified=past)
+        self.since = datetime.datetime.now().replace(microsecond=0)
+
+    def test_nothing_changed(self):
+        assert cron.get_changed_addon_ids(self.since) == set()
+
+    def test_addon_changed(self):
+        Addon.objects.filter(pk=self.addons[0].pk).update(
+            modified=self.since)
+        assert cron.get_changed_addon_ids(self.since) == {self.addons[0].pk}
+
+    def test_file_changed(self):
+        File.objects.filter(version__addon=self.addons[1]).update(
+            modified=self.since)
+        assert cron.get_changed_addon_ids(self.since) == {self.addons[1].pk}
+
+    def test_translation_changed(self):
+        Translation.objects.filter(id=self.addons[1].name_id).update(
+            modified=self.since)
+        assert cron.get_changed_addon_ids(self.since) == {self.addons[1].pk}
+
+    def test_author_changed(self):
+        user = user_factory()
+        AddonUser.objects.create(addon=self.addons[0], user=user)
+        UserProfile.objects.filter(pk=user.pk).update(modified=self.since)
+        assert cron.get_changed_addon_ids(self.since) == {self.addons[0].pk}
+
+    @mock.patch('olympia.addons.tasks.index_addons')
+    def test_reindex_addons_since(self, index_addons_mock):
+        Addon.objects.update(modified=self.since)
+        assert cron.reindex_addons_since(self.since) == 2
+        index_addons_mock.assert_called_with(
+            sorted(addon.pk for addon in self.addons), index=None)
@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 from itertools import chain
 
+import mock
+
 from olympia import amo
 from olympia.amo.models import SearchMixin
 from olympia.amo.tests import (
@@ -347,6 +349,38 @@ class TestAddonIndexer(TestCase):
         assert 'caption' not in extracted['previews'][0]
         assert 'caption' not in extracted['previews'][1]
 
+    @mock.patch('olympia.amo.indexers.amo_search.get_es')
+    def test_get_documents(self, get_es_mock):
+        other = addon_factory()
+        source = {'id': self.addon.pk, 'name_translations': []}
+        get_es_mock.return_value.mget.return_value = {'docs': [
+            {'_id': str(self.addon.pk), 'found': True, '_source': source},
+            {'_id': str(other.pk), 'found': False},
+        ]}
+        docs = AddonIndexer.get_documents([self.addon.pk, other.pk])
+        assert get_es_mock.return_value.mget.call_count == 1
+        assert get_es_mock.return_value.mget.call_args[1] == {
+            'body': {'ids': [self.addon.pk, other.pk]},
+            'index': AddonIndexer.get_index_alias(),
+            'doc_type': AddonIndexer.get_doctype_name()}
+        assert docs[self.addon.pk] == source
+        # The missing add-on was extracted from the database, and serialized
+        # like the indexing would.
+        assert docs[other.pk]['id'] == other.pk
+        assert docs[other.pk]['slug'] == other.slug
+        assert docs[other.pk]['created'] == other.created.isoformat()
+
+    def test_get_valid_documents(self):
+        disabled = addon_factory(disabled_by_user=True)
+        nominated = addon_factory(status=amo.STATUS_NOMINATED)
+        other = addon_factory()
+        ids = [other.pk, disabled.pk, nominated.pk, self.addon.pk, 666]
+        docs = AddonIndexer.get_valid_documents(ids)
+        assert [doc['id'] for doc in docs] == [
+            other.pk, nominated.pk, self.addon.pk]
+        docs = AddonIndexer.get_valid_documents(ids, [amo.STATUS_PUBLIC])
+        assert [doc['id'] for doc in docs] == [other.pk, self.addon.pk]
+
 
 class TestAddonIndexerWithES(ESTestCase):
     fixtures = ['base/users', 'base/addon_3615']
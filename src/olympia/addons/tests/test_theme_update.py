@@ -3,6 +3,7 @@ import json
 from StringIO import StringIO
 
 from django.conf import settings
+from django.core.cache import cache
 from django.db import connection
 
 import mock
@@ -13,6 +14,7 @@ from olympia.amo.helpers import user_media_path, user_media_url
 from olympia.versions.models import Version
 
 from services import theme_update
+from services.cache import LRUBackend, ResponseCache
 
 
 class TestWSGIApplication(TestCase):
@@ -34,7 +36,8 @@ class TestWSGIApplication(TestCase):
         for path_info, call_args in urls.iteritems():
             environ = dict(self.environ, PATH_INFO=path_info)
             theme_update.application(environ, self.start_response)
-            ThemeUpdate_mock.assert_called_with(*call_args)
+            ThemeUpdate_mock.assert_called_with(*call_args, cache=None,
+                                                icons=None)
 
         # From getpersonas.com we append `?src=gp` so we know to consume
         # the ID as the `persona_id`.
@@ -43,7 +46,8 @@ class TestWSGIApplication(TestCase):
             environ = dict(self.environ, PATH_INFO=path_info)
             theme_update.application(environ, self.start_response)
             call_args[2] = 'src=gp'
-            ThemeUpdate_mock.assert_called_with(*call_args)
+            ThemeUpdate_mock.assert_called_with(*call_args, cache=None,
+                                                icons=None)
             self.start_response.assert_called_with('200 OK', mock.ANY)
 
     @mock.patch('services.theme_update.ThemeUpdate')
@@ -149,3 +153,77 @@ class TestThemeUpdate(TestCase):
         up.get_update()
         image_url = up.image_url('foo.png')
         assert user_media_url('addons') in image_url
+
+
+class FakeGenerationBackend(object):
+
+    def __init__(self):
+        self.generation = 1
+
+    def get_generation(self, key):
+        return self.generation
+
+
+class TestThemeUpdateCache(TestCase):
+    fixtures = ['addons/persona']
+
+    def setUp(self):
+        super(TestThemeUpdateCache, self).setUp()
+        self.generation = FakeGenerationBackend()
+        self.local = LRUBackend(10)
+        self.cache = ResponseCache(
+            'theme_update', 'theme_update:generation', [self.local],
+            self.generation, generation_ttl=0)
+        self.icons = LRUBackend(10)
+
+    def get_update(self, *args):
+        update = theme_update.ThemeUpdate(*args, cache=self.cache,
+                                          icons=self.icons)
+        update.cursor = connection.cursor()
+        return update
+
+    def test_cached_response(self):
+        output = self.get_update('en-US', 15663).get_json()
+        assert json.loads(output)['id'] == '15663'
+
+        # A cache hit doesn't touch the database at all.
+        update = theme_update.ThemeUpdate('en-US', 15663, cache=self.cache)
+        assert update.get_json() == output
+        assert update.conn is None and update.cursor is None
+
+    def test_key_includes_request(self):
+        key = self.get_update('en-US', 15663).get_cache_key()
+        assert self.get_update('fr', 15663).get_cache_key() != key
+        assert self.get_update('en-US', 15663, 'src=gp').get_cache_key() != (
+            key)
+
+    def test_generation_invalidates(self):
+        key = self.get_update('en-US', 15663).get_cache_key()
+        self.generation.generation += 1
+        assert self.get_update('en-US', 15663).get_cache_key() != key
+
+    def test_not_found_cached(self):
+        assert self.get_update('en-US', 999).get_json() is None
+        update = theme_update.ThemeUpdate('en-US', 999, cache=self.cache)
+        assert update.get_json() is None
+        assert update.cursor is None
+
+    @mock.patch.object(theme_update.ThemeUpdate, 'read_base64_icon')
+    def test_icon_stored(self, read_base64_icon):
+        read_base64_icon.return_value = 'aWNvbg=='
+        data = json.loads(self.get_update('en-US', 15663).get_json())
+        assert data['dataurl'] == 'aWNvbg=='
+        data = json.loads(self.get_update('fr', 15663).get_json())
+        assert data['dataurl'] == 'aWNvbg=='
+        assert read_base64_icon.call_count == 1
+
+    def test_locale_fallback(self):
+        update = self.get_update('fr', 15663)
+        data = json.loads(update.get_json())
+        assert data['name'] == 'My Persona'
+        assert data['detailURL'].endswith('/en-US/addon/a15663/')
+
+    def test_clear_theme_update_cache(self):
+        cache.set('theme_update:generation', 1)
+        Addon.objects.get().save()
+        assert cache.get('theme_update:generation') > 1
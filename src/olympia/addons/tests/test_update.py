@@ -2,6 +2,7 @@
 from datetime import datetime, timedelta
 from email import utils
 
+from django.core.cache import cache
 from django.db import connection
 
 from olympia import amo
@@ -13,6 +14,7 @@ from olympia.files.models import File
 from olympia.versions.models import ApplicationsVersions, Version
 
 from services import update
+from services.cache import LRUBackend, ResponseCache
 
 
 class VersionCheckMixin(object):
@@ -23,6 +25,16 @@ class VersionCheckMixin(object):
         return up
 
 
+class UpdateIndexMixin(VersionCheckMixin):
+    """Answers the same checks from an UpdateIndex instead of SQL."""
+
+    def get(self, data):
+        up = super(UpdateIndexMixin, self).get(data)
+        up.index = update.UpdateIndex()
+        up.index.load(connection.cursor())
+        return up
+
+
 class TestDataValidate(VersionCheckMixin, TestCase):
     fixtures = ['base/addon_3615', 'base/appversion']
 
@@ -863,3 +875,163 @@ class TestFirefoxHotfix(VersionCheckMixin, TestCase):
         up = self.get(self.data)
         rdf = up.get_rdf()
         assert rdf.find('20202020.01') > -1
+
+
+class TestLookupIndex(UpdateIndexMixin, TestLookup):
+    pass
+
+
+class TestDefaultToCompatIndex(UpdateIndexMixin, TestDefaultToCompat):
+    pass
+
+
+class TestFirefoxHotfixIndex(UpdateIndexMixin, TestFirefoxHotfix):
+    pass
+
+
+class TestUpdateIndex(TestCase):
+    fixtures = ['base/addon_3615']
+
+    def setUp(self):
+        super(TestUpdateIndex, self).setUp()
+        self.index = update.UpdateIndex()
+        self.index.load(connection.cursor())
+        self.data = {
+            'id': '{2fa4ed95-0317-4c6a-a74c-5f3e3912c1f9}',
+            'version': '2.0.58',
+            'reqVersion': 1,
+            'appID': '{ec8030f7-c20a-464f-9b0e-13a3a9e97384}',
+            'appVersion': '3.7a1pre',
+        }
+
+    def get_rdf(self, index, compat_mode):
+        up = update.Update(self.data, compat_mode, index=index)
+        if index is None:
+            up.cursor = connection.cursor()
+        return up.get_rdf()
+
+    def test_same_rdf_as_sql(self):
+        for mode in ('strict', 'normal', 'ignore'):
+            assert self.get_rdf(self.index, mode) == self.get_rdf(None, mode)
+
+    def test_guid_case_insensitive(self):
+        self.data['id'] = self.data['id'].upper()
+        assert self.index.get_addon(self.data['id'])[0] == 3615
+
+    def test_disabled_addon_not_indexed(self):
+        Addon.objects.get(pk=3615).update(status=amo.STATUS_DISABLED)
+        self.index.load(connection.cursor())
+        assert self.index.get_addon(self.data['id']) is None
+
+    def test_watermark_moves(self):
+        watermark = self.index.get_watermark(connection.cursor())
+        File.objects.get(pk=67442).update(
+            modified=datetime.now() + timedelta(days=1))
+        assert self.index.get_watermark(connection.cursor()) != watermark
+
+    def test_disabled_by_default(self):
+        assert update.get_update_index() is None
+
+
+class FakeGenerationBackend(object):
+
+    def __init__(self):
+        self.generation = 1
+
+    def get_generation(self, key):
+        return self.generation
+
+
+class TestResponseCache(TestCase):
+    fixtures = ['base/addon_3615']
+
+    def setUp(self):
+        super(TestResponseCache, self).setUp()
+        self.local, self.shared = LRUBackend(10), LRUBackend(10)
+        self.generation = FakeGenerationBackend()
+        self.cache = ResponseCache(
+            'update', 'update:generation', [self.local, self.shared],
+            self.generation, generation_ttl=0)
+        self.data = {
+            'id': '{2fa4ed95-0317-4c6a-a74c-5f3e3912c1f9}',
+            'version': '2.0.58',
+            'reqVersion': 1,
+            'appID': '{ec8030f7-c20a-464f-9b0e-13a3a9e97384}',
+            'appVersion': '3.7a1pre',
+        }
+
+    def get(self):
+        up = update.Update(self.data, cache=self.cache)
+        up.cursor = connection.cursor()
+        return up
+
+    def test_lru_evicts_least_recently_used(self):
+        lru = LRUBackend(2)
+        lru.set('a', 1, 60)
+        lru.set('b', 2, 60)
+        lru.get('a')
+        lru.set('c', 3, 60)
+        assert lru.get('a') == 1
+        assert lru.get('b') is None
+        assert lru.get('c') == 3
+
+    def test_lru_expires(self):
+        lru = LRUBackend(2)
+        lru.set('a', 1, -1)
+        assert lru.get('a') is None
+
+    def test_shared_hit_fills_local(self):
+        self.shared.set('foo', 'bar', 60)
+        assert self.cache.get('foo') == 'bar'
+        assert self.local.get('foo') == 'bar'
+
+    def test_cached_response(self):
+        rdf = self.get().get_rdf()
+        assert rdf == self.local.get(self.get().get_cache_key())
+
+        # A cache hit doesn't touch the database at all.
+        up = update.Update(self.data, cache=self.cache)
+        assert up.get_rdf() == rdf
+        assert up.conn is None and up.cursor is None
+
+    def test_malformed_request_not_cached(self):
+        del self.data['reqVersion']
+        up = self.get()
+        assert up.get_rdf() == update.bad_rdf
+        assert self.local.get(up.get_cache_key()) is None
+
+        # Valid requests with the same key still get the real answer, and
+        # it isn't served to malformed requests.
+        self.data['reqVersion'] = 1
+        rdf = self.get().get_rdf()
+        assert rdf != update.bad_rdf
+        del self.data['reqVersion']
+        assert self.get().get_rdf() == update.bad_rdf
+
+    def test_key_includes_request(self):
+        key = self.get().get_cache_key()
+        self.data['appOS'] = amo.PLATFORM_LINUX.api_name
+        assert self.get().get_cache_key() != key
+
+    def test_generation_invalidates(self):
+        key = self.get().get_cache_key()
+        self.generation.generation += 1
+        assert self.get().get_cache_key() != key
+
+    def test_signals_bump_generation(self):
+        cache.set('update:generation', 1)
+        Version.objects.get(pk=81551).save()
+        assert cache.get('update:generation') == 2
+        File.objects.get(pk=67442).update(hash='abc')
+        assert cache.get('update:generation') == 3
+
+    def test_signals_ignore_unread_fields(self):
+        cache.set('update:generation', 1)
+        addon = Addon.objects.get(pk=3615)
+        addon.update(average_daily_users=123, bayesian_rating=4.5)
+        File.objects.get(pk=67442).save(update_fields=['size'])
+        assert cache.get('update:generation') == 1
+        addon.update(status=amo.STATUS_DISABLED)
+        assert cache.get('update:generation') == 2
+        Version.objects.get(pk=81551).save(update_fields=['addon_id'])
+        assert cache.get('update:generation') == 3
@@ -1,6 +1,12 @@
+from django.core.cache import cache
+
+import mock
+
 from olympia import amo
-from olympia.addons.models import Category
-from olympia.addons.utils import get_featured_ids, get_creatured_ids
+from olympia.addons.models import Addon, Category
+from olympia.addons.utils import (
+    build_featured_ids, FEATURED_IDS_TIMEOUT, FEATURED_IDS_VERSION_KEY,
+    get_featured_ids, get_creatured_ids)
 from olympia.amo.tests import addon_factory, collection_factory, TestCase
 from olympia.bandwagon.models import FeaturedCollection
 from olympia.constants.categories import CATEGORIES_BY_ID
@@ -40,6 +46,47 @@ class TestGetFeaturedIds(TestCase):
         ids = get_featured_ids(amo.FIREFOX, 'en-US')
         assert (ids[0],) == self.en_us_locale
 
+    def test_no_queries_once_built(self):
+        get_featured_ids(amo.FIREFOX)
+        with self.assertNumQueries(0):
+            assert set(get_featured_ids(amo.FIREFOX, 'en-US')) == (
+                set(self.no_locale + self.en_us_locale))
+            assert set(get_creatured_ids(22, 'en-US')) == set([1001, 3481])
+
+    @mock.patch('olympia.addons.utils.cache')
+    def test_store_expires(self, cache_mock):
+        build_featured_ids()
+        for call in cache_mock.set.call_args_list:
+            assert call[0][2] == FEATURED_IDS_TIMEOUT
+
+    def test_rebuilt_when_lost(self):
+        get_featured_ids(amo.FIREFOX)
+        cache.delete(FEATURED_IDS_VERSION_KEY)
+        assert set(get_featured_ids(amo.FIREFOX)) == set(self.all_locales)
+
+    def test_rebuilt_on_featured_collection_changes(self):
+        get_featured_ids(amo.FIREFOX)
+        addon = addon_factory()
+        collection = collection_factory()
+        collection.add_addon(addon)
+        featured = FeaturedCollection.objects.create(
+            application=amo.FIREFOX.id, collection=collection)
+        assert addon.id in get_featured_ids(amo.FIREFOX)
+
+        other = addon_factory()
+        collection.add_addon(other)
+        assert other.id in get_featured_ids(amo.FIREFOX)
+        collection.remove_addon(other)
+        assert other.id not in get_featured_ids(amo.FIREFOX)
+
+        featured.delete()
+        assert addon.id not in get_featured_ids(amo.FIREFOX)
+
+    def test_rebuilt_on_addon_changes(self):
+        assert 1001 in get_featured_ids(amo.FIREFOX)
+        Addon.objects.get(pk=1001).update(disabled_by_user=True)
+        assert 1001 not in get_featured_ids(amo.FIREFOX)
+
 
 class TestGetCreaturedIds(TestCase):
     fixtures = ['addons/featured', 'bandwagon/featured_collections',
@@ -19,6 +19,7 @@ from olympia.amo.tests import APITestClient, ESTestCase, TestCase
 from olympia.amo.helpers import numberfmt, urlparams
 from olympia.amo.tests import addon_factory, version_factory
 from olympia.amo.urlresolvers import reverse
+from olympia.addons.indexers import AddonIndexer
 from olympia.addons.utils import generate_addon_guid
 from olympia.abuse.models import AbuseReport
 from olympia.addons.models import (
@@ -2809,6 +2810,39 @@ class TestAddonFeaturedView(TestCase):
         assert data['results'][0]['id'] == addon1.pk
         assert data['results'][1]['id'] == addon2.pk
 
+    @patch('olympia.addons.views.get_featured_ids')
+    def test_invalid_addons_skipped(self, get_featured_ids_mock):
+        addon1 = addon_factory()
+        addon2 = addon_factory(disabled_by_user=True)
+        addon3 = addon_factory()
+        get_featured_ids_mock.return_value = [addon3.pk, addon2.pk, addon1.pk]
+
+        response = self.client.get(self.url, {'app': 'firefox'})
+        assert response.status_code == 200
+        data = json.loads(response.content)
+        assert [result['id'] for result in data['results']] == [
+            addon3.pk, addon1.pk]
+
+    @patch('olympia.addons.views.get_featured_ids')
+    def test_from_index(self, get_featured_ids_mock):
+        addon1 = addon_factory()
+        addon2 = addon_factory()
+        get_featured_ids_mock.return_value = [addon1.pk, addon2.pk]
+        docs = AddonIndexer.get_documents([addon1.pk, addon2.pk])
+
+        with patch('olympia.amo.indexers.amo_search.get_es') as get_es:
+            get_es.return_value.mget.return_value = {'docs': [
+                {'_id': str(pk), 'found': True, '_source': doc}
+                for pk, doc in docs.items()]}
+            with patch.object(AddonIndexer, 'extract_document') as extract:
+                response = self.client.get(self.url, {'app': 'firefox'})
+                assert not extract.called
+        assert response.status_code == 200
+        data = json.loads(response.content)
+        assert [result['id'] for result in data['results']] == [
+            addon1.pk, addon2.pk]
+        assert data['results'][0]['name'] == unicode(addon1.name)
+
 
 class TestStaticCategoryView(TestCase):
     client_class = APITestClient
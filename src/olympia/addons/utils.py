@@ -1,12 +1,14 @@
+import collections
+import itertools
 import uuid
 import logging
 import random
 
-from django.db.models import Q
+from django.core.cache import cache
 
 import commonware.log
-from cache_nuggets.lib import memoize
 
+from olympia import amo
 from olympia.constants.categories import CATEGORIES_BY_ID
 
 
@@ -18,72 +20,180 @@ def generate_addon_guid():
     return '{%s}' % str(uuid.uuid4())
 
 
-@memoize('addons:featured', time=60 * 10)
-def get_featured_ids(app, lang=None, type=None):
-    from olympia.addons.models import Addon
-    ids = []
-    is_featured = (Q(collections__featuredcollection__isnull=False) &
-                   Q(collections__featuredcollection__application=app.id))
-    qs = Addon.objects.valid()
-
-    if type:
-        qs = qs.filter(type=type)
-    if lang:
-        has_locale = qs.filter(
-            is_featured &
-            Q(collections__featuredcollection__locale__iexact=lang))
-        if has_locale.exists():
-            ids += list(has_locale.distinct().values_list('id', flat=True))
-        none_qs = qs.filter(
-            is_featured &
-            Q(collections__featuredcollection__locale__isnull=True))
-        blank_qs = qs.filter(is_featured &
-                             Q(collections__featuredcollection__locale=''))
-        qs = none_qs | blank_qs
+# The featured add-ons store, see `build_featured_ids`. Each process keeps its
+# own copy until the version stored in memcached changes.
+FEATURED_IDS_KEY = 'addons:featured-ids'
+FEATURED_IDS_VERSION_KEY = 'addons:featured-ids:version'
+# The store is rebuilt when something changes, but not every write goes
+# through the signals: it expires anyway, like the old memoized lists did.
+FEATURED_IDS_TIMEOUT = 60 * 10
+_featured = {'version': None, 'data': None, 'lists': {}}
+
+
+def build_featured_ids():
+    """
+    Rebuild the featured add-ons store: the add-ons of every featured
+    collection, with what is needed to filter them by application, locale,
+    type, status and category. It's rebuilt by the
+    `addons.tasks.rebuild_featured_ids` task whenever featured collections
+    or their add-ons change, and when it expires, so that `get_featured_ids`
+    and `get_creatured_ids` almost never hit the database.
+
+    Returns the version and the data stored.
+    """
+    from olympia.amo.models import skip_cache, use_master
+
+    # Read from the master, and not from cache-machine, to never store
+    # stale data.
+    with use_master(), skip_cache():
+        data = _get_featured_data()
+    version = uuid.uuid4().hex
+    cache.set(FEATURED_IDS_KEY, (version, data), FEATURED_IDS_TIMEOUT)
+    cache.set(FEATURED_IDS_VERSION_KEY, version, FEATURED_IDS_TIMEOUT)
+    log.info('Built the featured add-ons store %s: %s add-ons in %s '
+             'collections.' % (version, len(data['addons']),
+                               len(data['collections'])))
+    return version, data
+
+
+def _get_featured_data():
+    from olympia.addons.models import Addon, AddonCategory
+    from olympia.bandwagon.models import CollectionAddon, FeaturedCollection
+
+    featured = list(FeaturedCollection.objects.values_list(
+        'collection', 'application', 'locale'))
+    collection_addons = {}
+    for collection_id, addon_id in CollectionAddon.objects.filter(
+            collection__in=set(c for c, app, locale in featured)).values_list(
+            'collection', 'addon'):
+        collection_addons.setdefault(collection_id, []).append(addon_id)
+    addon_ids = set(itertools.chain(*collection_addons.values()))
+
+    # Deleted add-ons are left out, like Addon.objects does.
+    addons = dict(
+        (pk, (type_, status, disabled_by_user, current_version is not None,
+              set()))
+        for pk, type_, status, disabled_by_user, current_version in
+        Addon.objects.filter(id__in=addon_ids).values_list(
+            'id', 'type', 'status', 'disabled_by_user', '_current_version'))
+    for addon_id, category_id in AddonCategory.objects.filter(
+            addon__in=addons).values_list('addon', 'category'):
+        addons[addon_id][-1].add(category_id)
+
+    return {
+        'collections': [
+            (collection_id, app, locale,
+             [pk for pk in collection_addons.get(collection_id, [])
+              if pk in addons])
+            for collection_id, app, locale in featured],
+        'addons': addons,
+    }
+
+
+def get_featured_store():
+    """
+    The featured add-ons store of this process, fetched again from memcached
+    when its version changed, and rebuilt if it's missing from memcached.
+    """
+    version = cache.get(FEATURED_IDS_VERSION_KEY)
+    if version is None or version != _featured['version']:
+        stored = cache.get(FEATURED_IDS_KEY)
+        if version is None or stored is None or stored[0] != version:
+            stored = build_featured_ids()
+        _featured.update(version=stored[0], data=stored[1], lists={})
+    return _featured
+
+
+def is_in_featured_store(addon_id=None, collection_id=None):
+    """
+    If the add-on or the collection is part of the featured add-ons store.
+    The store isn't built when missing: there's nothing to rebuild then.
+    """
+    version = cache.get(FEATURED_IDS_VERSION_KEY)
+    if version is None:
+        return False
+    if version == _featured['version']:
+        data = _featured['data']
     else:
-        qs = qs.filter(is_featured)
-    other_ids = list(qs.distinct().values_list('id', flat=True))
-    random.shuffle(ids)
-    random.shuffle(other_ids)
-    ids += other_ids
-    return map(int, ids)
+        stored = cache.get(FEATURED_IDS_KEY)
+        if stored is None:
+            return False
+        data = stored[1]
+    if addon_id is not None:
+        return addon_id in data['addons']
+    return any(collection[0] == collection_id
+               for collection in data['collections'])
+
+
+def _get_featured_lists(key, func):
+    """
+    Compute the (per_locale, others) lists of add-on ids for `key` once per
+    version of the featured add-ons store, and shuffle them on every read.
+    """
+    store = get_featured_store()
+    if key not in store['lists']:
+        store['lists'][key] = func(store['data'])
+    per_locale, others = map(list, store['lists'][key])
+    random.shuffle(per_locale)
+    random.shuffle(others)
+    return per_locale + others
+
+
+def _distinct(ids):
+    return list(collections.OrderedDict.fromkeys(ids))
+
+
+def get_featured_ids(app, lang=None, type=None):
+    def is_valid(addon):
+        type_, status, disabled_by_user, has_version, categories = addon
+        return (status in amo.VALID_ADDON_STATUSES and
+                not disabled_by_user and has_version and
+                (not type or type_ == type))
+
+    def build(data):
+        per_locale, others = [], []
+        for collection_id, app_id, locale, addon_ids in data['collections']:
+            if app_id != app.id:
+                continue
+            addon_ids = [pk for pk in addon_ids
+                         if is_valid(data['addons'][pk])]
+            if not lang:
+                others.extend(addon_ids)
+            elif locale and locale.lower() == lang.lower():
+                per_locale.extend(addon_ids)
+            elif not locale:
+                others.extend(addon_ids)
+        return _distinct(per_locale), _distinct(others)
+
+    return _get_featured_lists(('featured', app.id, lang, type), build)
 
 
-@memoize('addons:creatured', time=60 * 10)
 def get_creatured_ids(category, lang=None):
-    from olympia.addons.models import Addon
-    from olympia.bandwagon.models import FeaturedCollection
     if lang:
         lang = lang.lower()
-    per_locale = set()
     if isinstance(category, int):
         category = CATEGORIES_BY_ID[category]
     app_id = category.application
 
-    others = (Addon.objects.public()
-              .filter(
-                  Q(collections__featuredcollection__locale__isnull=True) |
-                  Q(collections__featuredcollection__locale=''),
-                  collections__featuredcollection__isnull=False,
-                  collections__featuredcollection__application=app_id,
-                  category=category.id)
-              .distinct()
-              .values_list('id', flat=True))
-
-    if lang is not None and lang != '':
-        possible_lang_match = FeaturedCollection.objects.filter(
-            locale__icontains=lang,
-            application=app_id,
-            collection__addons__category=category.id).distinct()
-        for fc in possible_lang_match:
-            if lang in fc.locale.lower().split(','):
-                per_locale.update(
-                    fc.collection.addons
-                    .filter(category=category.id)
-                    .values_list('id', flat=True))
-
-    others = list(others)
-    per_locale = list(per_locale)
-    random.shuffle(others)
-    random.shuffle(per_locale)
-    return map(int, filter(None, per_locale + others))
+    def is_public(addon):
+        type_, status, disabled_by_user, has_version, categories = addon
+        return (status == amo.STATUS_PUBLIC and not disabled_by_user and
+                has_version)
+
+    def build(data):
+        per_locale, others = set(), []
+        for collection_id, collection_app, locale, addon_ids in (
+                data['collections']):
+            if collection_app != app_id:
+                continue
+            addon_ids = [pk for pk in addon_ids
+                         if category.id in data['addons'][pk][-1]]
+            if not locale:
+                others.extend(pk for pk in addon_ids
+                              if is_public(data['addons'][pk]))
+            elif lang and lang in locale.lower().split(','):
+                per_locale.update(addon_ids)
+        return list(per_locale), _distinct(others)
+
+    return map(int, filter(None, _get_featured_lists(
+        ('creatured', category.id, lang), build)))
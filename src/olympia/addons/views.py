@@ -820,15 +820,14 @@ class AddonSearchView(ListAPIView):
 class AddonFeaturedView(GenericAPIView):
     authentication_classes = []
     permission_classes = []
-    serializer_class = AddonSerializer
+    # The add-ons are fetched from ES by id, see get_queryset().
+    serializer_class = ESAddonSerializer
     # We accept the 'page_size' parameter but we do not allow pagination for
     # this endpoint since the order is random.
     pagination_class = None
-    queryset = Addon.objects.valid()
 
     def get(self, request, *args, **kwargs):
-        queryset = self.filter_queryset(self.get_queryset())
-        serializer = self.get_serializer(queryset, many=True)
+        serializer = self.get_serializer(self.get_queryset(), many=True)
 
         # Simulate pagination-like results, without actual pagination.
         return Response({'results': serializer.data})
@@ -838,7 +837,7 @@ class AddonFeaturedView(GenericAPIView):
         view = super(AddonFeaturedView, cls).as_view(**kwargs)
         return non_atomic_requests(view)
 
-    def filter_queryset(self, queryset):
+    def get_queryset(self):
         # We can pass the optional lang parameter to either get_creatured_ids()
         # or get_featured_ids() below to get locale-specific results in
         # addition to the generic ones.
@@ -871,15 +870,17 @@ class AddonFeaturedView(GenericAPIView):
                     'Invalid app, category and/or type parameter(s).')
             ids = get_featured_ids(app, lang=lang, type=type_)
         # ids is going to be a random list of ids, we just slice it to get
-        # the number of add-ons that was requested. We do it before calling
-        # manual_order(), since it'll use the ids as part of a id__in filter.
+        # the number of add-ons that was requested. We do it before fetching
+        # the documents, since it'll use the ids for a single mget.
         try:
             page_size = int(
                 self.request.GET.get('page_size', api_settings.PAGE_SIZE))
         except ValueError:
             raise ParseError('Invalid page_size parameter')
         ids = ids[:page_size]
-        return manual_order(queryset, ids, 'addons.id')
+        # The documents come back in the order of ids, keeping only the valid
+        # add-ons, like Addon.objects.valid() would.
+        return AddonIndexer.get_valid_documents(ids)
 
 
 class StaticCategoryView(ListAPIView):
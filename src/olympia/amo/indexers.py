@@ -2,6 +2,10 @@ import logging
 
 from django.conf import settings
 
+from elasticsearch.exceptions import ElasticsearchException
+from elasticsearch.serializer import JSONSerializer
+
+from olympia.amo import search as amo_search
 from olympia.constants.search import SEARCH_ANALYZER_MAP
 
 from .models import SearchMixin
@@ -10,6 +14,8 @@ from .utils import to_language
 
 log = logging.getLogger('z.es')
 
+serializer = JSONSerializer()
+
 
 class BaseSearchIndexer(object):
     """
@@ -36,6 +42,46 @@ class BaseSearchIndexer(object):
         use the db table from the corresponding model."""
         return cls.get_model()._meta.db_table
 
+    @classmethod
+    def get_documents(cls, ids, objects=None, transforms=None):
+        """
+        Return a dict of the documents for `ids`, keyed by id, fetched from
+        the index with a single mget.
+
+        Documents missing from the index are extracted from the `objects`
+        manager (with the `transforms` the indexing task would apply) and go
+        through the same JSON serialization as indexed ones, so that callers
+        get the same dicts either way.
+        """
+        docs = {}
+        if not ids:
+            return docs
+        try:
+            response = amo_search.get_es().mget(
+                body={'ids': ids}, index=cls.get_index_alias(),
+                doc_type=cls.get_doctype_name())
+        except ElasticsearchException, e:
+            log.error('Error fetching %s documents: %s' % (
+                cls.get_doctype_name(), e))
+            response = {}
+        for doc in response.get('docs', []):
+            if doc.get('found'):
+                docs[int(doc['_id'])] = doc['_source']
+
+        missing = [pk for pk in ids if pk not in docs]
+        if missing:
+            log.info('Extracting %s %s documents missing from the index.' % (
+                len(missing), cls.get_doctype_name()))
+            if objects is None:
+                objects = cls.get_model().objects
+            qs = objects.no_cache().filter(id__in=missing)
+            for transform in transforms or []:
+                qs = qs.transform(transform)
+            for obj in qs:
+                docs[obj.id] = serializer.loads(
+                    serializer.dumps(cls.extract_document(obj)))
+        return docs
+
     @classmethod
     def attach_translation_mappings(cls, mapping, field_names):
         """
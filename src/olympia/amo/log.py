@@ -626,4 +626,9 @@ def log(action, *args, **kw):
 
     # Index by every user
     UserLog(activity_log=al, user=user).save()
+
+    if 'created' in kw:
+        # The lookup tables keep a copy of the date to order the logs by.
+        for model in (AddonLog, UserLog, VersionLog):
+            model.objects.filter(activity_log=al).update(created=al.created)
     return al
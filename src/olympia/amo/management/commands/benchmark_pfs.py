@@ -0,0 +1,77 @@
+import re
+import time
+from collections import defaultdict
+from optparse import make_option
+from string import Template
+
+from django.core.management.base import BaseCommand
+
+import jinja2
+
+from services import pfs
+
+
+HELP = """\
+Measure the CPU time per plugin finder request of the precompiled responses
+against matching the mimetype with regexps and filling the template for each
+request, as it used to be done.
+
+    `./manage.py benchmark_pfs --requests=100000`
+"""
+
+quicktime_re = re.compile(r'^image/(pict|png|tiff|x-(macpaint|pict|png|'
+                          r'quicktime|sgi|targa|tiff))$')
+java_re = re.compile(r'^application/x-java-.*$')
+
+
+def legacy_get_output(data):
+    """pfs.get_output as it was before the precompiled responses."""
+    g = defaultdict(str, [(k, jinja2.escape(v)) for k, v in data.iteritems()])
+    plugin = dict(mimetype=g['mimetype'] or '-1', name='-1',
+                  manualInstallationURL='')
+    output = Template(pfs.xml_template)
+    for s in pfs.REQUIRED:
+        if s not in data:
+            return output.substitute(plugin)
+    if g['mimetype'] in ['application/x-shockwave-flash',
+                         'application/futuresplash']:
+        plugin.update(pfs.FLASH)
+    elif g['mimetype'] == 'application/x-director':
+        plugin.update(pfs.SHOCKWAVE)
+    elif quicktime_re.match(g['mimetype']):
+        plugin.update(pfs.QUICKTIME)
+    elif java_re.match(g['mimetype']):
+        plugin.update(pfs.JAVA)
+    return output.substitute(plugin)
+
+
+# Roughly the mix of mimetypes Firefox asks about.
+MIMETYPES = (['application/x-shockwave-flash'] * 6 +
+             ['application/x-java-applet', 'image/png',
+              'application/x-director', 'application/x-unknown-plugin'])
+
+
+class Command(BaseCommand):
+    option_list = BaseCommand.option_list + (
+        make_option('--requests', type='int', default=100000,
+                    help='Number of requests per scenario.'),
+    )
+    help = HELP
+
+    def handle(self, *args, **kw):
+        count = kw['requests']
+        queries = [dict(mimetype=mimetype, appID='{ec8030f7-c20a-464f-9b0e-'
+                        '13a3a9e97384}', appVersion='20100101',
+                        clientOS='Windows NT 6.1', chromeLocale='en-US')
+                   for mimetype in MIMETYPES]
+        for data in queries:
+            assert pfs.get_output(data) == legacy_get_output(data)
+
+        self.stdout.write('%-14s %14s' % ('scenario', 'cpu us/req'))
+        for name, func in (('template', legacy_get_output),
+                           ('precompiled', pfs.get_output)):
+            start = time.clock()
+            for i in xrange(count):
+                func(queries[i % len(queries)])
+            cpu = (time.clock() - start) * 1000000 / count
+            self.stdout.write('%-14s %14.2f' % (name, cpu))
@@ -393,7 +393,8 @@ class ModelBase(SearchMixin, caching.base.CachingMixin, models.Model):
         objects.filter(pk=self.pk).update(**kw)
         if signal:
             models.signals.post_save.send(sender=cls, instance=self,
-                                          created=False)
+                                          created=False,
+                                          update_fields=frozenset(kw))
 
     def save(self, **kwargs):
         # Unfortunately we have to save our translations before we call `save`
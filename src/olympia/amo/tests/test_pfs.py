@@ -14,3 +14,25 @@ class TestPfs(TestCase):
                   'licenseURL', 'needsRestart']:
             res = get_output({k: 'fooo<script>alert("foo")</script>;'})
             assert not pq(res)('script')
+
+    def test_plugins(self):
+        data = dict(appID='{ec8030f7-c20a-464f-9b0e-13a3a9e97384}',
+                    appVersion='20100101', clientOS='Windows NT 6.1',
+                    chromeLocale='en-US')
+        for mimetype, name in (
+                ('application/x-shockwave-flash', 'Adobe Flash Player'),
+                ('application/x-director', 'Adobe Shockwave Player'),
+                ('image/x-png', 'Apple Quicktime'),
+                ('image/png\n', 'Apple Quicktime'),
+                ('application/x-java-vm', 'Java Runtime Environment'),
+                ('application/x-javax', '-1'),
+                ('image/png2', '-1')):
+            res = get_output(dict(data, mimetype=mimetype))
+            assert '<pfs:name>%s</pfs:name>' % name in res
+            assert ('<pfs:requestedMimetype>%s</pfs:requestedMimetype>'
+                    % mimetype) in res
+
+    def test_missing_parameter(self):
+        res = get_output({'mimetype': 'application/x-director'})
+        assert '<pfs:name>-1</pfs:name>' in res
+        assert 'plugin-results:application/x-director"' in res
@@ -653,6 +653,24 @@ def cache_ns_key(namespace, increment=False):
     return '%s:%s' % (ns_val, ns_key)
 
 
+def cache_ns_keys(namespaces):
+    """
+    Like `cache_ns_key` for many namespaces at once, returning a dict of
+    namespace to key and using a single cache round trip when they are all
+    set already.
+    """
+    ns_keys = dict((namespace, 'ns:%s' % namespace)
+                   for namespace in namespaces)
+    ns_vals = cache.get_many(ns_keys.values())
+    missing = dict((ns_key, epoch(datetime.datetime.now()))
+                   for ns_key in ns_keys.values() if ns_key not in ns_vals)
+    if missing:
+        cache.set_many(missing, None)
+        ns_vals.update(missing)
+    return dict((namespace, '%s:%s' % (ns_vals[ns_key], ns_key))
+                for namespace, ns_key in ns_keys.items())
+
+
 def get_email_backend(real_email=False):
     """Get a connection to an email backend.
 
@@ -1,5 +1,7 @@
 from datetime import datetime
 
+from django.db.models import Model
+
 from elasticsearch_dsl.result import Result
 from rest_framework.serializers import ModelSerializer
 
@@ -47,7 +49,12 @@ class BaseESSerializer(ModelSerializer):
         if isinstance(data, Result):
             data = data.to_dict()
 
-        obj = self.fake_object(data)
+        # Objects already faked from ES data (e.g. by a parent serializer
+        # that needed them) are used as they are.
+        if isinstance(data, Model):
+            obj = data
+        else:
+            obj = self.fake_object(data)
         return super(BaseESSerializer, self).to_representation(obj)
 
     def fake_object(self, data):
@@ -15,6 +15,7 @@ from olympia import amo
 from olympia.amo.models import ManagerBase, ModelBase
 from olympia.access import acl
 from olympia.addons.models import Addon
+from olympia.addons.utils import is_in_featured_store
 from olympia.amo.helpers import absolutify, user_media_path, user_media_url
 from olympia.amo.urlresolvers import reverse
 from olympia.amo.utils import sorted_groupby
@@ -529,6 +530,31 @@ class FeaturedCollection(ModelBase):
                                  self.locale)
 
 
+def update_featured_ids(sender, instance, **kw):
+    """Rebuild the featured add-ons store when featured collections change."""
+    if kw.get('raw'):
+        return
+    if sender == CollectionAddon and not is_in_featured_store(
+            collection_id=instance.collection_id):
+        return
+    from olympia.addons import tasks
+    tasks.rebuild_featured_ids.delay()
+
+
+models.signals.post_save.connect(update_featured_ids,
+                                 sender=FeaturedCollection,
+                                 dispatch_uid='featured_coll.featured_ids')
+models.signals.post_delete.connect(update_featured_ids,
+                                   sender=FeaturedCollection,
+                                   dispatch_uid='featured_coll.featured_ids')
+models.signals.post_save.connect(update_featured_ids,
+                                 sender=CollectionAddon,
+                                 dispatch_uid='coll_addon.featured_ids')
+models.signals.post_delete.connect(update_featured_ids,
+                                   sender=CollectionAddon,
+                                   dispatch_uid='coll_addon.featured_ids')
+
+
 class MonthlyPick(ModelBase):
     addon = models.ForeignKey(Addon)
     blurb = models.TextField()
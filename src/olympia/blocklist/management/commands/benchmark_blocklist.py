@@ -0,0 +1,65 @@
+import time
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+from django.test.client import RequestFactory
+
+from olympia import amo
+from olympia.blocklist import views
+
+
+HELP = """\
+Measure the bytes sent and the CPU time spent per blocklist request for a
+full download, a conditional request answered with a 304, and a JSON delta.
+
+    `./manage.py benchmark_blocklist --requests=200`
+"""
+
+
+class Command(BaseCommand):
+    option_list = BaseCommand.option_list + (
+        make_option('--requests', type='int', default=100,
+                    help='Number of requests per scenario.'),
+        make_option('--since', type='int', default=None,
+                    help='last_update (in milliseconds) to compute the JSON '
+                         'delta from. Defaults to one day ago.'),
+    )
+    help = HELP
+
+    def handle(self, *args, **kw):
+        factory = RequestFactory()
+        count = kw['requests']
+        since = kw['since'] or int((time.time() - 60 * 60 * 24) * 1000)
+        xml_path = '/blocklist/3/%s/50.0/' % amo.FIREFOX.guid
+
+        def xml(**headers):
+            return views.blocklist(factory.get(xml_path, **headers), 3,
+                                   amo.FIREFOX.guid, '50.0')
+
+        def json(data=None, **headers):
+            return views.blocklist_json(
+                factory.get('/blocked/blocklists.json', data, **headers))
+
+        # Warm the documents up, like the pre-rendering task would.
+        etag = xml()['ETag']
+        json_etag = json()['ETag']
+        json({'since': since})
+
+        scenarios = [
+            ('xml full', xml),
+            ('xml full (gzip)', lambda: xml(HTTP_ACCEPT_ENCODING='gzip')),
+            ('xml 304', lambda: xml(HTTP_IF_NONE_MATCH=etag)),
+            ('json full', json),
+            ('json full (gzip)', lambda: json(HTTP_ACCEPT_ENCODING='gzip')),
+            ('json 304', lambda: json(HTTP_IF_NONE_MATCH=json_etag)),
+            ('json delta', lambda: json({'since': since})),
+        ]
+        self.stdout.write('%-20s %12s %14s' % ('scenario', 'bytes/req',
+                                               'cpu ms/req'))
+        for name, func in scenarios:
+            start = time.clock()
+            for i in range(count):
+                response = func()
+            cpu = (time.clock() - start) * 1000 / count
+            self.stdout.write('%-20s %12d %14.3f' % (
+                name, len(response.content), cpu))
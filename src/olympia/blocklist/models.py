@@ -154,6 +154,21 @@ class BlocklistIssuerCert(BlocklistBase, ModelBase):
         return unicode(self.details.name)
 
 
+class BlocklistRemoval(ModelBase):
+    """
+    A deleted blocklist item or plugin, so that JSON deltas can tell clients
+    to drop it.
+    """
+    block_id = models.CharField(max_length=255, db_index=True)
+    guid = models.CharField(max_length=255, blank=True, null=True)
+
+    class Meta(ModelBase.Meta):
+        db_table = 'blremovals'
+
+    def __unicode__(self):
+        return self.block_id
+
+
 class BlocklistPref(ModelBase):
     """Preferences which should be reset when a blocked item is detected."""
 
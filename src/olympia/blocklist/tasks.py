@@ -0,0 +1,17 @@
+import logging
+
+from olympia.amo.celery import task
+
+from . import views
+
+log = logging.getLogger('z.task')
+
+
+@task
+def build_blocklists(version, **kw):
+    """Pre-render the blocklist documents of generation `version`."""
+    if views.get_keyversion() != version:
+        # The blocklist changed again, a newer task will do the work.
+        return
+    log.info('Building blocklist documents for generation %s.' % version)
+    views.build_all(version)
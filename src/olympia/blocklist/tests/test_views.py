@@ -1,20 +1,26 @@
 # -*- coding: utf-8 -*-
 import base64
+import gzip
+import hashlib
 import json
+from cStringIO import StringIO
 from datetime import datetime
 from pyquery import PyQuery as pq
-from time import sleep
+from time import mktime, sleep
 from xml.dom import minidom
 
 from django.conf import settings
 from django.core.cache import cache
 
+import mock
+
 from olympia import amo
 from olympia.amo.tests import TestCase
 from olympia.amo.urlresolvers import reverse
 from olympia.blocklist.models import (
     BlocklistApp, BlocklistCA, BlocklistDetail, BlocklistGfx, BlocklistItem,
-    BlocklistIssuerCert, BlocklistPlugin, BlocklistPref)
+    BlocklistIssuerCert, BlocklistPlugin, BlocklistPref, BlocklistRemoval)
+from olympia.blocklist import views
 from olympia.blocklist.utils import JSON_DATE_FORMAT
 
 base_xml = """
@@ -169,21 +175,18 @@ class BlocklistItemTest(XMLAssertsMixin, BlocklistViewTest):
         assert self.client.get(self.fx4_url + 'other/junk/').status_code == 200
 
     def test_app_guid(self):
+        def items(url):
+            return self.dom(url).getElementsByTagName('emItem')
+
         # There's one item for Firefox.
-        r = self.client.get(self.fx4_url)
-        assert r.status_code == 200
-        assert len(r.context['items']) == 1
+        assert len(items(self.fx4_url)) == 1
 
         # There are no items for mobile.
-        r = self.client.get(self.mobile_url)
-        assert r.status_code == 200
-        assert len(r.context['items']) == 0
+        assert len(items(self.mobile_url)) == 0
 
         # Without the app constraint we see the item.
         self.app.delete()
-        r = self.client.get(self.mobile_url)
-        assert r.status_code == 200
-        assert len(r.context['items']) == 1
+        assert len(items(self.mobile_url)) == 1
 
     def test_item_guid(self):
         items = self.dom(self.fx4_url).getElementsByTagName('emItem')
@@ -1057,6 +1060,167 @@ class BlocklistIssuerCertTest(BlocklistViewTest):
         assert r.status_code == 200
 
 
+class BlocklistDocumentTest(BlocklistViewTest):
+
+    def setUp(self):
+        super(BlocklistDocumentTest, self).setUp()
+        self.plugin, self.app = self.create_blplugin(
+            app_guid=amo.FIREFOX.guid, app_min='1.0', app_max='3.0',
+            name='flash')
+
+    def key(self, apiver, appver):
+        return views.get_document_key(apiver, amo.FIREFOX.guid, appver,
+                                      views.get_keyversion())
+
+    def test_prebuilt(self):
+        version = views.get_keyversion()
+        assert views.get_document(self.key(3, '4.0'), version)
+        assert views.get_document('blocklist:json', version)
+
+    def test_rebuilt_on_change(self):
+        etag = self.client.get(self.fx4_url)['ETag']
+        self.plugin.update(name='java')
+        response = self.client.get(self.fx4_url)
+        assert response['ETag'] != etag
+        assert 'java' in response.content
+
+    def test_etag(self):
+        response = self.client.get(self.fx4_url)
+        assert response['ETag'] == '"%s"' % (
+            hashlib.sha256(response.content).hexdigest())
+
+    def test_gzip(self):
+        plain = self.client.get(self.json_url)
+        response = self.client.get(self.json_url,
+                                   HTTP_ACCEPT_ENCODING='gzip, deflate')
+        assert response['Content-Encoding'] == 'gzip'
+        assert response['ETag'] == plain['ETag']
+        assert 'Accept-Encoding' in response['Vary']
+        with gzip.GzipFile(fileobj=StringIO(response.content)) as gz:
+            assert gz.read() == plain.content
+
+    def test_same_document_for_api_versions(self):
+        assert self.key(3, '4.0') == self.key(4, '2.0')
+        assert self.key(1, '2.0') == self.key(2, '2.0')
+        assert self.key(2, '2.0') != self.key(3, '2.0')
+
+    def test_appver_buckets(self):
+        assert self.key(2, '2.0') == self.key(2, '2.5')
+        assert self.key(2, '2.0') != self.key(2, '3.0')
+        assert self.key(2, '3.0') != self.key(2, '4.0')
+        assert self.key(2, '0.5') != self.key(2, '1.0')
+
+    def test_appver_filtering(self):
+        url = reverse('blocklist', args=[2, amo.FIREFOX.guid, '2.0'])
+        assert 'flash' in self.client.get(url).content
+        url = reverse('blocklist', args=[2, amo.FIREFOX.guid, '3.0'])
+        assert 'flash' not in self.client.get(url).content
+
+
+class BlocklistConditionalTest(BlocklistViewTest):
+
+    def setUp(self):
+        super(BlocklistConditionalTest, self).setUp()
+        self.item = BlocklistItem.objects.create(guid='guid@addon.com',
+                                                 details=self.details)
+        self.plugin, self.app = self.create_blplugin(
+            name='flash', details=BlocklistDetail.objects.create(
+                name='plugin', who='everyone', why='because',
+                bug='http://bug.url.com/'))
+
+    def test_if_none_match(self):
+        etag = self.client.get(self.fx4_url)['ETag']
+        response = self.client.get(self.fx4_url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+        assert response.content == ''
+        assert response['ETag'] == etag
+
+    def test_if_none_match_changed(self):
+        etag = self.client.get(self.fx4_url)['ETag']
+        self.plugin.update(name='java')
+        response = self.client.get(self.fx4_url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 200
+
+    def test_if_modified_since(self):
+        last_modified = self.client.get(self.fx4_url)['Last-Modified']
+        response = self.client.get(self.fx4_url,
+                                   HTTP_IF_MODIFIED_SINCE=last_modified)
+        assert response.status_code == 304
+
+        response = self.client.get(
+            self.fx4_url,
+            HTTP_IF_MODIFIED_SINCE='Sat, 01 Jan 2000 00:00:00 GMT')
+        assert response.status_code == 200
+
+    def test_if_modified_since_after_deletion(self):
+        gfx = BlocklistGfx.objects.create(guid=amo.FIREFOX.guid)
+        last_modified = self.client.get(self.fx4_url)['Last-Modified']
+        # Deleting doesn't leave anything more recent behind, but the
+        # document is rendered again.
+        later = views.time.time() + 10
+        with mock.patch.object(views.time, 'time', return_value=later):
+            gfx.delete()
+            response = self.client.get(self.fx4_url,
+                                       HTTP_IF_MODIFIED_SINCE=last_modified)
+        assert response.status_code == 200
+
+    def test_json_last_update(self):
+        old = datetime(2010, 1, 1)
+        for model in (BlocklistItem, BlocklistPlugin, BlocklistDetail):
+            model.objects.update(modified=old)
+        views.clear_blocklist()
+        data = json.loads(self.client.get(self.json_url).content)
+        assert data['last_update'] == int(mktime(old.timetuple()) * 1000)
+
+        # Removals move it forward too.
+        self.plugin.delete()
+        removal = BlocklistRemoval.objects.get()
+        data = json.loads(self.client.get(self.json_url).content)
+        assert data['last_update'] == int(
+            mktime(removal.created.timetuple()) * 1000)
+
+        # Up to date clients all ask for the same delta.
+        response = self.client.get(self.json_url,
+                                   {'since': data['last_update']})
+        delta = json.loads(response.content)
+        assert delta['last_update'] == data['last_update']
+        assert delta['removed'] == [self.plugin.block_id]
+
+    def test_json_conditional(self):
+        etag = self.client.get(self.json_url)['ETag']
+        response = self.client.get(self.json_url, HTTP_IF_NONE_MATCH=etag)
+        assert response.status_code == 304
+
+    def test_json_delta(self):
+        old = datetime(2010, 1, 1)
+        BlocklistItem.objects.filter(pk=self.item.pk).update(modified=old)
+        BlocklistDetail.objects.filter(pk=self.details.pk).update(
+            modified=old)
+        removed, _ = self.create_blplugin(
+            name='removed', details=BlocklistDetail.objects.create(
+                name='removed', who='everyone', why='because',
+                bug='http://bug.url.com/'))
+        removed.delete()
+
+        since = int(mktime(datetime(2015, 1, 1).timetuple()) * 1000)
+        response = self.client.get(self.json_url, {'since': since})
+        delta = json.loads(response.content)
+        assert delta['since'] == since
+        assert delta['addons'] == []
+        assert [p['blockID'] for p in delta['plugins']] == [
+            self.plugin.block_id]
+        assert delta['removed'] == [removed.block_id]
+
+    def test_removal_without_details(self):
+        item = BlocklistItem.objects.create(guid='nodetails@example.com')
+        item.delete()
+        assert not BlocklistRemoval.objects.exists()
+
+    def test_json_delta_invalid_since(self):
+        response = self.client.get(self.json_url, {'since': 'junk'})
+        assert 'since' not in json.loads(response.content)
+
+
 class TestBlocklistPage(TestCase):
 
     def test_blocked_addons_page_loads(self):
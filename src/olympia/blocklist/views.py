@@ -1,24 +1,33 @@
 import base64
+import bisect
 import collections
+import gzip
 import hashlib
+import json
+from cStringIO import StringIO
 from datetime import datetime
 from operator import attrgetter
 import time
 
 from django.core.cache import cache
-from django.db.models import Q, signals as db_signals
+from django.db.models import Max, Q, signals as db_signals
 from django.db.transaction import non_atomic_requests
-from django.http import JsonResponse
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import HttpResponse, HttpResponseNotModified
 from django.shortcuts import get_object_or_404
-from django.utils.cache import patch_cache_control
+from django.utils.cache import patch_cache_control, patch_vary_headers
 from django.utils.encoding import force_bytes
+from django.utils.http import http_date, parse_http_date_safe
 
+from jingo import get_env
+
+from olympia import amo
 from olympia.amo.utils import sorted_groupby, render
 from olympia.versions.compare import version_int
 
 from .models import (
     BlocklistApp, BlocklistCA, BlocklistDetail, BlocklistGfx, BlocklistItem,
-    BlocklistIssuerCert, BlocklistPlugin)
+    BlocklistIssuerCert, BlocklistPlugin, BlocklistRemoval)
 
 from .utils import (
     certificates_to_json, addons_to_json, plugins_to_json, gfxs_to_json)
@@ -26,27 +35,163 @@ from .utils import (
 
 App = collections.namedtuple('App', 'guid min max')
 BlItem = collections.namedtuple('BlItem', 'rows os modified block_id prefs')
+# A rendered blocklist, stored gzipped under its sha256 (the etag), which
+# makes it immutable and shared by every key rendering the same content.
+# `modified` is when it was rendered for its key, in milliseconds: documents
+# are rendered again for each blocklist generation, whatever changed
+# (including deletions), so that's what Last-Modified is based on.
+Document = collections.namedtuple('Document',
+                                  'gzipped etag content_type modified')
 
+# Blobs are immutable, they only need to outlive the pointers to them.
+BLOB_TIMEOUT = 60 * 60 * 24
 
-@non_atomic_requests
-def blocklist(request, apiver, app, appver):
-    key = 'blocklist:%s:%s:%s' % (apiver, app, appver)
-    # Use md5 to make sure the memcached key is clean.
-    key = hashlib.md5(force_bytes(key)).hexdigest()
+
+def get_keyversion():
     cache.add('blocklist:keyversion', 1)
-    version = cache.get('blocklist:keyversion')
-    response = cache.get(key, version=version)
-    if response is None:
-        response = _blocklist(request, apiver, app, appver)
-        cache.set(key, response, 60 * 60, version=version)
+    return cache.get('blocklist:keyversion')
+
+
+def get_version_bounds(version):
+    """
+    Map every plugin app min/max version to its version_int, computed once
+    per blocklist generation rather than per plugin and request.
+    """
+    bounds = cache.get('blocklist:bounds', version=version)
+    if bounds is None:
+        bounds = {}
+        for row in BlocklistApp.objects.no_cache().filter(
+                blplugin__isnull=False).values_list('min', 'max'):
+            for value in row:
+                if value:
+                    bounds[value] = version_int(value)
+        cache.set('blocklist:bounds', bounds, 60 * 60, version=version)
+    return bounds
+
+
+def get_document_key(apiver, app, appver, version):
+    """
+    Key of the document served to (apiver, app, appver).
+
+    All api versions >= 3 (and all < 3) get the same document, and only the
+    plugins of api versions < 3 depend on appver: two appvers that compare
+    the same way to every plugin bound get the same document too.
+    """
+    apiver = 3 if int(apiver) >= 3 else 2
+    bucket = ''
+    if apiver < 3:
+        bounds = sorted(get_version_bounds(version).values())
+        app_version = version_int(appver)
+        bucket = '%s-%s' % (bisect.bisect_left(bounds, app_version),
+                            bisect.bisect_right(bounds, app_version))
+    key = 'blocklist:doc:%s:%s:%s' % (apiver, app, bucket)
+    # Use md5 to make sure the memcached key is clean.
+    return hashlib.md5(force_bytes(key)).hexdigest()
+
+
+def get_document(key, version):
+    pointer = cache.get(key, version=version)
+    if pointer is None:
+        return None
+    etag, modified = pointer
+    document = cache.get('blocklist:blob:%s' % etag)
+    return document and document._replace(modified=modified)
+
+
+def store_document(key, content, content_type, version):
+    content = force_bytes(content)
+    etag = hashlib.sha256(content).hexdigest()
+    blob_key = 'blocklist:blob:%s' % etag
+    modified = int(round(time.time() * 1000))
+    document = cache.get(blob_key)
+    if document is None:
+        buf = StringIO()
+        with gzip.GzipFile(fileobj=buf, mode='wb', mtime=0) as gz:
+            gz.write(content)
+        document = Document(buf.getvalue(), etag, content_type, modified)
+        cache.set(blob_key, document, BLOB_TIMEOUT)
+    # The blob may have been rendered by an earlier generation, before the
+    # copies clients got from the latest one.
+    cache.set(key, (etag, modified), 60 * 60, version=version)
+    return document._replace(modified=modified)
+
+
+def not_modified(request, document):
+    """Whether the client's copy of `document` is still current."""
+    if_none_match = request.META.get('HTTP_IF_NONE_MATCH')
+    if if_none_match:
+        etags = [etag.strip() for etag in if_none_match.split(',')]
+        return '*' in etags or '"%s"' % document.etag in etags
+    if_modified_since = parse_http_date_safe(
+        request.META.get('HTTP_IF_MODIFIED_SINCE'))
+    return (if_modified_since is not None and
+            if_modified_since >= document.modified // 1000)
+
+
+def document_response(request, document):
+    if not_modified(request, document):
+        response = HttpResponseNotModified()
+    elif 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', ''):
+        response = HttpResponse(document.gzipped,
+                                content_type=document.content_type)
+        response['Content-Encoding'] = 'gzip'
+    else:
+        with gzip.GzipFile(fileobj=StringIO(document.gzipped)) as gz:
+            response = HttpResponse(gz.read(),
+                                    content_type=document.content_type)
+    response['ETag'] = '"%s"' % document.etag
+    response['Last-Modified'] = http_date(document.modified // 1000)
+    patch_vary_headers(response, ['Accept-Encoding'])
     patch_cache_control(response, max_age=60 * 60)
     return response
 
 
-def _blocklist(request, apiver, app, appver):
+def build_blocklist(apiver, app, appver, version):
+    key = get_document_key(apiver, app, appver, version)
+    content = _blocklist(apiver, app, appver, version)
+    return store_document(key, content, 'text/xml', version)
+
+
+def build_blocklist_json(version, since=None):
+    if since is None:
+        key = 'blocklist:json'
+        content = _blocklist_json()
+    else:
+        key = 'blocklist:json:since:%s' % since
+        content = _blocklist_json_delta(since)
+    return store_document(key, content, 'application/json', version)
+
+
+def build_all(version):
+    """
+    Pre-render the documents requested by (almost) every client, so that a
+    blocklist change doesn't send everyone to the database at once.
+
+    Documents for api versions < 3 depend on the client version and are only
+    rendered on demand.
+    """
+    apps = set(app.guid for app in amo.APPS_ALL.values())
+    apps.update(BlocklistApp.objects.no_cache().exclude(guid=None)
+                .values_list('guid', flat=True))
+    for app in apps:
+        build_blocklist(3, app, None, version)
+    build_blocklist_json(version)
+
+
+@non_atomic_requests
+def blocklist(request, apiver, app, appver):
+    version = get_keyversion()
+    key = get_document_key(apiver, app, appver, version)
+    document = get_document(key, version)
+    if document is None:
+        document = build_blocklist(apiver, app, appver, version)
+    return document_response(request, document)
+
+
+def _blocklist(apiver, app, appver, version=None):
     apiver = int(apiver)
     items = get_items(apiver, app, appver)[0]
-    plugins = get_plugins(apiver, app, appver)
+    plugins = get_plugins(apiver, app, appver, version)
     gfxs = BlocklistGfx.objects.filter(Q(guid__isnull=True) | Q(guid=app))
     issuerCertBlocks = BlocklistIssuerCert.objects.all()
     cas = None
@@ -67,14 +212,18 @@ def _blocklist(request, apiver, app, appver):
                 appguid=app, appver=appver, last_update=last_update, cas=cas,
                 issuerCertBlocks=issuerCertBlocks)
 
-    return render(request, 'blocklist/blocklist.xml', data,
-                  content_type='text/xml')
+    template = get_env().get_template('blocklist/blocklist.xml')
+    return template.render(data)
 
 
 def clear_blocklist(*args, **kw):
-    # Something in the blocklist changed; invalidate all responses.
+    # Something in the blocklist changed; invalidate all responses and
+    # pre-render the new ones.
+    from .tasks import build_blocklists
+
     cache.add('blocklist:keyversion', 1)
-    cache.incr('blocklist:keyversion')
+    version = cache.incr('blocklist:keyversion')
+    build_blocklists.apply_async(args=[version], countdown=10)
 
 
 for m in (BlocklistItem, BlocklistPlugin, BlocklistGfx, BlocklistApp,
@@ -124,7 +273,7 @@ def get_items(apiver=None, app=None, appver=None, groupby='guid'):
     return items, details
 
 
-def get_plugins(apiver=3, app=None, appver=None):
+def get_plugins(apiver=3, app=None, appver=None, version=None):
     # API versions < 3 ignore targetApplication entries for plugins so only
     # block the plugin if the appver is within the block range.
 
@@ -142,10 +291,14 @@ def get_plugins(apiver=3, app=None, appver=None):
                               'app_max': 'blapps.max'}))
 
     if apiver < 3 and appver is not None:
+        bounds = get_version_bounds(version or get_keyversion())
+
         def between(ver, min, max):
             if not (min and max):
                 return True
-            return version_int(min) < ver < version_int(max)
+            min = bounds[min] if min in bounds else version_int(min)
+            max = bounds[max] if max in bounds else version_int(max)
+            return min < ver < max
         app_version = version_int(appver)
         plugins = [p for p in plugins if between(app_version, p.app_min,
                                                  p.app_max)]
@@ -154,22 +307,49 @@ def get_plugins(apiver=3, app=None, appver=None):
 
 @non_atomic_requests
 def blocklist_json(request):
-    key = 'blocklist:json'
-    cache.add('blocklist:keyversion', 1)
-    version = cache.get('blocklist:keyversion')
-    response = cache.get(key, version=version)
-    if response is None:
-        response = _blocklist_json(request)
-        cache.set(key, response, 60 * 60, version=version)
-    patch_cache_control(response, max_age=60 * 60)
-    return response
-
-
-def _blocklist_json(request):
+    """
+    Export the whole blocklist in JSON, or only what changed after the
+    `since` last_update (in milliseconds) when given.
+    """
+    since = request.GET.get('since')
+    try:
+        since = int(since) if since else None
+    except ValueError:
+        since = None
+    version = get_keyversion()
+    key = 'blocklist:json' if since is None else (
+        'blocklist:json:since:%s' % since)
+    document = get_document(key, version)
+    if document is None:
+        document = build_blocklist_json(version, since)
+    return document_response(request, document)
+
+
+def get_json_last_update():
+    """
+    The last_update of the JSON blocklist, in milliseconds: when add-ons,
+    plugins or their details were last changed, or removed. Clients send it
+    back as `since`, so everyone up to date asks for the same delta.
+    """
+    dates = [model.objects.no_cache().aggregate(last=Max(field))['last']
+             for model, field in ((BlocklistItem, 'modified'),
+                                  (BlocklistPlugin, 'modified'),
+                                  (BlocklistDetail, 'modified'),
+                                  (BlocklistRemoval, 'created'))]
+    dates = filter(None, dates)
+    if not dates:
+        return 0
+    return int(time.mktime(max(dates).timetuple()) * 1000)
+
+
+def _blocklist_json():
     """Export the whole blocklist in JSON.
 
     It will select blocklists for all apps.
     """
+    # Before fetching anything, so that what changes meanwhile is sent again
+    # in the next delta rather than never.
+    last_update = get_json_last_update()
     items, _ = get_items(groupby='id')
     plugins = get_plugins()
     issuerCertBlocks = BlocklistIssuerCert.objects.all()
@@ -183,8 +363,6 @@ def _blocklist_json(request):
     except IndexError:
         pass
 
-    last_update = int(round(time.time() * 1000))
-
     results = {
         'last_update': last_update,
         'certificates': certificates_to_json(issuerCertBlocks),
@@ -193,7 +371,59 @@ def _blocklist_json(request):
         'gfx': gfxs_to_json(gfxs),
         'ca': ca,
     }
-    return JsonResponse(results)
+    # Same encoding as JsonResponse.
+    return json.dumps(results, cls=DjangoJSONEncoder)
+
+
+def _blocklist_json_delta(since):
+    """
+    Export the add-ons and plugins added or changed since `since` (in
+    milliseconds), along with the blockIDs removed since then.
+
+    The comparisons are inclusive, as the dates only have a precision of a
+    second.
+    """
+    since_date = datetime.fromtimestamp(since / 1000.0)
+    last_update = get_json_last_update()
+
+    def changed(obj):
+        return obj.modified >= since_date or (
+            obj.details and obj.details.modified >= since_date)
+
+    all_items, _ = get_items(groupby='id')
+    all_plugins = get_plugins()
+    items = dict((key, item) for key, item in all_items.items()
+                 if any(changed(row) for row in item.rows))
+    plugins = [plugin for plugin in all_plugins if changed(plugin)]
+
+    current = set(item.block_id for item in all_items.values())
+    current.update(plugin.block_id for plugin in all_plugins)
+    removed = (BlocklistRemoval.objects.no_cache()
+               .filter(created__gte=since_date)
+               .values_list('block_id', flat=True))
+
+    results = {
+        'last_update': last_update,
+        'since': since,
+        'addons': addons_to_json(items),
+        'plugins': plugins_to_json(plugins),
+        'removed': sorted(set(removed) - current),
+    }
+    return json.dumps(results, cls=DjangoJSONEncoder)
+
+
+def record_removal(sender, instance, **kw):
+    # Without details, the blockID ("iNone") can't tell clients which entry
+    # to drop.
+    if instance.details_id is None:
+        return
+    BlocklistRemoval.objects.create(block_id=instance.block_id,
+                                    guid=instance.guid)
+
+
+for m in (BlocklistItem, BlocklistPlugin):
+    db_signals.post_delete.connect(record_removal, sender=m,
+                                   dispatch_uid='removal_%s' % m)
 
 
 @non_atomic_requests
@@ -6,7 +6,8 @@ import feedparser
 
 import cronjobs
 
-from olympia.devhub.models import BlogPost
+from olympia.amo.utils import chunked
+from olympia.devhub.models import BlogPost, CachedValidation
 
 log = commonware.log.getLogger('z.cron')
 
@@ -28,3 +29,24 @@ def update_blog_posts():
         BlogPost.objects.create(**post)
 
     log.info('Adding %d blog posts.' % BlogPost.objects.count())
+
+
+@cronjobs.register
+def cleanup_validation_cache():
+    """
+    Remove the least recently used cached validation results, until they fit
+    in `settings.VALIDATION_CACHE_SIZE` bytes.
+    """
+    total, hits, stale = 0, 0, []
+    entries = (CachedValidation.objects.no_cache().order_by('-modified')
+               .values_list('pk', 'size', 'hits'))
+    for pk, size, entry_hits in entries:
+        total += size
+        hits += entry_hits
+        if total > settings.VALIDATION_CACHE_SIZE:
+            stale.append(pk)
+
+    for chunk in chunked(stale, 100):
+        CachedValidation.objects.filter(pk__in=chunk).delete()
+    log.info('Removed %d of %d cached validations (%d hits in total).' % (
+        len(stale), len(entries), hits))
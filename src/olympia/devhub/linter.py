@@ -0,0 +1,182 @@
+"""
+A pool of long-lived addons-linter processes.
+
+Starting node and loading the linter takes most of the time of validating a
+small add-on. Instead of running `ADDONS_LINTER_BIN` for each file, each
+celery worker process keeps up to `ADDONS_LINTER_POOL_SIZE` processes running
+`scripts/addons-linter-server.js`, which validate the files sent as lines of
+JSON on their stdin and answer with lines of JSON on their stdout.
+"""
+import json
+import os
+import Queue
+import select
+import subprocess
+import tempfile
+import time
+from distutils.spawn import find_executable
+
+from django.conf import settings
+
+import commonware.log
+from celery.signals import worker_process_shutdown
+
+
+log = commonware.log.getLogger('z.devhub.linter')
+
+
+class LinterError(Exception):
+    """The linter process failed or died while validating a file."""
+
+
+class LinterTimeout(LinterError):
+    """The linter process didn't answer in time."""
+
+
+def get_linter_command():
+    """The command starting a linter process, using the addons-linter package
+    that `ADDONS_LINTER_BIN` belongs to."""
+    bin_ = (find_executable(settings.ADDONS_LINTER_BIN) or
+            settings.ADDONS_LINTER_BIN)
+    # The bin is `<package>/bin/addons-linter`, possibly through a symlink.
+    package = os.path.dirname(os.path.dirname(os.path.realpath(bin_)))
+    return [settings.NODE_BIN,
+            os.path.join(settings.ROOT, 'scripts', 'addons-linter-server.js'),
+            package]
+
+
+class LinterWorker(object):
+    """A linter process, validating one file at a time."""
+
+    def __init__(self, command):
+        # stderr goes to a file so that a chatty linter can't fill the pipe
+        # and block, and so that we can tell why it died.
+        self.stderr = tempfile.TemporaryFile()
+        self.process = subprocess.Popen(
+            command, stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+            stderr=self.stderr, shell=False)
+        self.jobs = 0
+        self.buffer = ''
+
+    def is_alive(self):
+        return self.process.poll() is None
+
+    def run(self, request, timeout):
+        """Send `request` and return the response, waiting for it at most
+        `timeout` seconds."""
+        self.jobs += 1
+        try:
+            self.process.stdin.write(json.dumps(request) + '\n')
+            self.process.stdin.flush()
+        except IOError, e:
+            raise LinterError('Could not send the file to the linter: %s '
+                              '%s' % (e, self.get_errors()))
+        return json.loads(self.read_line(timeout))
+
+    def read_line(self, timeout):
+        deadline = time.time() + timeout
+        fd = self.process.stdout.fileno()
+        while '\n' not in self.buffer:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                raise LinterTimeout(
+                    'The linter did not answer in %ss.' % timeout)
+            ready, _, _ = select.select([fd], [], [], remaining)
+            if not ready:
+                continue
+            data = os.read(fd, 64 * 1024)
+            if not data:
+                raise LinterError(
+                    'The linter exited: %s' % self.get_errors())
+            self.buffer += data
+        line, self.buffer = self.buffer.split('\n', 1)
+        return line
+
+    def get_errors(self):
+        self.stderr.seek(0)
+        return self.stderr.read()[-2000:]
+
+    def stop(self):
+        if self.is_alive():
+            self.process.kill()
+        self.process.wait()
+        self.stderr.close()
+
+
+class LinterPool(object):
+    """
+    Up to `size` linter processes, started when needed.
+
+    A process is restarted once it has validated `max_jobs` files, or if it
+    died, and is killed if it doesn't answer within `timeout` seconds (or if
+    anything else goes wrong while it validates a file).
+    """
+
+    def __init__(self, command, size, max_jobs, timeout):
+        self.command = command
+        self.max_jobs = max_jobs
+        self.timeout = timeout
+        self.pid = os.getpid()
+        # Workers are started lazily, so the queue starts with empty slots.
+        self.slots = Queue.LifoQueue()
+        for i in range(size):
+            self.slots.put(None)
+
+    def lint(self, path, listed=True):
+        """Validate the add-on at `path` and return the linter results."""
+        worker = self.slots.get()
+        try:
+            if (worker is not None and
+                    (not worker.is_alive() or worker.jobs >= self.max_jobs)):
+                worker.stop()
+                worker = None
+            if worker is None:
+                worker = LinterWorker(self.command)
+            response = worker.run({'path': path, 'selfHosted': not listed},
+                                  self.timeout)
+        except BaseException, e:
+            # Including SoftTimeLimitExceeded: the worker may still be busy
+            # with the file, it can't be reused.
+            log.error('Restarting a linter process after: %r' % e)
+            if worker is not None:
+                worker.stop()
+                worker = None
+            raise
+        finally:
+            self.slots.put(worker)
+
+        if 'error' in response:
+            raise LinterError(response['error'])
+        return response['output']
+
+    def close(self):
+        while True:
+            try:
+                worker = self.slots.get_nowait()
+            except Queue.Empty:
+                break
+            if worker is not None:
+                worker.stop()
+
+
+_pool = None
+
+
+def get_pool():
+    """The linter pool of this process."""
+    global _pool
+    # A pool inherited from a parent process would share its pipes.
+    if _pool is None or _pool.pid != os.getpid():
+        _pool = LinterPool(get_linter_command(),
+                           size=settings.ADDONS_LINTER_POOL_SIZE,
+                           max_jobs=settings.ADDONS_LINTER_POOL_MAX_JOBS,
+                           timeout=settings.ADDONS_LINTER_POOL_TIMEOUT)
+    return _pool
+
+
+@worker_process_shutdown.connect
+def close_pool(**kw):
+    global _pool
+    if _pool is not None and _pool.pid == os.getpid():
+        _pool.close()
+    _pool = None
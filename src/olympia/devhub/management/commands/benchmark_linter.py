@@ -0,0 +1,59 @@
+import os
+import time
+from optparse import make_option
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from olympia.devhub import linter
+from olympia.devhub.tasks import run_addons_linter_process
+
+
+HELP = """\
+Measure the latency of validating files with the addons-linter, starting a
+process for each file versus sending them to a pool of linter processes.
+
+    `./manage.py benchmark_linter --runs=20 [path/to/addon.xpi ...]`
+
+Without paths, a small WebExtension from the tests is used.
+"""
+
+
+class Command(BaseCommand):
+    option_list = BaseCommand.option_list + (
+        make_option('--runs', type='int', default=10,
+                    help='Number of validations per file and scenario.'),
+    )
+    args = '[path ...]'
+    help = HELP
+
+    def handle(self, *args, **kw):
+        paths = args or [os.path.join(
+            settings.ROOT, 'src', 'olympia', 'devhub', 'tests', 'addons',
+            'valid_webextension.xpi')]
+        runs = kw['runs']
+        pool = linter.LinterPool(
+            linter.get_linter_command(), size=1,
+            max_jobs=settings.ADDONS_LINTER_POOL_MAX_JOBS,
+            timeout=settings.ADDONS_LINTER_POOL_TIMEOUT)
+
+        self.stdout.write('%-30s %-12s %10s %10s %10s' % (
+            'file', 'scenario', 'first ms', 'mean ms', 'max ms'))
+        try:
+            for path in paths:
+                for name, func in (('process', run_addons_linter_process),
+                                   ('pool', pool.lint)):
+                    timings = []
+                    for i in range(runs):
+                        start = time.time()
+                        func(path)
+                        timings.append((time.time() - start) * 1000)
+                    # The first validation through the pool includes starting
+                    # the linter process, so the means leave out the first
+                    # run of each scenario.
+                    rest = timings[1:] or timings
+                    self.stdout.write('%-30s %-12s %10.1f %10.1f %10.1f' % (
+                        os.path.basename(path)[:30], name, timings[0],
+                        sum(rest) / len(rest), max(timings)))
+        finally:
+            pool.close()
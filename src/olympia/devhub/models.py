@@ -1,3 +1,4 @@
+import collections
 import json
 import string
 import uuid
@@ -7,14 +8,17 @@ from datetime import datetime
 from django.apps import apps
 from django.conf import settings
 from django.core.urlresolvers import reverse
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, Q
 from django.utils.translation import ugettext as _
 
 import commonware.log
 import jinja2
+from django_statsd.clients import statsd
 
 from olympia import amo
 from olympia.amo.models import ModelBase, ManagerBase
+from olympia.amo.utils import chunked
 from olympia.access.models import Group
 from olympia.addons.models import Addon
 from olympia.bandwagon.models import Collection
@@ -53,6 +57,50 @@ class BlogPost(ModelBase):
         db_table = 'blogposts'
 
 
+class CachedValidation(ModelBase):
+    """
+    The JSON results of a validation, keyed by the content hash of the
+    validated file and by everything else that affects them (see
+    `devhub.tasks.validation_cache_key()`), so that identical packages are
+    only validated once.
+
+    The least recently used results are removed by the
+    `cleanup_validation_cache` cron.
+    """
+    key = models.CharField(max_length=64, unique=True)
+    validation = models.TextField()
+    size = models.PositiveIntegerField()
+    hits = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'cached_validations'
+
+    @classmethod
+    def lookup(cls, key):
+        """Return the cached results for `key`, or None."""
+        try:
+            cached = cls.objects.no_cache().get(key=key)
+        except cls.DoesNotExist:
+            statsd.incr('devhub.validation_cache.miss')
+            return None
+        statsd.incr('devhub.validation_cache.hit')
+        # `modified` tells the eviction which results were used recently.
+        cls.objects.filter(pk=cached.pk).update(
+            hits=F('hits') + 1, modified=datetime.now())
+        return cached.validation
+
+    @classmethod
+    def store(cls, key, validation):
+        """Cache the `validation` results for `key`."""
+        try:
+            with transaction.atomic():
+                cls.objects.create(key=key, validation=validation,
+                                   size=len(validation))
+        except IntegrityError:
+            # The same file was validated concurrently, keep the first one.
+            pass
+
+
 class AddonLog(ModelBase):
     """
     This table is for indexing the activity log by addon.
@@ -115,30 +163,27 @@ class GroupLog(ModelBase):
 
 
 class ActivityLogManager(ManagerBase):
-    def for_addons(self, addons):
-        if isinstance(addons, Addon):
-            addons = (addons,)
-
-        vals = (AddonLog.objects.filter(addon__in=addons)
-                .values_list('activity_log', flat=True))
+    def get_queryset(self):
+        qs = super(ActivityLogManager, self).get_queryset()
+        return qs.transform(ActivityLog.transformer)
 
-        if vals:
-            return self.filter(pk__in=list(vals))
-        else:
-            return self.none()
+    def for_addons(self, addons, before=None):
+        if isinstance(addons, (list, tuple)) and len(addons) == 1:
+            addons = addons[0]
+        if isinstance(addons, Addon):
+            return self._joined('addonlog', before, addon=addons)
+        # Joined, a log naming several of the add-ons would be listed once
+        # per add-on.
+        return self._logged(AddonLog, before, addon__in=addons)
 
-    def for_version(self, version):
-        vals = (VersionLog.objects.filter(version=version)
-                .values_list('activity_log', flat=True))
-        return self.filter(pk__in=list(vals))
+    def for_version(self, version, before=None):
+        return self._joined('versionlog', before, version=version)
 
     def for_group(self, group):
         return self.filter(grouplog__group=group)
 
-    def for_user(self, user):
-        vals = (UserLog.objects.filter(user=user)
-                .values_list('activity_log', flat=True))
-        return self.filter(pk__in=list(vals))
+    def for_user(self, user, before=None):
+        return self._joined('userlog', before, user=user)
 
     def for_developer(self):
         return self.exclude(action__in=amo.LOG_ADMINS + amo.LOG_HIDE_DEVELOPER)
@@ -213,8 +258,46 @@ class ActivityLogManager(ManagerBase):
     def monthly_reviews_user_position(self, user, theme=False):
         return self.user_position(self.monthly_reviews(theme), user)
 
+    def _joined(self, table, before=None, **filters):
+        """
+        The logs indexed in the `table` lookup table (`addonlog`...) by
+        `filters`, newest first.
+
+        The logs are ordered by the `created` and `activity_log_id` copied
+        in the lookup table, so that a page of them only reads its rows of
+        the `(<object>_id, created, activity_log_id)` index, however long
+        the history is. To page through them without an OFFSET, pass the
+        last log of a page as `before` to get the next one.
+
+        A log is listed once per matching row of the lookup table, so the
+        filters should match a single object.
+        """
+        created, log_id = table + '__created', table + '__activity_log__id'
+        q = Q(**dict(('%s__%s' % (table, k), v) for k, v in filters.items()))
+        if before is not None:
+            q &= (Q(**{created + '__lt': before.created}) |
+                  Q(**{created: before.created, log_id + '__lt': before.pk}))
+        # A single filter() so that all the conditions use the same join.
+        return self.filter(q).order_by('-' + created, '-' + log_id)
+
+    def _logged(self, lookup, before=None, **filters):
+        """
+        The logs indexed in the `lookup` table (`AddonLog`...) by `filters`,
+        newest first, like `_joined()` but listing each log once when the
+        filters match several objects.
+
+        The lookup table is read in a subquery, so all the logs of these
+        objects are sorted by their own date.
+        """
+        qs = self.filter(pk__in=lookup.objects.filter(**filters)
+                         .values('activity_log'))
+        if before is not None:
+            qs = qs.filter(Q(created__lt=before.created) |
+                           Q(created=before.created, pk__lt=before.pk))
+        return qs.order_by('-created', '-id')
+
     def _by_type(self):
-        qs = super(ActivityLogManager, self).get_queryset()
+        qs = self.get_queryset()
         table = 'log_activity_addon'
         return qs.extra(
             tables=[table],
@@ -250,30 +333,75 @@ class ActivityLog(ModelBase):
         # SafeFormatter escapes everything so this is safe.
         return jinja2.Markup(self.formatter.format(*args, **kw))
 
-    @property
-    def arguments(self):
-
-        try:
-            # d is a structure:
-            # ``d = [{'addons.addon':12}, {'addons.addon':1}, ... ]``
-            d = json.loads(self._arguments)
-        except:
-            log.debug('unserializing data from addon_log failed: %s' % self.id)
-            return None
+    @staticmethod
+    def transformer(logs):
+        """Resolve the arguments of all the `logs` with one query per model
+        instead of one query per argument of each log."""
+        pks = collections.defaultdict(set)
+        for log_ in logs:
+            for model, pk in log_._parsed_arguments or ():
+                if model is not None:
+                    pks[model].add(pk)
+
+        objects = {}
+        for model, model_pks in pks.items():
+            # Cope with soft deleted models and unlisted addons.
+            objects[model] = {}
+            for chunk in chunked(list(model_pks), 1000):
+                objects[model].update(
+                    model.get_unfiltered_manager().in_bulk(chunk))
+
+        for log_ in logs:
+            parsed = log_._parsed_arguments
+            objs = None
+            if parsed is not None:
+                objs = []
+                for model, pk in parsed:
+                    if model is None:
+                        objs.append(pk)
+                    elif pk in objects[model]:
+                        objs.append(objects[model][pk])
+            log_._resolved_arguments = (log_._arguments, objs)
 
-        objs = []
-        for item in d:
-            # item has only one element.
-            model_name, pk = item.items()[0]
-            if model_name in ('str', 'int', 'null'):
-                objs.append(pk)
-            else:
-                (app_label, model_name) = model_name.split('.')
-                model = apps.get_model(app_label, model_name)
-                # Cope with soft deleted models and unlisted addons.
-                objs.extend(model.get_unfiltered_manager().filter(pk=pk))
+    @property
+    def _parsed_arguments(self):
+        """The arguments as a list of (model, pk) tuples, with a model of
+        None for plain values, or None if they can't be unserialized."""
+        cached = self.__dict__.get('_parsed_arguments_cache')
+        if cached is None or cached[0] != self._arguments:
+            try:
+                # d is a structure:
+                # ``d = [{'addons.addon':12}, {'addons.addon':1}, ... ]``
+                d = json.loads(self._arguments)
+            except:
+                log.debug('unserializing data from addon_log failed: %s'
+                          % self.id)
+                d = None
+
+            parsed = None
+            if d is not None:
+                parsed = []
+                for item in d:
+                    # item has only one element.
+                    model_name, pk = item.items()[0]
+                    if model_name in ('str', 'int', 'null'):
+                        parsed.append((None, pk))
+                    else:
+                        (app_label, model_name) = model_name.split('.')
+                        model = apps.get_model(app_label, model_name)
+                        parsed.append((model, model._meta.pk.to_python(pk)))
+            cached = self._parsed_arguments_cache = (self._arguments, parsed)
+        return cached[1]
 
-        return objs
+    @property
+    def arguments(self):
+        # Logs coming from the manager were resolved along with the others
+        # of their page by `transformer`, as long as `_arguments` is the same.
+        cached = self.__dict__.get('_resolved_arguments')
+        if cached is None or cached[0] != self._arguments:
+            self.transformer([self])
+            cached = self._resolved_arguments
+        return cached[1]
 
     @arguments.setter
     def arguments(self, args=None):
@@ -1,5 +1,7 @@
 # -*- coding: utf-8 -*-
 import datetime
+import hashlib
+import inspect
 import json
 import logging
 import os
@@ -22,6 +24,7 @@ from celery.exceptions import SoftTimeLimitExceeded
 from celery.result import AsyncResult
 from django_statsd.clients import statsd
 from PIL import Image
+import pkg_resources
 import validator
 import waffle
 
@@ -33,6 +36,8 @@ from olympia.amo.utils import (
 from olympia.addons.models import Addon
 from olympia.applications.management.commands import dump_apps
 from olympia.applications.models import AppVersion
+from olympia.devhub import linter
+from olympia.devhub.models import CachedValidation
 from olympia.files.helpers import copyfileobj
 from olympia.files.models import FileUpload, File, FileValidation
 from olympia.files.utils import is_beta
@@ -156,8 +161,8 @@ def validate_file_path(path, hash_, listed=True, is_webextension=False, **kw):
 
     Should only be called directly by Validator."""
     if is_webextension:
-        return run_addons_linter(path, listed=listed)
-    return run_validator(path, listed=listed)
+        return run_addons_linter(path, listed=listed, hash_=hash_)
+    return run_validator(path, listed=listed, hash_=hash_)
 
 
 @validation_task
@@ -172,12 +177,14 @@ def validate_file(file_id, hash_, is_webextension=False, **kw):
         return file_.validation.validation
     except FileValidation.DoesNotExist:
         listed = file_.version.channel == amo.RELEASE_CHANNEL_LISTED
+        # `hash_` is the hash of the file before signing, the results are
+        # cached with the hash of the file that is actually validated.
         if is_webextension:
             return run_addons_linter(
-                file_.current_file_path, listed=listed)
+                file_.current_file_path, listed=listed, hash_=file_.hash)
 
         return run_validator(file_.current_file_path,
-                             listed=listed)
+                             listed=listed, hash_=file_.hash)
 
 
 @task
@@ -397,6 +404,7 @@ def compatibility_check(upload_pk, app_guid, appversion_str, **kw):
 
     result = run_validator(
         upload.path,
+        hash_=upload.hash,
         for_appversions={app_guid: [appversion_str]},
         test_all_tiers=True,
         # Ensure we only check compatibility against this one specific
@@ -411,6 +419,83 @@ def compatibility_check(upload_pk, app_guid, appversion_str, **kw):
     upload.save()  # We want to hit the custom save().
 
 
+_validator_versions = {}
+
+
+def get_validator_version(addons_linter=False):
+    """Return the version of the addons-linter or of the amo-validator,
+    looked up once per process. None if it can't be found."""
+    if addons_linter not in _validator_versions:
+        try:
+            if addons_linter:
+                version = subprocess.check_output(
+                    [settings.ADDONS_LINTER_BIN, '--version']).strip()
+            else:
+                version = pkg_resources.get_distribution(
+                    'amo-validator').version
+        except Exception, e:
+            log.error('Could not find the %s version: %r' % (
+                'linter' if addons_linter else 'validator', e))
+            version = None
+        _validator_versions[addons_linter] = version
+    return _validator_versions[addons_linter]
+
+
+def get_approved_applications():
+    """Return the path of the file listing the apps and versions on AMO for
+    the validator, dumping it first if needed."""
+    apps = dump_apps.Command.JSON_PATH
+    if not os.path.exists(apps):
+        call_command('dump_apps')
+    return apps
+
+
+def validation_cache_key(hash_, addons_linter=False, **params):
+    """
+    Return the key of the results of validating a file with content `hash_`
+    using the linter or the validator, called with `params`, or None if the
+    results can't be cached.
+    """
+    version = get_validator_version(addons_linter)
+    if not hash_ or not version:
+        return None
+    data = [hash_, 'linter' if addons_linter else 'validator', version,
+            params]
+    if not addons_linter:
+        # The validator checks the versions of the manifest against the
+        # apps and versions on AMO, dumped again when they change.
+        with open(get_approved_applications()) as apps:
+            data.append(hashlib.sha256(apps.read()).hexdigest())
+    return hashlib.sha256(json.dumps(data, sort_keys=True)).hexdigest()
+
+
+def cache_validation(addons_linter=False):
+    """
+    Decorate a function running the linter or the validator against a path
+    so that it accepts a `hash_` keyword argument with the content hash of
+    the file: its results are then stored in `CachedValidation` and reused
+    for files with the same content validated with the same arguments.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(path, *args, **kw):
+            hash_ = kw.pop('hash_', None)
+            params = inspect.getcallargs(func, path, *args, **kw)
+            del params['path']
+            key = validation_cache_key(hash_, addons_linter, **params)
+            if key:
+                results = CachedValidation.lookup(key)
+                if results is not None:
+                    return results
+            results = func(path, *args, **kw)
+            if key:
+                CachedValidation.store(key, results)
+            return results
+        return wrapper
+    return decorator
+
+
+@cache_validation()
 def run_validator(path, for_appversions=None, test_all_tiers=False,
                   overrides=None, compat=False, listed=True):
     """A pre-configured wrapper around the addon validator.
@@ -452,9 +537,7 @@ def run_validator(path, for_appversions=None, test_all_tiers=False,
     """
     from validator.validate import validate
 
-    apps = dump_apps.Command.JSON_PATH
-    if not os.path.exists(apps):
-        call_command('dump_apps')
+    apps = get_approved_applications()
 
     with NamedTemporaryFile(suffix='_' + os.path.basename(path)) as temp:
         if path and not os.path.exists(path) and storage.exists(path):
@@ -482,9 +565,29 @@ def run_validator(path, for_appversions=None, test_all_tiers=False,
         return json_result
 
 
+@cache_validation(addons_linter=True)
 def run_addons_linter(path, listed=True):
     from .utils import fix_addons_linter_output
 
+    if not os.path.exists(path):
+        raise ValueError(
+            'Path "{}" is not a file or directory or does not exist.'
+            .format(path))
+
+    with statsd.timer('devhub.linter'):
+        if settings.ADDONS_LINTER_POOL_SIZE:
+            parsed_data = linter.get_pool().lint(path, listed=listed)
+        else:
+            parsed_data = run_addons_linter_process(path, listed=listed)
+
+    result = json.dumps(fix_addons_linter_output(parsed_data, listed))
+    track_validation_stats(result, addons_linter=True)
+
+    return result
+
+
+def run_addons_linter_process(path, listed=True):
+    """Run the addons-linter in a new process and return its results."""
     args = [
         settings.ADDONS_LINTER_BIN,
         path,
@@ -495,43 +598,32 @@ def run_addons_linter(path, listed=True):
     if not listed:
         args.append('--self-hosted')
 
-    if not os.path.exists(path):
-        raise ValueError(
-            'Path "{}" is not a file or directory or does not exist.'
-            .format(path))
-
     stdout, stderr = tempfile.TemporaryFile(), tempfile.TemporaryFile()
 
-    with statsd.timer('devhub.linter'):
-        process = subprocess.Popen(
-            args,
-            stdout=stdout,
-            stderr=stderr,
-            # default but explicitly set to make sure we don't open a shell.
-            shell=False
-        )
+    process = subprocess.Popen(
+        args,
+        stdout=stdout,
+        stderr=stderr,
+        # default but explicitly set to make sure we don't open a shell.
+        shell=False
+    )
 
-        process.wait()
+    process.wait()
 
-        stdout.seek(0)
-        stderr.seek(0)
+    stdout.seek(0)
+    stderr.seek(0)
 
-        output, error = stdout.read(), stderr.read()
+    output, error = stdout.read(), stderr.read()
 
-        # Make sure we close all descriptors, otherwise they'll hang around
-        # and could cause a nasty exception.
-        stdout.close()
-        stderr.close()
+    # Make sure we close all descriptors, otherwise they'll hang around
+    # and could cause a nasty exception.
+    stdout.close()
+    stderr.close()
 
     if error:
         raise ValueError(error)
 
-    parsed_data = json.loads(output)
-
-    result = json.dumps(fix_addons_linter_output(parsed_data, listed))
-    track_validation_stats(result, addons_linter=True)
-
-    return result
+    return json.loads(output)
 
 
 def track_validation_stats(json_result, addons_linter=False):
@@ -5,9 +5,9 @@ from django.conf import settings
 
 from olympia.amo.tests import TestCase
 from olympia.addons.models import Addon
-from olympia.devhub.cron import update_blog_posts
+from olympia.devhub.cron import cleanup_validation_cache, update_blog_posts
 from olympia.devhub.tasks import convert_purified
-from olympia.devhub.models import BlogPost
+from olympia.devhub.models import BlogPost, CachedValidation
 
 
 class TestRSS(TestCase):
@@ -52,3 +52,21 @@ class TestPurify(TestCase):
         convert_purified([self.addon.pk])
         addon = Addon.objects.get(pk=3615)
         assert addon.the_reason.localized_string_clean
+
+
+class TestCleanupValidationCache(TestCase):
+
+    def test_least_recently_used_removed(self):
+        now = datetime.datetime.now()
+        for i, key in enumerate(('old', 'recent', 'new')):
+            cached = CachedValidation.objects.create(
+                key=key, validation='{}', size=10)
+            CachedValidation.objects.filter(pk=cached.pk).update(
+                modified=now - datetime.timedelta(days=3 - i))
+        # Using the old one makes it the most recently used.
+        assert CachedValidation.lookup('old') == '{}'
+
+        with self.settings(VALIDATION_CACHE_SIZE=25):
+            cleanup_validation_cache()
+        assert sorted(CachedValidation.objects.values_list(
+            'key', flat=True)) == ['new', 'old']
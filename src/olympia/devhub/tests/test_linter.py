@@ -0,0 +1,164 @@
+import json
+import os
+import sys
+
+import mock
+import pytest
+
+from olympia.amo.tests import TestCase
+from olympia.devhub import linter, tasks
+from olympia.amo.tests.test_helpers import get_addon_file
+from olympia.devhub.utils import fix_addons_linter_output
+from olympia.devhub.tests.test_tasks import ValidatorTestCase
+
+
+# Speaks the same protocol as scripts/addons-linter-server.js, with special
+# paths to make it misbehave.
+FAKE_LINTER = """
+import json, os, sys, time
+while True:
+    line = sys.stdin.readline()
+    if not line:
+        break
+    request = json.loads(line)
+    if request['path'] == 'crash':
+        sys.exit(1)
+    elif request['path'] == 'slow':
+        time.sleep(10)
+    if request['path'] == 'error':
+        response = {'error': 'Oops'}
+    else:
+        response = {'output': {'pid': os.getpid(),
+                               'selfHosted': request['selfHosted']}}
+    sys.stdout.write(json.dumps(response) + '\\n')
+    sys.stdout.flush()
+"""
+
+
+class TestLinterPool(TestCase):
+
+    def setUp(self):
+        super(TestLinterPool, self).setUp()
+        self.pool = linter.LinterPool(
+            [sys.executable, '-c', FAKE_LINTER], size=1, max_jobs=3,
+            timeout=1)
+
+    def tearDown(self):
+        self.pool.close()
+        super(TestLinterPool, self).tearDown()
+
+    def test_lint(self):
+        assert self.pool.lint('addon.xpi')['selfHosted'] is False
+        assert self.pool.lint('addon.xpi', listed=False)['selfHosted'] is True
+
+    def test_process_reused(self):
+        pid = self.pool.lint('addon.xpi')['pid']
+        assert pid != os.getpid()
+        assert self.pool.lint('addon.xpi')['pid'] == pid
+
+    def test_process_recycled(self):
+        pids = [self.pool.lint('addon.xpi')['pid'] for i in range(4)]
+        assert pids[0] == pids[1] == pids[2]
+        assert pids[3] != pids[0]
+
+    def test_crash(self):
+        pid = self.pool.lint('addon.xpi')['pid']
+        with pytest.raises(linter.LinterError):
+            self.pool.lint('crash')
+        assert self.pool.lint('addon.xpi')['pid'] != pid
+
+    def test_timeout(self):
+        pid = self.pool.lint('addon.xpi')['pid']
+        with pytest.raises(linter.LinterTimeout):
+            self.pool.lint('slow')
+        assert self.pool.lint('addon.xpi')['pid'] != pid
+
+    def test_error(self):
+        pid = self.pool.lint('addon.xpi')['pid']
+        with pytest.raises(linter.LinterError) as exc:
+            self.pool.lint('error')
+        assert exc.value.message == 'Oops'
+        # The process answered, it is still usable.
+        assert self.pool.lint('addon.xpi')['pid'] == pid
+
+    def test_get_pool_per_process(self):
+        with self.settings(ADDONS_LINTER_POOL_SIZE=1):
+            pool = linter.get_pool()
+            assert linter.get_pool() is pool
+            with mock.patch('olympia.devhub.linter.os.getpid',
+                            return_value=pool.pid + 1):
+                assert linter.get_pool() is not pool
+
+
+class TestLinterServer(TestCase):
+    """scripts/addons-linter-server.js, running the real addons-linter."""
+
+    def setUp(self):
+        super(TestLinterServer, self).setUp()
+        self.pool = linter.LinterPool(
+            linter.get_linter_command(), size=1, max_jobs=10, timeout=60)
+
+    def tearDown(self):
+        self.pool.close()
+        super(TestLinterServer, self).tearDown()
+
+    def fixed(self, output, listed):
+        result = fix_addons_linter_output(output, listed)
+        # The uids are random.
+        for message in result['messages']:
+            message.pop('uid')
+        return result
+
+    def assert_same_as_process(self, name, listed=True):
+        path = get_addon_file(name)
+        expected = self.fixed(
+            tasks.run_addons_linter_process(path, listed=listed), listed)
+        result = self.fixed(self.pool.lint(path, listed=listed), listed)
+        assert result == expected
+
+    def test_valid(self):
+        self.assert_same_as_process('valid_webextension.xpi')
+
+    def test_errors(self):
+        self.assert_same_as_process('invalid_webextension_invalid_id.xpi')
+
+    def test_warnings(self):
+        self.assert_same_as_process('typo-gecko.xpi')
+
+    def test_unlisted(self):
+        self.assert_same_as_process('typo-gecko.xpi', listed=False)
+
+    def test_several_files(self):
+        # The same process validates them one after the other.
+        self.assert_same_as_process('typo-gecko.xpi')
+        self.assert_same_as_process('invalid_webextension_invalid_id.xpi')
+        self.assert_same_as_process('valid_webextension.xpi')
+
+
+@mock.patch('olympia.devhub.linter.get_pool')
+class TestRunAddonsLinterPool(ValidatorTestCase):
+    linter_output = {
+        'errors': [], 'warnings': [], 'notices': [],
+        'summary': {'errors': 0, 'warnings': 0, 'notices': 0},
+        'metadata': {}}
+
+    def setUp(self):
+        super(TestRunAddonsLinterPool, self).setUp()
+        self.path = get_addon_file('valid_webextension.xpi')
+
+    def test_uses_pool(self, get_pool):
+        get_pool.return_value.lint.return_value = self.linter_output
+        with self.settings(ADDONS_LINTER_POOL_SIZE=1):
+            result = json.loads(
+                tasks.run_addons_linter(self.path, listed=False))
+        get_pool.return_value.lint.assert_called_with(self.path, listed=False)
+        assert result['errors'] == 0
+        assert result['metadata']['listed'] is False
+
+    @mock.patch('olympia.devhub.tasks.run_addons_linter_process')
+    def test_pool_disabled(self, run_process, get_pool):
+        run_process.return_value = self.linter_output
+        with self.settings(ADDONS_LINTER_POOL_SIZE=0):
+            tasks.run_addons_linter(self.path)
+        run_process.assert_called_with(self.path, listed=True)
+        assert not get_pool.called
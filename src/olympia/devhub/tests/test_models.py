@@ -1,4 +1,5 @@
 from datetime import datetime, timedelta
+from functools import partial
 from os import path
 
 from django.core.urlresolvers import reverse
@@ -8,7 +9,8 @@ from mock import Mock
 from pyquery import PyQuery as pq
 
 from olympia import amo
-from olympia.amo.tests import TestCase
+from olympia.amo.tests import addon_factory, TestCase
+from olympia.access.models import Group
 from olympia.addons.models import Addon, AddonUser
 from olympia.bandwagon.models import Collection
 from olympia.devhub.models import ActivityLog, AddonLog, BlogPost
@@ -113,6 +115,25 @@ class TestActivityLog(TestCase):
         entry.save()
         assert entry.arguments is None
 
+    def test_arguments_resolved_in_bulk(self):
+        groups = [Group.objects.create(name='group %s' % i) for i in range(3)]
+        for group in groups:
+            amo.log(amo.LOG.CUSTOM_TEXT, group, 'text', (Group, 666))
+        # One query for the logs and one for all the groups.
+        with self.assertNumQueries(2):
+            logs = list(ActivityLog.objects.no_cache().order_by('id'))
+        with self.assertNumQueries(0):
+            arguments = [log.arguments for log in logs]
+        # Objects that don't exist anymore are skipped.
+        assert arguments == [[group, 'text'] for group in groups]
+
+    def test_arguments_changed(self):
+        amo.log(amo.LOG.CUSTOM_TEXT, 'hi')
+        entry = ActivityLog.objects.get()
+        assert entry.arguments == ['hi']
+        entry.arguments = [(Addon, 3615)]
+        assert entry.arguments == [Addon.objects.get(pk=3615)]
+
     def test_no_arguments(self):
         amo.log(amo.LOG['CUSTOM_HTML'])
         entry = ActivityLog.objects.get()
@@ -129,6 +150,32 @@ class TestActivityLog(TestCase):
         entries = ActivityLog.objects.for_user(request.user)
         assert len(entries) == 1
 
+    def test_for_addons_paginated(self):
+        addon = Addon.objects.get()
+        version = addon.versions.get()
+        created = datetime(2016, 1, 1)
+        logs = [amo.log(amo.LOG.CUSTOM_TEXT, addon, version, 'log %s' % i,
+                        created=created - timedelta(days=i // 2))
+                for i in range(5)]
+        other = addon_factory()
+        for lookup in (partial(ActivityLog.objects.for_addons, addon),
+                       partial(ActivityLog.objects.for_addons, [addon, other]),
+                       partial(ActivityLog.objects.for_version, version),
+                       partial(ActivityLog.objects.for_user, self.user)):
+            # Newest first, then by id for the logs of the same date.
+            assert list(lookup()) == [logs[1], logs[0], logs[3], logs[2],
+                                      logs[4]]
+            assert list(lookup(before=logs[0])[:2]) == [logs[3], logs[2]]
+            assert list(lookup(before=logs[4])) == []
+
+    def test_for_addons_distinct(self):
+        addon = Addon.objects.get()
+        other = addon_factory()
+        log = amo.log(amo.LOG.CUSTOM_TEXT, addon, other, 'both')
+        logs = ActivityLog.objects.for_addons([addon, other])
+        assert list(logs) == [log]
+        assert logs.count() == 1
+
     def test_user_log_as_argument(self):
         """
         Tests that a user that has something done to them gets into the user
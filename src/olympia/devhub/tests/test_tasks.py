@@ -7,6 +7,7 @@ from datetime import datetime, timedelta
 from decimal import Decimal
 
 from django.conf import settings
+from django.core.management import call_command
 from django.test.utils import override_settings
 
 import mock
@@ -23,6 +24,7 @@ from olympia.amo.utils import utc_millesecs_from_epoch
 from olympia.applications.models import AppVersion
 from olympia.constants.base import VALIDATOR_SKELETON_RESULTS
 from olympia.devhub import tasks
+from olympia.devhub.models import CachedValidation
 from olympia.files.models import FileUpload
 from olympia.versions.models import Version
 
@@ -486,6 +488,66 @@ class TestValidateFilePath(ValidatorTestCase):
         assert not result['warnings']
 
 
+@mock.patch('olympia.devhub.tasks.track_validation_stats')
+@mock.patch('validator.validate.validate')
+class TestValidationCache(ValidatorTestCase):
+
+    def setUp(self):
+        super(TestValidationCache, self).setUp()
+        self.path = get_addon_file('valid_firefox_addon.xpi')
+
+    def test_same_file_validated_once(self, validate, track_stats):
+        validate.return_value = '{"errors": 0}'
+        assert tasks.run_validator(
+            self.path, listed=True, hash_='sha256:abc') == '{"errors": 0}'
+        assert tasks.run_validator(
+            self.path, listed=True, hash_='sha256:abc') == '{"errors": 0}'
+        assert validate.call_count == 1
+        cached = CachedValidation.objects.get()
+        assert cached.validation == '{"errors": 0}'
+        assert cached.size == len('{"errors": 0}')
+        assert cached.hits == 1
+
+    def test_arguments_are_part_of_the_key(self, validate, track_stats):
+        validate.return_value = '{"errors": 0}'
+        tasks.run_validator(self.path, listed=True, hash_='sha256:abc')
+        tasks.run_validator(self.path, listed=False, hash_='sha256:abc')
+        tasks.run_validator(self.path, listed=True, hash_='sha256:def')
+        tasks.run_validator(self.path, listed=True, hash_='sha256:abc',
+                            for_appversions={amo.FIREFOX.guid: ['42.0']})
+        assert validate.call_count == 4
+        with mock.patch('olympia.devhub.tasks.get_validator_version',
+                        return_value='0.0.1'):
+            tasks.run_validator(self.path, listed=True, hash_='sha256:abc')
+        assert validate.call_count == 5
+
+    def test_apps_are_part_of_the_key(self, validate, track_stats):
+        validate.return_value = '{"errors": 0}'
+        call_command('dump_apps')
+        tasks.run_validator(self.path, listed=True, hash_='sha256:abc')
+        tasks.run_validator(self.path, listed=True, hash_='sha256:abc')
+        assert validate.call_count == 1
+        self.create_appversion('firefox', '51.0')
+        call_command('dump_apps')
+        tasks.run_validator(self.path, listed=True, hash_='sha256:abc')
+        assert validate.call_count == 2
+
+    def test_no_hash(self, validate, track_stats):
+        validate.return_value = '{"errors": 0}'
+        tasks.run_validator(self.path, listed=True)
+        tasks.run_validator(self.path, listed=True)
+        assert validate.call_count == 2
+        assert not CachedValidation.objects.exists()
+
+    def test_validate_file_path(self, validate, track_stats):
+        validate.return_value = json.dumps(VALIDATOR_SKELETON_RESULTS)
+        for i in range(2):
+            result = tasks.validate_file_path(
+                self.path, hash_='sha256:abc', listed=True)
+            assert result == VALIDATOR_SKELETON_RESULTS
+        assert validate.call_count == 1
+
+
 class TestWebextensionIncompatibilities(ValidatorTestCase):
     fixtures = ['base/addon_3615']
 
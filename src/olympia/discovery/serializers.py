@@ -3,7 +3,8 @@ from django.utils.translation import ugettext as _
 from rest_framework import serializers
 
 from olympia.addons.models import Addon
-from olympia.addons.serializers import AddonSerializer, VersionSerializer
+from olympia.addons.serializers import (
+    AddonSerializer, ESBaseAddonSerializer, VersionSerializer)
 from olympia.amo.helpers import absolutify
 from olympia.versions.models import Version
 
@@ -23,10 +24,17 @@ class DiscoveryAddonSerializer(AddonSerializer):
         model = Addon
 
 
+class ESDiscoveryAddonSerializer(ESBaseAddonSerializer,
+                                 DiscoveryAddonSerializer):
+    # Only attach the translations of the fields we render: the description
+    # is part of the theme_data of themes.
+    translated_fields = ('name', 'description')
+
+
 class DiscoverySerializer(serializers.Serializer):
     heading = serializers.CharField()
     description = serializers.CharField()
-    addon = DiscoveryAddonSerializer()
+    addon = ESDiscoveryAddonSerializer()
 
     def to_representation(self, instance):
         data = super(DiscoverySerializer, self).to_representation(instance)
@@ -1,5 +1,8 @@
 # -*- coding: utf-8 -*-
+import mock
+
 from olympia import amo
+from olympia.addons.indexers import AddonIndexer
 from olympia.discovery.data import discopane_items
 from olympia.amo.helpers import absolutify
 from olympia.amo.tests import addon_factory, TestCase, user_factory
@@ -113,3 +116,36 @@ class TestDiscoveryViewList(TestCase):
         assert results[1]['addon']['id'] == discopane_items[4].addon_id
         assert results[2]['addon']['id'] == discopane_items[5].addon_id
         assert results[3]['addon']['id'] == discopane_items[6].addon_id
+
+    def _get_from_index(self):
+        docs = AddonIndexer.get_documents(self.addons.keys())
+        with mock.patch('olympia.amo.indexers.amo_search.get_es') as get_es:
+            get_es.return_value.mget.return_value = {'docs': [
+                {'_id': str(pk), 'found': True, '_source': doc}
+                for pk, doc in docs.items()]}
+            with mock.patch.object(AddonIndexer, 'extract_document') as ex:
+                response = self.client.get(self.url, {'lang': 'en-US'})
+                # Everything came from the index, nothing was extracted from
+                # the database.
+                assert not ex.called
+        assert get_es.return_value.mget.call_count == 1
+        return response
+
+    def test_list_from_index(self):
+        response = self._get_from_index()
+        assert response.data['count'] == len(discopane_items)
+        for i, result in enumerate(response.data['results']):
+            if 'theme_data' in result['addon']:
+                self._check_disco_theme(result, discopane_items[i])
+            else:
+                self._check_disco_addon(result, discopane_items[i])
+
+    def test_list_from_index_theme_description(self):
+        theme = self.addons[778525]
+        theme.description = u'Très jolie'
+        theme.save()
+        response = self._get_from_index()
+        result = [item for item in response.data['results']
+                  if item['addon']['id'] == theme.pk][0]
+        assert result['addon']['theme_data']['description'] == u'Très jolie'
+        assert result['addon']['theme_data'] == theme.persona.theme_data
@@ -2,25 +2,24 @@ from django_statsd.clients import statsd
 from rest_framework.mixins import ListModelMixin
 from rest_framework.viewsets import GenericViewSet
 
-from olympia.addons.models import Addon
+from olympia import amo
+from olympia.addons.indexers import AddonIndexer
 from olympia.discovery.data import discopane_items
-from olympia.discovery.serializers import DiscoverySerializer
+from olympia.discovery.serializers import (
+    DiscoverySerializer, ESDiscoveryAddonSerializer)
 
 
 class DiscoveryViewSet(ListModelMixin, GenericViewSet):
     permission_classes = []
     serializer_class = DiscoverySerializer
-    queryset = Addon.objects.public()
 
     def get_queryset(self):
         ids = [item.addon_id for item in discopane_items]
-        # FIXME: Implement using ES. It would look like something like this,
-        # with a specific serializer that inherits from the ES one + code to
-        # build the dict:
-        # es = amo.search.get_es()
-        # es.mget({'ids': ids}, index=AddonIndexer.get_index_alias(),
-        #         doc_type=AddonIndexer.get_doctype_name())
-        addons = self.queryset.in_bulk(ids)
+        # Fetch the add-ons from ES in one mget, only hitting the database
+        # for the ones missing from the index.
+        docs = AddonIndexer.get_valid_documents(ids, [amo.STATUS_PUBLIC])
+        addons = dict((doc['id'], ESDiscoveryAddonSerializer().fake_object(
+            doc)) for doc in docs)
 
         # Patch items to add addons.
         result = []
@@ -12,24 +12,54 @@ from olympia.files.models import FileValidation
 log = commonware.log.getLogger('z.cron')
 
 
+def _get_size(path):
+    """The size of a file, or of all the files under a directory."""
+    if not os.path.isdir(path):
+        return os.path.getsize(path)
+    size = 0
+    for root, dirs, files in os.walk(path):
+        for name in files:
+            try:
+                size += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return size
+
+
 @cronjobs.register
 def cleanup_extracted_file():
+    """
+    Evict the extracted files for file viewer, least recently used first,
+    until they fit in `settings.FILE_VIEWER_CACHE_SIZE`.
+    """
     log.info('Removing extracted files for file viewer.')
     root = os.path.join(settings.TMP_PATH, 'file_viewer')
 
-    for day in os.listdir(root):
-        full = os.path.join(root, day)
-
-        today = datetime.now().strftime('%m%d')
+    extractions = []
+    for name in os.listdir(root):
+        full = os.path.join(root, name)
+        try:
+            # `FileViewer.is_extracted` touches the extractions it uses.
+            extractions.append(
+                (os.stat(full).st_mtime, _get_size(full), full))
+        except OSError:
+            # Removed in the meantime.
+            continue
 
-        if day != today:
-            log.debug('Removing extracted files: %s, from %sd.' % (full, day))
+    total = sum(size for used, size, full in extractions)
+    for used, size, full in sorted(extractions):
+        if total <= settings.FILE_VIEWER_CACHE_SIZE:
+            break
+        log.debug('Removing extracted files: %s, last used %s.' % (
+            full, datetime.fromtimestamp(used)))
 
-            # Remove all files.
-            # No need to remove any caches since we are deleting files from
-            # yesterday or before and the cache-keys are only valid for an
-            # hour. There might be a slight edge-case but that's reasonable.
-            shutil.rmtree(full)
+        # The file listings memoized for an hour might still point to these
+        # files, the file viewer copes with that.
+        if os.path.isdir(full):
+            shutil.rmtree(full, ignore_errors=True)
+        else:
+            os.remove(full)
+        total -= size
 
 
 @cronjobs.register
@@ -1,10 +1,13 @@
 import codecs
+import hashlib
 import mimetypes
 import os
 import stat
-from datetime import datetime
+import time
+import zipfile
 
 from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.core.files.storage import default_storage as storage
 from django.utils.datastructures import SortedDict
 from django.utils.encoding import force_text
@@ -23,7 +26,8 @@ from olympia import amo
 from olympia.amo.utils import rm_local_tmp_dir
 from olympia.amo.urlresolvers import reverse
 from olympia.files.utils import (
-    extract_xpi, get_md5, get_all_files, atomic_lock)
+    EXPANDABLE_EXTENSIONS, SafeUnzip, extract_xpi, get_md5, get_all_files,
+    atomic_lock)
 
 # Allow files with a shebang through.
 denied_magic_numbers = [b for b in list(blacklisted_magic_numbers)
@@ -111,6 +115,9 @@ class FileViewer(object):
     Provide access to a storage-managed file by copying it locally and
     extracting info from it. `src` is a storage-managed path and `dest` is a
     local temp path.
+
+    Add-ons without nested archives are listed and read straight from the
+    zip instead, see `is_lazy`.
     """
 
     def __init__(self, file_obj):
@@ -118,14 +125,25 @@ class FileViewer(object):
         self.addon = self.file.version.addon
         self.src = file_obj.current_file_path
         self.dest = os.path.join(
-            settings.TMP_PATH, 'file_viewer',
-            datetime.now().strftime('%m%d'),
-            str(file_obj.pk))
+            settings.TMP_PATH, 'file_viewer', self._extraction_key())
         self._files, self.selected = None, None
+        self._lazy = None
 
     def __str__(self):
         return str(self.file.id)
 
+    def _extraction_key(self):
+        """
+        Extractions are shared by all the files with the same contents and
+        kept across days, until `files.cron.cleanup_extracted_file` evicts
+        them.
+        """
+        file_hash = self.file.hash.split(':')[-1]
+        if not file_hash or self.is_search_engine():
+            # Search engines are extracted under their own filename.
+            return 'file-%s' % self.file.pk
+        return file_hash
+
     def _cache_key(self, key=None):
         assert key is not None
         return '{0}:file-viewer:{1}:{2}'.format(
@@ -141,12 +159,13 @@ class FileViewer(object):
                   `False` in case of an existing lock.
         """
         lock = atomic_lock(
-            settings.TMP_PATH, 'file-viewer-%s' % self.file.pk,
+            settings.TMP_PATH,
+            'file-viewer-%s' % os.path.basename(self.dest),
             lifetime=LOCKED_LIFETIME)
 
         with lock as lock_attained:
             if lock_attained:
-                if self.is_extracted():
+                if os.path.exists(self.dest):
                     # Be vigilent with existing files. It's better to delete
                     # and re-extract than to trust whatever we have
                     # lying around.
@@ -189,20 +208,60 @@ class FileViewer(object):
 
     def is_extracted(self):
         """If the file has been extracted or not."""
-        return os.path.exists(self.dest)
+        if not os.path.exists(self.dest):
+            return False
+        try:
+            # Mark the extraction as recently used, for the cache eviction.
+            os.utime(self.dest, None)
+        except OSError:
+            pass
+        return True
 
-    def _is_binary(self, mimetype, path):
-        """Uses the filename to see if the file can be shown in HTML or not."""
+    def is_lazy(self):
+        """
+        If the files can be listed and read straight from the archive,
+        without extracting it: nested archives are only expanded by a full
+        extraction. The archive is opened again, and closed, each time it's
+        read from.
+        """
+        if self._lazy is None:
+            self._lazy = False
+            if (settings.FILE_VIEWER_LAZY_LISTING and
+                    not self.is_search_engine()):
+                zip_file = SafeUnzip(self.src)
+                try:
+                    valid = zip_file.is_valid(fatal=False)
+                except ValidationError:
+                    valid = False
+                if valid:
+                    zip_file.zip_file.close()
+                    self._lazy = not any(
+                        os.path.splitext(info.filename)[1] in
+                        EXPANDABLE_EXTENSIONS
+                        for info in zip_file.info_list)
+        return self._lazy
+
+    def is_available(self):
+        """If the files can be listed, extracted or not."""
+        return self.is_extracted() or self.is_lazy()
+
+    def _is_binary(self, mimetype, path, head=None):
+        """
+        Uses the filename to see if the file can be shown in HTML or not.
+        The first bytes of the file are read from `path`, unless given as
+        `head`.
+        """
         # Re-use the denied data from amo-validator to spot binaries.
         ext = os.path.splitext(path)[1][1:]
         if ext in denied_extensions:
             return True
 
-        if os.path.exists(path) and not os.path.isdir(path):
+        if head is None and os.path.exists(path) and not os.path.isdir(path):
             with storage.open(path, 'r') as rfile:
-                bytes = tuple(map(ord, rfile.read(4)))
-            if any(bytes[:len(x)] == x for x in denied_magic_numbers):
-                return True
+                head = rfile.read(4)
+        bytes = tuple(map(ord, head or ''))
+        if any(bytes[:len(x)] == x for x in denied_magic_numbers):
+            return True
 
         if mimetype:
             major, minor = mimetype.split('/')
@@ -220,7 +279,7 @@ class FileViewer(object):
         try:
             file_data = self._read_file(allow_empty)
             return file_data
-        except (IOError, OSError):
+        except (IOError, OSError, KeyError, zipfile.BadZipfile):
             self.selected['msg'] = _('That file no longer exists.')
             return ''
 
@@ -235,20 +294,56 @@ class FileViewer(object):
             self.selected['msg'] = msg
             return ''
 
-        with storage.open(self.selected['full'], 'r') as opened:
-            cont = opened.read()
-            codec = 'utf-16' if cont.startswith(codecs.BOM_UTF16) else 'utf-8'
-            try:
-                return cont.decode(codec)
-            except UnicodeDecodeError:
-                cont = cont.decode(codec, 'ignore')
-                # L10n: {0} is the filename.
-                self.selected['msg'] = (
-                    _('Problems decoding {0}.').format(codec))
-                return cont
+        if self.selected.get('member'):
+            with zipfile.ZipFile(self.src) as archive:
+                cont = archive.read(self.selected['member'])
+        else:
+            with storage.open(self.selected['full'], 'r') as opened:
+                cont = opened.read()
+        codec = 'utf-16' if cont.startswith(codecs.BOM_UTF16) else 'utf-8'
+        try:
+            return cont.decode(codec)
+        except UnicodeDecodeError:
+            cont = cont.decode(codec, 'ignore')
+            # L10n: {0} is the filename.
+            self.selected['msg'] = (
+                _('Problems decoding {0}.').format(codec))
+            return cont
 
     def select(self, file_):
         self.selected = self.get_files().get(file_)
+        if self.selected:
+            self.load_details(self.selected)
+
+    def load_details(self, entry):
+        """
+        Compute the md5 and sniff the magic number of a file listed straight
+        from the archive, which `_get_zip_files` leaves for later.
+        """
+        if not entry.get('member') or entry['md5']:
+            return entry
+        md5, head = hashlib.md5(), None
+        for chunk in self.iter_member(entry['member']):
+            if head is None:
+                head = chunk[:4]
+            md5.update(chunk)
+        entry['md5'] = md5.hexdigest()
+        entry['binary'] = self._is_binary(
+            entry['mimetype'], entry['filename'], head=head)
+        return entry
+
+    def iter_member(self, member, chunk_size=64 * 1024):
+        """
+        Stream a file of the archive, without extracting it. The archive is
+        closed once the file is read, or the iterator closed.
+        """
+        with zipfile.ZipFile(self.src) as archive, \
+                archive.open(member) as opened:
+            while True:
+                chunk = opened.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
 
     def is_binary(self):
         if self.selected:
@@ -285,15 +380,17 @@ class FileViewer(object):
         if self._files:
             return self._files
 
-        if not self.is_extracted():
-            return {}
-
         # In case a cron job comes along and deletes the files
         # mid tree building.
         try:
-            self._files = self._get_files(locale=get_language())
+            if self.is_extracted():
+                self._files = self._get_files(locale=get_language())
+            elif self.is_lazy():
+                self._files = self._get_zip_files(locale=get_language())
+            else:
+                return {}
             return self._files
-        except (OSError, IOError):
+        except (OSError, IOError, zipfile.BadZipfile):
             return {}
 
     def truncate(self, filename, pre_length=15,
@@ -393,6 +490,77 @@ class FileViewer(object):
 
         return result
 
+    @memoize(prefix='file-viewer-zip', time=60 * 60)
+    def _get_zip_files(self, locale=None):
+        """
+        Like `_get_files`, but reading the central directory of the archive
+        instead of the extracted files. The md5 and the magic number of each
+        file are only looked at once selected, see `load_details`.
+        """
+        # Archives don't always list the directories, add them all.
+        infos, children = {}, {}
+        with zipfile.ZipFile(self.src) as archive:
+            info_list = archive.infolist()
+        for info in info_list:
+            name = info.filename.rstrip('/')
+            if not name:
+                continue
+            parts = name.split('/')
+            for depth in range(1, len(parts) + 1):
+                path = '/'.join(parts[:depth])
+                children.setdefault('/'.join(parts[:depth - 1]), set()).add(
+                    path)
+                infos.setdefault(path, None)
+            if not info.filename.endswith('/'):
+                infos[name] = info
+
+        # Same order as `get_all_files`: directories first, then files.
+        def iterate(parent):
+            paths = sorted(children.get(parent, ()))
+            for path in paths:
+                if infos[path] is None or path in children:
+                    yield path
+                    for child in iterate(path):
+                        yield child
+            for path in paths:
+                if infos[path] is not None and path not in children:
+                    yield path
+
+        result = SortedDict()
+        archive_modified = os.stat(self.src)[stat.ST_MTIME]
+
+        for path in iterate(''):
+            info = infos[path]
+            directory = info is None or path in children
+            filename = force_text(path.split('/')[-1], errors='replace')
+            short = force_text(path, errors='replace')
+            mime, encoding = mimetypes.guess_type(filename)
+
+            result[short] = {
+                'binary': self._is_binary(mime, filename, head=''),
+                'crc': '' if directory else '%08x' % info.CRC,
+                'depth': short.count('/'),
+                'directory': directory,
+                'filename': filename,
+                'full': None,
+                'md5': '',
+                'member': None if directory else info.filename,
+                'mimetype': mime or 'application/octet-stream',
+                'syntax': self.get_syntax(filename),
+                'modified': (archive_modified if directory else
+                             int(time.mktime(info.date_time + (0, 0, -1)))),
+                'short': short,
+                'size': 0 if directory else info.file_size,
+                'truncated': self.truncate(filename),
+                'url': reverse('files.list',
+                               args=[self.file.id, 'file', short]),
+                'url_serve': reverse('files.redirect',
+                                     args=[self.file.id, short]),
+                'version': self.file.version.version,
+            }
+
+        return result
+
     def _check_dest_for_complete_listing(self, expected_files):
         """Check that all filex we expect are in `self.dest`."""
         dest_len = len(self.dest)
@@ -448,6 +616,9 @@ class DiffHelper(object):
     def is_extracted(self):
         return self.left.is_extracted() and self.right.is_extracted()
 
+    def is_available(self):
+        return self.left.is_available() and self.right.is_available()
+
     def get_url(self, short):
         return reverse('files.compare',
                        args=[self.left.file.id, self.right.file.id,
@@ -464,7 +635,7 @@ class DiffHelper(object):
         different = []
         for key, file in left_files.items():
             file['url'] = self.get_url(file['short'])
-            diff = file['md5'] != right_files.get(key, {}).get('md5')
+            diff = self.is_different(file, right_files.get(key))
             file['diff'] = diff
             if diff:
                 different.append(file)
@@ -478,6 +649,19 @@ class DiffHelper(object):
 
         return left_files
 
+    def is_different(self, left, right):
+        """
+        Compare the left and right entries of a file, by CRC when both were
+        listed straight from the archives, by md5 otherwise.
+        """
+        if right is None:
+            return True
+        if left.get('crc') and right.get('crc'):
+            return ((left['crc'], left['size']) !=
+                    (right['crc'], right['size']))
+        return (self.left.load_details(left)['md5'] !=
+                self.right.load_details(right)['md5'])
+
     def get_deleted_files(self):
         """
         Get files that exist in right, but not in left. These
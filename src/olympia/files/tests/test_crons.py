@@ -1,7 +1,10 @@
 import os
+import time
+
+from django.conf import settings
 
 import pytest
-from freezegun import freeze_time
+from mock import patch
 
 from olympia.files.helpers import FileViewer
 from olympia.files.cron import cleanup_extracted_file
@@ -10,34 +13,37 @@ from olympia.files.tests.test_helpers import get_file, make_file
 
 @pytest.mark.django_db
 def test_cleanup_extracted_file():
-    with freeze_time('2017-01-08 10:01:00'):
-        viewer = FileViewer(make_file(1, get_file('webextension.xpi')))
-
-        assert '0108' in viewer.dest
-        assert not os.path.exists(viewer.dest)
+    viewer = FileViewer(make_file(1, get_file('webextension.xpi')))
+    other = FileViewer(make_file(2, get_file('webextension.xpi')))
 
-        viewer.extract()
+    assert not os.path.exists(viewer.dest)
 
-        assert os.path.exists(viewer.dest)
+    viewer.extract()
+    other.extract()
 
-        # Cleaning up only cleans up yesterdays files so it doesn't touch
-        # us today...
-        cleanup_extracted_file()
+    assert os.path.exists(viewer.dest)
+    assert os.path.exists(other.dest)
 
-        assert os.path.exists(viewer.dest)
+    # The extractions fit in the cache, whenever they were used...
+    an_hour_ago = time.time() - 60 * 60
+    os.utime(viewer.dest, (an_hour_ago, an_hour_ago))
+    cleanup_extracted_file()
 
-    # Even hours later we don't cleanup yet...
-    with freeze_time('2017-01-08 23:59:00'):
-        assert os.path.exists(viewer.dest)
+    assert os.path.exists(viewer.dest)
+    assert os.path.exists(other.dest)
 
+    # ...until they don't: the least recently used ones go first.
+    with patch.object(settings, 'FILE_VIEWER_CACHE_SIZE', 400):
         cleanup_extracted_file()
 
-        assert os.path.exists(viewer.dest)
+    assert not os.path.exists(viewer.dest)
+    assert os.path.exists(other.dest)
 
-    # But yesterday... we'll cleanup properly
-    with freeze_time('2017-01-07 10:01:00'):
-        assert os.path.exists(viewer.dest)
+    # Using an extraction keeps it around.
+    assert other.is_extracted()
+    assert os.stat(other.dest).st_mtime > an_hour_ago
 
+    with patch.object(settings, 'FILE_VIEWER_CACHE_SIZE', 0):
         cleanup_extracted_file()
 
-        assert not os.path.exists(viewer.dest)
+    assert not os.path.exists(other.dest)
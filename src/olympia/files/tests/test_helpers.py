@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
+import hashlib
 import os
 import mimetypes
 import shutil
@@ -12,7 +13,6 @@ from django import forms
 import pytest
 import flufl.lock
 from mock import Mock, patch
-from freezegun import freeze_time
 
 from olympia import amo
 from olympia.amo.tests import TestCase
@@ -31,6 +31,7 @@ def get_file(filename):
 def make_file(pk, file_path, **kwargs):
     obj = Mock()
     obj.id = obj.pk = pk
+    obj.hash = ''
     for k, v in kwargs.items():
         setattr(obj, k, v)
     obj.file_path = file_path
@@ -94,7 +95,7 @@ class TestFileViewer(TestCase):
         assert self.viewer.extract()
 
         lock = flufl.lock.Lock(os.path.join(
-            settings.TMP_PATH, 'file-viewer-%s.lock' % self.viewer.file.pk
+            settings.TMP_PATH, 'file-viewer-file-%s.lock' % self.viewer.file.pk
         ))
 
         assert not lock.is_locked
@@ -111,7 +112,7 @@ class TestFileViewer(TestCase):
         assert not self.viewer.is_extracted()
 
         lock = flufl.lock.Lock(os.path.join(
-            settings.TMP_PATH, 'file-viewer-%s.lock' % self.viewer.file.pk
+            settings.TMP_PATH, 'file-viewer-file-%s.lock' % self.viewer.file.pk
         ))
 
         assert not lock.is_locked
@@ -129,12 +130,24 @@ class TestFileViewer(TestCase):
         self.viewer.cleanup()
         assert not self.viewer.is_extracted()
 
-    @freeze_time('2017-01-08 02:01:00')
     def test_dest(self):
         viewer = FileViewer(make_file(1, get_file('webextension.xpi')))
         assert viewer.dest == os.path.join(
-            settings.TMP_PATH, 'file_viewer',
-            '0108', str(self.viewer.file.pk))
+            settings.TMP_PATH, 'file_viewer', 'file-1')
+
+    def test_dest_shared_by_hash(self):
+        viewer = FileViewer(make_file(1, get_file('webextension.xpi'),
+                                      hash='sha256:abc123'))
+        other = FileViewer(make_file(2, get_file('webextension.xpi'),
+                                     hash='sha256:abc123'))
+        assert viewer.dest == other.dest == os.path.join(
+            settings.TMP_PATH, 'file_viewer', 'abc123')
+
+        viewer.extract()
+        try:
+            assert other.is_extracted()
+        finally:
+            viewer.cleanup()
 
     def test_isbinary(self):
         binary = self.viewer._is_binary
@@ -170,9 +183,47 @@ class TestFileViewer(TestCase):
                       'somelongfilenam...somelonge..'],):
             assert truncate(x) == y
 
+    @patch.object(settings, 'FILE_VIEWER_LAZY_LISTING', False)
     def test_get_files_not_extracted(self):
         assert not self.viewer.get_files()
 
+    def test_get_files_lazy(self):
+        assert self.viewer.is_lazy()
+        files = self.viewer.get_files()
+        assert not self.viewer.is_extracted()
+
+        self.viewer.extract()
+        self.viewer._files = None
+        cache.clear()
+        extracted = self.viewer.get_files()
+        assert files.keys() == extracted.keys()
+        for key, entry in files.items():
+            for name in ('depth', 'directory', 'filename', 'mimetype',
+                         'short', 'url'):
+                assert entry[name] == extracted[key][name]
+            if not entry['directory']:
+                assert entry['size'] == extracted[key]['size']
+
+    def test_get_files_lazy_details(self):
+        files = self.viewer.get_files()
+        assert files['install.js']['md5'] == ''
+        assert files['install.js']['member'] == 'install.js'
+
+        self.viewer.select('install.js')
+        contents = zipfile.ZipFile(self.viewer.src).read('install.js')
+        assert self.viewer.selected['md5'] == hashlib.md5(contents).hexdigest()
+        assert not self.viewer.is_binary()
+        assert self.viewer.read_file().startswith('var ')
+
+    def test_not_lazy_with_nested_archives(self):
+        self.viewer.src = get_file('recurse.xpi')
+        assert not self.viewer.is_lazy()
+        assert not self.viewer.get_files()
+
+    @patch.object(settings, 'FILE_UNZIP_SIZE_LIMIT', 5)
+    def test_not_lazy_when_invalid(self):
+        assert not self.viewer.is_lazy()
+
     def test_get_files_size(self):
         self.viewer.extract()
         files = self.viewer.get_files()
@@ -465,6 +516,24 @@ class TestDiffHelper(TestCase):
         assert not self.helper.is_diffable()
         assert self.helper.left.selected['msg'].startswith('This file')
 
+    def test_diffable_lazy(self):
+        files = self.helper.get_files()
+        assert not self.helper.is_extracted()
+        assert self.helper.is_available()
+        assert not any(entry['diff'] for entry in files.values())
+
+        self.helper.select('install.js')
+        assert self.helper.is_diffable()
+        left, right = self.helper.read_file()
+        assert left == right
+
+    def test_diffable_lazy_one_extracted(self):
+        self.helper.right.extract()
+        self.change(self.helper.right.dest, 'asd')
+        files = self.helper.get_files()
+        assert files['install.js']['diff']
+        assert not files['install.rdf']['diff']
+
     def test_diffable_parent(self):
         self.helper.extract()
         self.change(self.helper.left.dest, 'asd',
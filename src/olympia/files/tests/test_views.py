@@ -3,6 +3,7 @@ import json
 import os
 import shutil
 import urlparse
+import zipfile
 
 from django.conf import settings
 from django.core.cache import cache
@@ -489,6 +490,26 @@ class TestFileViewer(FilesBase, TestCase):
         assert res[settings.XSENDFILE_HEADER] == (
             self.file_viewer.get_files().get(binary)['full'])
 
+    def test_bounce_lazy(self):
+        res = self.client.get(self.files_redirect(binary), follow=True)
+        assert res.status_code == 200
+        assert settings.XSENDFILE_HEADER not in res
+        assert not self.file_viewer.is_extracted()
+        contents = zipfile.ZipFile(self.file_viewer.src).read(binary)
+        assert ''.join(res.streaming_content) == contents
+        assert res['Content-Length'] == str(len(contents))
+
+    def test_bounce_directory(self):
+        self.file_viewer.extract()
+        res = self.client.get(self.files_redirect('dictionaries'),
+                              follow=True)
+        assert res.status_code == 404
+
+    def test_bounce_lazy_directory(self):
+        res = self.client.get(self.files_redirect('dictionaries'),
+                              follow=True)
+        assert res.status_code == 404
+
     @patch.object(settings, 'FILE_VIEWER_SIZE_LIMIT', 5)
     def test_file_size(self):
         self.file_viewer.extract()
@@ -596,6 +596,10 @@ def get_all_files(folder, strip_prefix='', prefix=None):
     return all_files
 
 
+# Nested archives expanded by `extract_xpi`.
+EXPANDABLE_EXTENSIONS = ['.crx', '.jar', '.xpi', '.zip']
+
+
 def extract_xpi(xpi, path, expand=False, verify=True):
     """
     If expand is given, will look inside the expanded file
@@ -606,7 +610,6 @@ def extract_xpi(xpi, path, expand=False, verify=True):
     contents. If you have 'foo.jar', that contains 'some-image.jpg', then
     it will create a folder, foo.jar, with an image inside.
     """
-    expand_allow_list = ['.crx', '.jar', '.xpi', '.zip']
     tempdir = extract_zip(xpi)
     all_files = get_all_files(tempdir)
 
@@ -615,7 +618,7 @@ def extract_xpi(xpi, path, expand=False, verify=True):
             flag = False
             for root, dirs, files in os.walk(tempdir):
                 for name in files:
-                    if os.path.splitext(name)[1] in expand_allow_list:
+                    if os.path.splitext(name)[1] in EXPANDABLE_EXTENSIONS:
                         src = os.path.join(root, name)
                         if not os.path.isdir(src):
                             dest = extract_zip(src, remove=True, fatal=False)
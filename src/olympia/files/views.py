@@ -93,10 +93,10 @@ def browse(request, viewer, key=None, type='file'):
     data['poll_url'] = reverse('files.poll', args=[viewer.file.id])
     data['form'] = form
 
-    if not viewer.is_extracted():
+    if not viewer.is_available():
         extract_file(viewer)
 
-    if viewer.is_extracted():
+    if viewer.is_available():
         data.update({'status': True, 'files': viewer.get_files()})
         key = viewer.get_default(key)
         if key not in data['files']:
@@ -144,11 +144,11 @@ def compare(request, diff, key=None, type='file'):
                                      diff.right.file.id])
     data['form'] = form
 
-    if not diff.is_extracted():
-        extract_file(diff.left)
-        extract_file(diff.right)
+    for viewer in (diff.left, diff.right):
+        if not viewer.is_available():
+            extract_file(viewer)
 
-    if diff.is_extracted():
+    if diff.is_available():
         data.update({'status': True,
                      'files': diff.get_files(),
                      'files_deleted': diff.get_deleted_files()})
@@ -188,5 +188,13 @@ def serve(request, viewer, key):
         log.error(u'Couldn\'t find %s in %s (%d entries) for file %s' %
                   (key, files.keys()[:10], len(files.keys()), viewer.file.id))
         raise http.Http404
+    if obj['directory']:
+        raise http.Http404
+    if obj.get('member'):
+        # Listed straight from the archive, stream it from there.
+        response = http.StreamingHttpResponse(
+            viewer.iter_member(obj['member']), content_type=obj['mimetype'])
+        response['Content-Length'] = obj['size']
+        return response
     return HttpResponseSendFile(request, obj['full'],
                                 content_type=obj['mimetype'])
@@ -0,0 +1,68 @@
+import time
+from optparse import make_option
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.client import RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from olympia import amo
+from olympia.addons.models import Addon
+from olympia.legacy_api import views
+
+
+HELP = """\
+Measure the queries and the time spent per guid search request for 1, 20
+and 200 guids, with a cold and a warm cache. Guids without public add-ons
+are made up when there aren't enough of them.
+
+    `./manage.py benchmark_guid_search --requests=20`
+"""
+
+
+class Command(BaseCommand):
+    option_list = BaseCommand.option_list + (
+        make_option('--requests', type='int', default=10,
+                    help='Number of requests per scenario.'),
+        make_option('--api-version', default='1.5',
+                    help='API version to search with.'),
+    )
+    help = HELP
+
+    def handle(self, *args, **kw):
+        factory = RequestFactory()
+        count = kw['requests']
+        api_version = kw['api_version']
+        lang = 'en-US'
+        public = list(Addon.objects.public().exclude(guid=None)
+                      .values_list('guid', flat=True)[:200])
+
+        def search(guids):
+            request = factory.get('/%s/firefox/api/%s/search/guid:%s' % (
+                lang, api_version, ','.join(guids)))
+            request.LANG, request.APP = lang, amo.FIREFOX
+            request.user = AnonymousUser()
+            return views.guid_search(request, api_version, ','.join(guids))
+
+        self.stdout.write('%-8s %-8s %12s %10s' % ('guids', 'cache',
+                                                   'queries/req', 'ms/req'))
+        for size in (1, 20, 200):
+            guids = (public + ['unknown-%s@benchmark' % i
+                               for i in range(size)])[:size]
+            keys = [views.guid_search_cache_key(api_version, lang, guid)
+                    for guid in guids]
+            for name, clear in (('cold', True), ('warm', False)):
+                queries, elapsed = 0, 0
+                for i in range(count):
+                    if clear:
+                        cache.delete_many(keys)
+                    start = time.time()
+                    with CaptureQueriesContext(connection) as captured:
+                        search(guids)
+                    elapsed += time.time() - start
+                    queries += len(captured)
+                self.stdout.write('%-8d %-8s %12.1f %10.3f' % (
+                    size, name, float(queries) / count,
+                    elapsed * 1000 / count))
@@ -1,6 +1,11 @@
+from mock import patch
+
 from olympia import amo
 from olympia.amo.tests import addon_factory, TestCase, version_factory
-from olympia.legacy_api.utils import find_compatible_version
+from olympia.amo.utils import cache_ns_key
+from olympia.legacy_api.utils import (
+    _find_compatible_version_ids, find_compatible_version,
+    find_compatible_versions)
 
 
 class TestCompatibleVersion(TestCase):
@@ -13,3 +18,51 @@ class TestCompatibleVersion(TestCase):
             addon=addon, status=amo.STATUS_PUBLIC, version='100',
             channel=amo.RELEASE_CHANNEL_UNLISTED)
         assert find_compatible_version(addon, amo.FIREFOX.id) == version
+
+
+class TestCompatibleVersions(TestCase):
+    def setUp(self):
+        super(TestCompatibleVersions, self).setUp()
+        self.addons = [addon_factory(), addon_factory()]
+        self.versions = [
+            version_factory(addon=addon, status=amo.STATUS_PUBLIC,
+                            version='99')
+            for addon in self.addons]
+        self.no_version = addon_factory(
+            version_kw={'application': amo.THUNDERBIRD.id})
+        self.addons.append(self.no_version)
+
+    def test_compatible_versions(self):
+        with patch('olympia.legacy_api.utils._find_compatible_version_ids',
+                   wraps=_find_compatible_version_ids) as find:
+            result = find_compatible_versions(self.addons, amo.FIREFOX.id)
+        assert find.call_count == 1
+        assert result == {self.addons[0].id: self.versions[0],
+                          self.addons[1].id: self.versions[1],
+                          self.no_version.id: None}
+
+    def test_no_app(self):
+        with self.assertNumQueries(0):
+            result = find_compatible_versions(self.addons, None)
+        assert result == dict((addon.id, None) for addon in self.addons)
+
+    def test_cached(self):
+        find_compatible_versions(self.addons, amo.FIREFOX.id)
+        with patch('olympia.legacy_api.utils._find_compatible_version_ids',
+                   wraps=_find_compatible_version_ids) as find:
+            result = find_compatible_versions(self.addons, amo.FIREFOX.id)
+            assert result[self.addons[0].id] == self.versions[0]
+            assert result[self.no_version.id] is None
+
+            # The single add-on lookup shares the same cache.
+            assert find_compatible_version(
+                self.addons[1], amo.FIREFOX.id) == self.versions[1]
+        assert not find.called
+
+    def test_cache_invalidation(self):
+        find_compatible_versions(self.addons, amo.FIREFOX.id)
+        version = version_factory(addon=self.no_version,
+                                  status=amo.STATUS_PUBLIC, version='100')
+        cache_ns_key('d2c-versions:%s' % self.no_version.id, increment=True)
+        result = find_compatible_versions(self.addons, amo.FIREFOX.id)
+        assert result[self.no_version.id] == version
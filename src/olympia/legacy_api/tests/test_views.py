@@ -819,6 +819,29 @@ class TestGuidSearch(TestCase):
         response = make_call(self.good, lang='fr')
         self.assertContains(response, '<summary>Francais')
 
+    def test_order(self):
+        r = make_call('search/guid:{2fa4ed95-0317-4c6a-a74c-5f3e3912c1f9},'
+                      '{22870005-adef-4c9d-ae36-d0e1f2f27e5a},'
+                      '{2fa4ed95-0317-4c6a-a74c-5f3e3912c1f9}')
+        assert ['3615', '6113'] == (
+            [a.attrib['id'] for a in pq(r.content)('addon')])
+
+    def test_single_addon_query(self):
+        with patch('olympia.legacy_api.views.Addon.objects.public',
+                   wraps=Addon.objects.public) as public:
+            r = make_call(self.good + ',unknown@guid,other@guid')
+        assert public.call_count == 1
+        assert set(['3615', '6113']) == (
+            set([a.attrib['id'] for a in pq(r.content)('addon')]))
+
+    def test_negative_results_cached(self):
+        make_call('search/guid:unknown@guid')
+        with patch('olympia.legacy_api.views.Addon.objects.public',
+                   wraps=Addon.objects.public) as public:
+            r = make_call('search/guid:unknown@guid')
+        assert not public.called
+        assert len(pq(r.content)('addon')) == 0
+
     def test_xss(self):
         addon_factory(guid='test@xss', name='<script>alert("test");</script>')
         r = make_call('search/guid:test@xss')
@@ -2,6 +2,7 @@ import re
 
 from django.conf import settings
 from django.core.cache import cache
+from django.db import connection
 from django.utils.html import strip_tags
 
 import commonware.log
@@ -9,7 +10,7 @@ import commonware.log
 from olympia import amo
 from olympia.amo.helpers import absolutify
 from olympia.amo.urlresolvers import reverse
-from olympia.amo.utils import cache_ns_key, urlparams, epoch
+from olympia.amo.utils import cache_ns_keys, urlparams, epoch
 from olympia.tags.models import Tag
 from olympia.versions.compare import version_int
 from olympia.versions.models import Version
@@ -166,8 +167,22 @@ def find_compatible_version(addon, app_id, app_version=None, platform=None,
                             compat_mode='strict'):
     """Returns the newest compatible version (ordered by version id desc)
     for the given addon."""
+    return find_compatible_versions([addon], app_id, app_version, platform,
+                                    compat_mode).get(addon.id)
+
+
+def find_compatible_versions(addons, app_id, app_version=None, platform=None,
+                             compat_mode='strict'):
+    """
+    Returns a dict of add-on id to the newest compatible version (ordered by
+    version id desc) of each of the given addons, or None.
+
+    The versions are looked up in the `d2c-versions` cache of each add-on
+    first, the others are found with one query per set of valid file
+    statuses, which is usually a single one.
+    """
     if not app_id:
-        return None
+        return dict((addon.id, None) for addon in addons)
 
     if platform:
         # We include platform_id=1 always in the SQL so we skip it here.
@@ -177,44 +192,80 @@ def find_compatible_version(addon, app_id, app_version=None, platform=None,
         else:
             platform = None
 
-    log.debug(u'Checking compatibility for add-on ID:%s, APP:%s, V:%s, '
-              u'OS:%s, Mode:%s' % (addon.id, app_id, app_version, platform,
-                                   compat_mode))
-    valid_file_statuses = ','.join(map(str, addon.valid_file_statuses))
+    log.debug(u'Checking compatibility for add-on IDs:%s, APP:%s, V:%s, '
+              u'OS:%s, Mode:%s' % ([addon.id for addon in addons], app_id,
+                                   app_version, platform, compat_mode))
+    if not app_version:
+        # We can't perform the search queries for strict or normal without
+        # an app version.
+        compat_mode = 'ignore'
+
+    ns_keys = cache_ns_keys(['d2c-versions:%s' % addon.id
+                             for addon in addons])
+    cache_keys = dict(
+        (addon.id, '%s:%s:%s:%s:%s' % (
+            ns_keys['d2c-versions:%s' % addon.id], app_id, app_version,
+            platform, compat_mode))
+        for addon in addons)
+    cached = cache.get_many(cache_keys.values())
+
+    cached_ids = dict((addon.id, cached[cache_keys[addon.id]])
+                      for addon in addons if cache_keys[addon.id] in cached)
+    versions = Version.objects.in_bulk(
+        [pk for pk in cached_ids.values() if pk])
+
+    result, missing = {}, {}
+    for addon in addons:
+        version_id = cached_ids.get(addon.id)
+        if version_id == 0:
+            result[addon.id] = None
+        elif version_id in versions:
+            log.debug(u'Found compatible version in cache: %s => %s' % (
+                      cache_keys[addon.id], version_id))
+            result[addon.id] = versions[version_id]
+        else:
+            statuses = tuple(addon.valid_file_statuses)
+            missing.setdefault(statuses, []).append(addon.id)
+
+    found = {}
+    for statuses, addon_ids in missing.items():
+        found.update(_find_compatible_version_ids(
+            addon_ids, statuses, app_id, app_version, platform, compat_mode))
+    versions = Version.objects.in_bulk(found.values()) if found else {}
+
+    to_cache = {}
+    for addon_ids in missing.values():
+        for addon_id in addon_ids:
+            result[addon_id] = versions.get(found.get(addon_id))
+            to_cache[cache_keys[addon_id]] = found.get(addon_id, 0)
+    if to_cache:
+        log.debug(u'Caching compat versions %s' % to_cache)
+        cache.set_many(to_cache, None)
+
+    return result
+
+
+def _find_compatible_version_ids(addon_ids, valid_file_statuses, app_id,
+                                 app_version, platform, compat_mode):
+    """
+    Returns a dict of add-on id to the id of its newest compatible version,
+    for the add-ons of `addon_ids` that have one.
+    """
     data = {
-        'id': addon.id,
+        'ids': ','.join(map(str, map(int, addon_ids))),
         'app_id': app_id,
         'platform': platform,
-        'valid_file_statuses': valid_file_statuses,
+        'valid_file_statuses': ','.join(map(str, valid_file_statuses)),
         'channel': amo.RELEASE_CHANNEL_LISTED,
     }
     if app_version:
         data.update(version_int=version_int(app_version))
-    else:
-        # We can't perform the search queries for strict or normal without
-        # an app version.
-        compat_mode = 'ignore'
-
-    ns_key = cache_ns_key('d2c-versions:%s' % addon.id)
-    cache_key = '%s:%s:%s:%s:%s' % (ns_key, app_id, app_version, platform,
-                                    compat_mode)
-    version_id = cache.get(cache_key)
-    if version_id is not None:
-        log.debug(u'Found compatible version in cache: %s => %s' % (
-                  cache_key, version_id))
-        if version_id == 0:
-            return None
-        else:
-            try:
-                return Version.objects.get(pk=version_id)
-            except Version.DoesNotExist:
-                pass
 
     raw_sql = ["""
-        SELECT versions.*
+        SELECT versions.addon_id, MAX(versions.id)
         FROM versions
         INNER JOIN addons
-            ON addons.id = versions.addon_id AND addons.id = %(id)s
+            ON addons.id = versions.addon_id AND addons.id IN (%(ids)s)
         INNER JOIN applications_versions
             ON applications_versions.version_id = versions.id
         INNER JOIN appversions appmin
@@ -269,17 +320,8 @@ def find_compatible_version(addon, app_id, app_version=None, platform=None,
     else:  # Not defined or 'strict'.
         raw_sql.append('AND appmax.version_int >= %(version_int)s ')
 
-    raw_sql.append('ORDER BY versions.id DESC LIMIT 1;')
-
-    version = Version.objects.raw(''.join(raw_sql) % data)
-    if version:
-        version = version[0]
-        version_id = version.id
-    else:
-        version = None
-        version_id = 0
-
-    log.debug(u'Caching compat version %s => %s' % (cache_key, version_id))
-    cache.set(cache_key, version_id, None)
+    raw_sql.append('GROUP BY versions.addon_id;')
 
-    return version
+    with connection.cursor() as cursor:
+        cursor.execute(''.join(raw_sql) % data)
+        return dict(cursor.fetchall())
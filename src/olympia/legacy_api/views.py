@@ -6,6 +6,7 @@ import itertools
 import json
 import random
 import urllib
+from collections import OrderedDict
 from datetime import date, timedelta
 
 from django.core.cache import cache
@@ -29,7 +30,7 @@ from olympia.amo.models import manual_order
 from olympia.amo.urlresolvers import get_url_prefix
 from olympia.amo.utils import AMOJSONEncoder
 from olympia.legacy_api.utils import (
-    addon_to_dict, extract_filters, find_compatible_version)
+    addon_to_dict, extract_filters, find_compatible_versions)
 from olympia.search.views import (
     AddonSuggestionsAjax, PersonaSuggestionsAjax, name_query)
 from olympia.versions.compare import version_int
@@ -63,14 +64,27 @@ def partition(seq, key):
 def render_xml_to_string(request, template, context=None):
     if context is None:
         context = {}
+    return render_xml_fragments(request, template, [context])[0]
+
+
+def render_xml_fragments(request, template, contexts):
+    """
+    Render `template` once per context of `contexts`, loading the template
+    and running the context processors only once for the whole batch.
+    """
     if not jingo._helpers_loaded:
         jingo.load_helpers()
 
+    processed = {}
     for processor in get_standard_processors():
-        context.update(processor(request))
+        processed.update(processor(request))
 
     template = xml_env.get_template(template)
-    return template.render(context)
+    fragments = []
+    for context in contexts:
+        context.update(processed)
+        fragments.append(template.render(context))
+    return fragments
 
 
 @non_atomic_requests
@@ -165,6 +179,11 @@ def addon_filter(addons, addon_type, limit, app, platform, version,
             return app.min.version_int <= vint
 
         xs = [(a, a.compatible_apps) for a in addons]
+        if compat_mode == 'normal':
+            # This does a db hit but it's cached. This handles the cases for
+            # strict opt-in, binary components, and compat overrides.
+            compatible = find_compatible_versions(
+                addons, APP.id, version, platform, compat_mode)
 
         # Iterate over addons, checking compatibility depending on compat_mode.
         addons = []
@@ -177,11 +196,7 @@ def addon_filter(addons, addon_type, limit, app, platform, version,
                 if app and f_ignore(app):
                     addons.append(addon)
             elif compat_mode == 'normal':
-                # This does a db hit but it's cached. This handles the cases
-                # for strict opt-in, binary components, and compat overrides.
-                v = find_compatible_version(addon, APP.id, version, platform,
-                                            compat_mode)
-                if v:  # There's a compatible version.
+                if compatible[addon.id]:  # There's a compatible version.
                     addons.append(addon)
 
     # Put personas back in.
@@ -281,47 +296,59 @@ class AddonDetailView(APIView):
         return json.dumps(addon_to_dict(context['addon']), cls=AMOJSONEncoder)
 
 
-@non_atomic_requests
-def guid_search(request, api_version, guids):
-    lang = request.LANG
-
-    def guid_search_cache_key(guid):
-        key = 'guid_search:%s:%s:%s' % (api_version, lang, guid)
-        return hashlib.md5(force_bytes(key)).hexdigest()
-
-    guids = [guid.strip() for guid in guids.split(',')] if guids else []
+def guid_search_cache_key(api_version, lang, guid):
+    key = 'guid_search:%s:%s:%s' % (api_version, lang, guid)
+    return hashlib.md5(force_bytes(key)).hexdigest()
 
-    addons_xml = cache.get_many(
-        [guid_search_cache_key(guid) for guid in guids])
-    dirty_keys = set()
 
-    for guid in guids:
-        key = guid_search_cache_key(guid)
-        if key not in addons_xml:
-            dirty_keys.add(key)
-            try:
-                # Only search through public (and not disabled) add-ons.
-                addon = Addon.objects.public().get(guid=guid)
+def render_guid_search_addons(request, api_version, guids):
+    """
+    Render the add-ons of `guids` for `guid_search`, returning a dict of
+    guid to xml fragment, empty when there is no public add-on for a guid.
+    All the add-ons are fetched and transformed in a single query.
+    """
+    # Only search through public (and not disabled) add-ons. Guids are
+    # compared case insensitively, like the database does.
+    addons = dict((addon.guid.lower(), addon) for addon in
+                  Addon.objects.public().filter(guid__in=guids))
+    found = [guid for guid in guids if guid.lower() in addons]
+    fragments = render_xml_fragments(
+        request, 'legacy_api/includes/addon.xml', [
+            {'addon': addons[guid.lower()],
+             'api_version': api_version,
+             'api': legacy_api} for guid in found])
+
+    addons_xml = dict((guid, '') for guid in guids)
+    addons_xml.update(zip(found, fragments))
+    return addons_xml
 
-            except Addon.DoesNotExist:
-                addons_xml[key] = ''
 
-            else:
-                addon_xml = render_xml_to_string(
-                    request, 'legacy_api/includes/addon.xml', {
-                        'addon': addon,
-                        'api_version': api_version,
-                        'api': legacy_api
-                    })
-                addons_xml[key] = addon_xml
+@non_atomic_requests
+def guid_search(request, api_version, guids):
+    lang = request.LANG
 
-    cache.set_many(dict((k, v) for k, v in addons_xml.iteritems()
-                        if k in dirty_keys))
+    guids = [guid.strip() for guid in guids.split(',')] if guids else []
+    # Keep the order of the guids, skipping duplicates and empty ones.
+    guids = [guid for guid in OrderedDict.fromkeys(guids) if guid]
+    keys = dict((guid, guid_search_cache_key(api_version, lang, guid))
+                for guid in guids)
+
+    addons_xml = cache.get_many(keys.values())
+    missing = [guid for guid in guids if keys[guid] not in addons_xml]
+    if missing:
+        # Guids without add-ons are cached too, as empty fragments.
+        dirty = dict(
+            (keys[guid], xml) for guid, xml in
+            render_guid_search_addons(request, api_version, missing)
+            .iteritems())
+        cache.set_many(dirty)
+        addons_xml.update(dirty)
 
     compat = (CompatOverride.objects.filter(guid__in=guids)
               .transform(CompatOverride.transformer))
 
-    addons_xml = [v for v in addons_xml.values() if v]
+    addons_xml = [addons_xml[keys[guid]] for guid in guids
+                  if addons_xml[keys[guid]]]
     return render_xml(request, 'legacy_api/search.xml', {
         'addons_xml': addons_xml,
         'total': len(addons_xml),
@@ -382,12 +409,14 @@ class SearchView(APIView):
         qs = qs[:limit]
         total = qs.count()
 
+        addons = list(qs)
+        compat_versions = find_compatible_versions(
+            addons, app_id, params['version'], params['platform'],
+            compat_mode)
+
         results = []
-        for addon in qs:
-            compat_version = find_compatible_version(addon, app_id,
-                                                     params['version'],
-                                                     params['platform'],
-                                                     compat_mode)
+        for addon in addons:
+            compat_version = compat_versions[addon.id]
             # Specific case for Personas (bug 990768): if we search providing
             # the Persona addon type (9), then don't look for a compatible
             # version.
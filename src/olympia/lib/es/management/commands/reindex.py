@@ -1,3 +1,4 @@
+import datetime
 import json
 import logging
 import os
@@ -6,19 +7,23 @@ import time
 
 from optparse import make_option
 
-from celery import group
+from celery import chain, group
+from dateutil.parser import parse
 from elasticsearch.exceptions import NotFoundError
 
 from django.conf import settings
 from django.core.management.base import BaseCommand, CommandError
 
+from olympia.addons.cron import reindex_addons_since
 from olympia.amo.search import get_es
 from olympia.amo.celery import task
 from olympia.search import indexers as search_indexers
 from olympia.stats import search as stats_search
+from olympia.lib.es.models import Reindexing
 from olympia.lib.es.utils import (
-    is_reindexing_amo, unflag_reindexing_amo, flag_reindexing_amo,
-    timestamp_index)
+    get_id_ranges, is_reindexing_amo, unflag_reindexing_amo,
+    flag_reindexing_amo, timestamp_index)
+from olympia.zadmin.models import get_config, set_config
 
 logger = logging.getLogger('z.elasticsearch')
 time_limits = settings.CELERY_TIME_LIMITS[
@@ -27,6 +32,10 @@ time_limits = settings.CELERY_TIME_LIMITS[
 
 ES = get_es()
 
+# Config key of the time up to which the add-ons changes have been indexed.
+WATERMARK_KEY = 'es_addons_index_watermark'
+WATERMARK_FORMAT = '%Y-%m-%d %H:%M:%S'
+
 
 def get_modules(with_stats=True):
     """Return python modules containing functions reindex needs.
@@ -73,16 +82,43 @@ def create_new_index(alias, new_index, stdout=sys.stdout):
 
 
 @task(timeout=time_limits['hard'], soft_timeout=time_limits['soft'])
-def index_data(alias, index, stdout=sys.stdout):
+def index_data(alias, index, skip=(), stdout=sys.stdout):
     log('Reindexing {0}'.format(index), stdout=stdout)
-    get_modules()[alias].reindex(index)
+    if skip:
+        get_modules()[alias].reindex(index, skip=skip)
+    else:
+        get_modules()[alias].reindex(index)
+
+
+@task(acks_late=True, default_retry_delay=60,
+      timeout=time_limits['hard'], soft_timeout=time_limits['soft'])
+def index_range(alias, index, name, start, end, stdout=sys.stdout):
+    """Index the `name` objects with an id in [start, end) in `index`."""
+    log('Reindexing {0} {1}-{2} in {3}'.format(name, start, end or '', index),
+        stdout=stdout)
+    qs, index_task = get_modules()[alias].get_range_indexers()[name]
+    qs = qs.filter(pk__gte=start)
+    if end is not None:
+        qs = qs.filter(pk__lt=end)
+    ids = list(qs.order_by('pk').values_list('pk', flat=True))
+    try:
+        if ids:
+            index_task(ids, index=index)
+    except Exception, exc:
+        index_range.retry(args=[alias, index, name, start, end], exc=exc)
+    # Remember this range is done, in case the reindexation gets resumed.
+    Reindexing.objects.mark_range_done(alias, name, start)
 
 
 @task
-def flag_database(new_index, old_index, alias, stdout=sys.stdout):
+def flag_database(new_index, old_index, alias, ranges=None,
+                  stdout=sys.stdout):
     """Flags the database to indicate that the reindexing has started."""
     log('Flagging the database to start the reindexation', stdout=stdout)
     flag_reindexing_amo(new_index=new_index, old_index=old_index, alias=alias)
+    if ranges:
+        Reindexing.objects.filter(alias=alias).update(
+            checkpoint=json.dumps({'ranges': ranges, 'done': {}}))
 
 
 @task
@@ -121,6 +157,29 @@ class Command(BaseCommand):
                     help=('Do not ask for confirmation before wiping. '
                           'Default: False'),
                     default=False),
+        make_option('--resume', action='store_true',
+                    help=('Resume the ongoing (interrupted) reindexation, '
+                          'skipping the id ranges already indexed. '
+                          'Default: False'),
+                    default=False),
+        make_option('--since',
+                    help=('Only reindex the add-ons changed since this '
+                          'date and time, in the current index.')),
+        make_option('--incremental', action='store_true',
+                    help=('Only reindex the add-ons changed since the last '
+                          'run, in the current index. Default: False'),
+                    default=False),
+        make_option('--continuous', action='store_true',
+                    help=('With --incremental, keep reindexing the changed '
+                          'add-ons every --interval seconds. Default: False'),
+                    default=False),
+        make_option('--interval', type='int', default=60,
+                    help=('Seconds between incremental runs with '
+                          '--continuous. Default: %default')),
+        make_option('--range-size', type='int',
+                    default=settings.ES_REINDEX_RANGE_SIZE,
+                    help=('Number of objects indexed by each task. '
+                          'Default: %default')),
     )
 
     def handle(self, *args, **kwargs):
@@ -131,11 +190,24 @@ class Command(BaseCommand):
         works while the indexation occurs.
 
         """
+        if (kwargs.get('since') or kwargs.get('incremental') or
+                kwargs.get('continuous')):
+            return self.reindex_changes(
+                kwargs.get('since'), kwargs.get('continuous', False),
+                kwargs.get('interval') or 60)
+
+        # Changes made from now on are not guaranteed to be in the new index.
+        started = datetime.datetime.now()
         force = kwargs.get('force', False)
+        resume = kwargs.get('resume', False)
+        range_size = kwargs.get('range_size') or settings.ES_REINDEX_RANGE_SIZE
 
-        if is_reindexing_amo() and not force:
+        if is_reindexing_amo() and not (force or resume):
             raise CommandError('Indexation already occurring - use --force to '
-                               'bypass')
+                               'bypass or --resume to resume it')
+        if resume and (force or kwargs.get('wipe', False)):
+            raise CommandError('--resume can not be used with --force or '
+                               '--wipe')
 
         log('Starting the reindexation', stdout=self.stdout)
 
@@ -190,20 +262,42 @@ class Command(BaseCommand):
                 # it.
                 pass
 
-            # Create a new index, using the alias name with a timestamp.
-            new_index = timestamp_index(alias)
-
             # If old_index is None that could mean it's a full index.
             # In that case we want to continue index in it.
             if ES.indices.exists(alias):
                 old_index = alias
 
-            # Flag the database.
-            workflow.append(
-                flag_database.si(new_index, old_index, alias) |
-                create_new_index.si(alias, new_index) |
-                index_data.si(alias, new_index)
-            )
+            reindexing = (Reindexing.objects.filter(alias=alias).first()
+                          if resume else None)
+            if reindexing:
+                # The new index already exists, keep filling it.
+                new_index = reindexing.new_index
+                checkpoint = Reindexing.objects.get_checkpoint(alias)
+                ranges = checkpoint['ranges']
+                steps = []
+            else:
+                # Create a new index, using the alias name with a timestamp.
+                new_index = timestamp_index(alias)
+                checkpoint = None
+                ranges = self.get_ranges(module, range_size)
+                # Flag the database.
+                steps = [
+                    flag_database.si(new_index, old_index, alias, ranges),
+                    create_new_index.si(alias, new_index),
+                ]
+
+            if ranges:
+                # Fan out the indexation of the documents that can be
+                # indexed by id range, and index the others as usual.
+                range_tasks = [
+                    index_range.si(alias, new_index, name, start, end)
+                    for name, start, end in self.iter_ranges(ranges,
+                                                             checkpoint)]
+                steps.append(group(range_tasks + [
+                    index_data.si(alias, new_index, skip=sorted(ranges))]))
+            else:
+                steps.append(index_data.si(alias, new_index))
+            workflow.append(chain(*steps))
 
             # Adding new index to the alias.
             add_alias_action('add', new_index, alias)
@@ -239,8 +333,56 @@ class Command(BaseCommand):
 
         sys.stdout.write('\n')
 
+        # Incremental reindexations can pick up from here.
+        set_config(WATERMARK_KEY, started.strftime(WATERMARK_FORMAT))
+
         # Let's return the /_aliases values.
         aliases = ES.indices.get_aliases()
         aliases = json.dumps(aliases, sort_keys=True, indent=4)
         summary = _SUMMARY % (len(modules), aliases)
         log(summary, stdout=self.stdout)
+
+    def reindex_changes(self, since, continuous, interval):
+        """Reindex the add-ons changed since `since`, or since the last run,
+        in the current index(es), and keep doing it with `continuous`."""
+        if since:
+            try:
+                since = parse(since)
+            except (ValueError, OverflowError):
+                raise CommandError('Invalid date: %s' % since)
+        while True:
+            if since is None:
+                watermark = get_config(WATERMARK_KEY)
+                if not watermark:
+                    raise CommandError('No previous reindexation: run a full '
+                                       'reindex or use --since')
+                since = datetime.datetime.strptime(watermark,
+                                                   WATERMARK_FORMAT)
+            # Changes made while indexing will be picked up by the next run.
+            now = datetime.datetime.now()
+            count = reindex_addons_since(since)
+            # Only move the watermark once the changes are indexed, so that
+            # an interrupted run is done again.
+            set_config(WATERMARK_KEY, now.strftime(WATERMARK_FORMAT))
+            log('Reindexed {0} add-ons changed since {1}'.format(count, since),
+                stdout=self.stdout)
+            if not continuous:
+                return
+            since = None
+            time.sleep(interval)
+
+    def get_ranges(self, module, range_size):
+        """Return the id ranges of the documents of `module` that can be
+        indexed by id range, by name."""
+        if not hasattr(module, 'get_range_indexers'):
+            return {}
+        return dict((name, get_id_ranges(qs, range_size))
+                    for name, (qs, _) in module.get_range_indexers().items())
+
+    def iter_ranges(self, ranges, checkpoint=None):
+        """Yield the (name, start, end) ranges not done yet."""
+        done = checkpoint['done'] if checkpoint else {}
+        for name, name_ranges in sorted(ranges.items()):
+            for start, end in name_ranges:
+                if start not in done.get(name, []):
+                    yield name, start, end
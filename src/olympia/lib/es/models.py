@@ -1,4 +1,6 @@
-from django.db import models
+import json
+
+from django.db import models, transaction
 from django.utils import timezone
 
 
@@ -49,6 +51,30 @@ class ReindexingManager(models.Manager):
         except Reindexing.DoesNotExist:
             return [index]
 
+    def get_checkpoint(self, alias):
+        """Return the checkpoint of the reindexing of `alias`: a dict with
+        the id ranges to index by name in 'ranges', and the starts of the
+        ranges already indexed by name in 'done'."""
+        reindex = self.filter(alias=alias).first()
+        checkpoint = reindex.get_checkpoint() if reindex else {}
+        checkpoint.setdefault('ranges', {})
+        checkpoint.setdefault('done', {})
+        return checkpoint
+
+    def mark_range_done(self, alias, name, start):
+        """Record in the checkpoint of the reindexing of `alias` that the
+        `name` id range starting at `start` has been indexed."""
+        with transaction.atomic():
+            reindex = self.select_for_update().filter(alias=alias).first()
+            if reindex is None:
+                return  # Not reindexing (anymore).
+            checkpoint = reindex.get_checkpoint()
+            done = checkpoint.setdefault('done', {}).setdefault(name, [])
+            if start not in done:
+                done.append(start)
+                reindex.checkpoint = json.dumps(checkpoint)
+                reindex.save()
+
 
 class Reindexing(models.Model):
     SITE_CHOICES = (
@@ -59,8 +85,14 @@ class Reindexing(models.Model):
     new_index = models.CharField(max_length=255)
     alias = models.CharField(max_length=255)
     site = models.CharField(max_length=3, choices=SITE_CHOICES)
+    # JSON dict of the id ranges to index and of those already indexed, so
+    # that an interrupted reindexing can be resumed.
+    checkpoint = models.TextField(null=True)
 
     objects = ReindexingManager()
 
     class Meta:
         db_table = 'zadmin_reindexing'
+
+    def get_checkpoint(self):
+        return json.loads(self.checkpoint) if self.checkpoint else {}
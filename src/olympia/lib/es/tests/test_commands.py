@@ -1,15 +1,21 @@
+import datetime
 import StringIO
 import threading
 import time
 
 from django.core import management
+from django.core.management.base import CommandError
 from django.db import connection
 from django.test.testcases import TransactionTestCase
 
-from olympia.amo.tests import addon_factory, ESTestCase
+import mock
+
+from olympia.amo.tests import addon_factory, ESTestCase, TestCase
 from olympia.amo.urlresolvers import reverse
 from olympia.amo.utils import urlparams
+from olympia.lib.es.management.commands import reindex
 from olympia.lib.es.utils import is_reindexing_amo, unflag_reindexing_amo
+from olympia.zadmin.models import get_config, set_config
 
 
 class TestIndexCommand(ESTestCase):
@@ -145,3 +151,37 @@ class TestIndexCommand(ESTestCase):
         assert old_indices != new_indices, (stdout, old_indices, new_indices)
 
         self.check_settings(new_indices)
+
+
+class TestIncrementalReindex(TestCase):
+
+    @mock.patch('olympia.lib.es.management.commands.reindex.'
+                'reindex_addons_since')
+    def test_since(self, reindex_addons_since_mock):
+        reindex_addons_since_mock.return_value = 3
+        stdout = StringIO.StringIO()
+        management.call_command('reindex', since='2016-01-02 03:04:05',
+                                stdout=stdout)
+        reindex_addons_since_mock.assert_called_with(
+            datetime.datetime(2016, 1, 2, 3, 4, 5))
+        assert 'Reindexed 3 add-ons' in stdout.getvalue()
+        watermark = get_config(reindex.WATERMARK_KEY)
+        assert watermark > '2016-01-02 03:04:05'
+
+        # The next incremental run starts from the watermark.
+        management.call_command('reindex', incremental=True, stdout=stdout)
+        reindex_addons_since_mock.assert_called_with(
+            datetime.datetime.strptime(watermark, reindex.WATERMARK_FORMAT))
+
+    def test_incremental_without_watermark(self):
+        with self.assertRaises(CommandError):
+            management.call_command('reindex', incremental=True)
+
+    @mock.patch('olympia.lib.es.management.commands.reindex.'
+                'reindex_addons_since')
+    def test_failure_keeps_watermark(self, reindex_addons_since_mock):
+        set_config(reindex.WATERMARK_KEY, '2016-01-02 03:04:05')
+        reindex_addons_since_mock.side_effect = Exception
+        with self.assertRaises(Exception):
+            management.call_command('reindex', incremental=True)
+        assert get_config(reindex.WATERMARK_KEY) == '2016-01-02 03:04:05'
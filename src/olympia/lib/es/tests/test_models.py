@@ -82,3 +82,18 @@ class TestReindexManager(TestCase):
 
         # Doesn't clash on other sites.
         assert Reindexing.objects.get_indices('other') == ['other']
+
+    def test_checkpoint(self):
+        assert Reindexing.objects.get_checkpoint('quux') == {
+            'ranges': {}, 'done': {}}
+        # Not reindexing: nothing to record.
+        Reindexing.objects.mark_range_done('quux', 'addons', 1)
+
+        Reindexing.objects._flag_reindexing('foo', 'bar', 'baz', 'quux')
+        Reindexing.objects.filter(alias='quux').update(
+            checkpoint='{"ranges": {"addons": [[1, 10], [10, null]]}}')
+        Reindexing.objects.mark_range_done('quux', 'addons', 10)
+        Reindexing.objects.mark_range_done('quux', 'addons', 10)
+        assert Reindexing.objects.get_checkpoint('quux') == {
+            'ranges': {'addons': [[1, 10], [10, None]]},
+            'done': {'addons': [10]}}
@@ -0,0 +1,49 @@
+import json
+
+import mock
+
+from olympia.amo.tests import addon_factory, TestCase
+from olympia.addons.models import Addon
+from olympia.lib.es.utils import (
+    chunk_actions, get_id_ranges, index_queryset, iter_queryset)
+
+
+class TestIndexQueryset(TestCase):
+
+    def setUp(self):
+        super(TestIndexQueryset, self).setUp()
+        self.addons = sorted(addon_factory().pk for i in range(5))
+
+    def test_iter_queryset(self):
+        qs = Addon.unfiltered.no_transforms()
+        assert [a.pk for a in iter_queryset(qs, 2)] == self.addons
+        assert [a.pk for a in iter_queryset(qs, 5)] == self.addons
+
+    def test_get_id_ranges(self):
+        a = self.addons
+        assert get_id_ranges(Addon.unfiltered.all(), 2) == [
+            (a[0], a[2]), (a[2], a[4]), (a[4], None)]
+        assert get_id_ranges(Addon.unfiltered.all(), 5) == [(a[0], None)]
+        assert get_id_ranges(Addon.unfiltered.none(), 5) == []
+
+    def test_chunk_actions(self):
+        actions = [{'_source': 'x' * 100} for i in range(5)]
+        assert [len(c) for c in chunk_actions(actions, 2, 10000)] == [2, 2, 1]
+        # Each action is counted as its source plus 200 bytes.
+        assert [len(c) for c in chunk_actions(actions, 10, 700)] == [2, 2, 1]
+
+    @mock.patch('olympia.lib.es.utils.helpers.bulk')
+    def test_index_queryset(self, bulk_mock):
+        bulk_mock.side_effect = lambda es, chunk, **kw: (len(chunk), [])
+        success, errors = index_queryset(
+            Addon.unfiltered.all(), lambda obj: {'id': obj.pk},
+            ['index1', 'index2'], chunk_size=4)
+        assert (success, errors) == (10, [])
+        assert bulk_mock.call_count == 3
+        first_chunk = bulk_mock.call_args_list[0][0][1]
+        ids = [(action['_id'], action['_index']) for action in first_chunk]
+        assert ids == [
+            (self.addons[0], 'index1'), (self.addons[0], 'index2'),
+            (self.addons[1], 'index1'), (self.addons[1], 'index2')]
+        assert json.loads(first_chunk[0]['_source']) == {
+            'id': self.addons[0]}
@@ -1,12 +1,14 @@
 import os
 import datetime
 import logging
+import time
 from copy import deepcopy
 
 from django.core.management.base import CommandError
 from django.conf import settings
 
 from elasticsearch import helpers
+from elasticsearch.serializer import JSONSerializer
 
 from olympia.amo import search as amo_search
 
@@ -22,6 +24,9 @@ unflag_reindexing_amo = Reindexing.objects.unflag_reindexing_amo
 get_indices = Reindexing.objects.get_indices
 
 
+serializer = JSONSerializer()
+
+
 def index_objects(ids, model, extract_func, index=None, transforms=None,
                   objects=None):
     if index is None:
@@ -31,26 +36,103 @@ def index_objects(ids, model, extract_func, index=None, transforms=None,
 
     indices = Reindexing.objects.get_indices(index)
 
-    if transforms is None:
-        transforms = []
-
     qs = objects.no_cache().filter(id__in=ids)
-    for t in transforms:
-        qs = qs.transform(t)
-
-    bulk = []
-    for ob in qs:
-        data = extract_func(ob)
-        for index in indices:
-            bulk.append({
-                "_source": data,
-                "_id": ob.id,
-                "_type": ob.get_mapping_type(),
-                "_index": index
-            })
+    return index_queryset(qs, extract_func, indices, transforms)
+
+
+def index_queryset(qs, extract_func, indices, transforms=None,
+                   chunk_size=None, max_chunk_bytes=None):
+    """Stream the documents extracted from the objects of `qs` to `indices`.
+
+    The queryset is walked in pk order `chunk_size` objects at a time, and
+    the documents are sent in bulk requests of at most `chunk_size` actions
+    and `max_chunk_bytes` bytes, so that neither the objects nor the bulk
+    requests are ever all in memory.
+
+    Return a (number of indexed documents, errors) tuple, like
+    `elasticsearch.helpers.bulk`.
+    """
+    chunk_size = chunk_size or settings.ES_BULK_CHUNK_SIZE
+    max_chunk_bytes = max_chunk_bytes or settings.ES_BULK_MAX_CHUNK_BYTES
+    for transform in transforms or []:
+        qs = qs.transform(transform)
+
+    def actions():
+        for ob in iter_queryset(qs, chunk_size):
+            # Serialize once for all the indices.
+            source = serializer.dumps(extract_func(ob))
+            for index in indices:
+                yield {
+                    "_source": source,
+                    "_id": ob.id,
+                    "_type": ob.get_mapping_type(),
+                    "_index": index
+                }
 
     es = amo_search.get_es()
-    return helpers.bulk(es, bulk)
+    start = time.time()
+    success, errors = 0, []
+    for chunk in chunk_actions(actions(), chunk_size, max_chunk_bytes):
+        chunk_success, chunk_errors = helpers.bulk(es, chunk,
+                                                   chunk_size=len(chunk))
+        success += chunk_success
+        errors.extend(chunk_errors)
+    elapsed = time.time() - start
+    log.info('Indexed %d documents in %.1fs (%d docs/s)' % (
+        success, elapsed, success / max(elapsed, 0.001)))
+    return success, errors
+
+
+def iter_queryset(qs, chunk_size):
+    """Iterate over the objects of `qs` by chunks of `chunk_size`, in pk order.
+
+    Every chunk is fetched with a `pk > last pk` query instead of an OFFSET,
+    so each query only reads the rows it returns.
+    """
+    qs = qs.order_by('pk')
+    last = None
+    while True:
+        page = qs if last is None else qs.filter(pk__gt=last)
+        page = list(page[:chunk_size])
+        for ob in page:
+            yield ob
+        if len(page) < chunk_size:
+            return
+        last = page[-1].pk
+
+
+def chunk_actions(actions, chunk_size, max_chunk_bytes):
+    """Group the bulk `actions`, whose `_source` is already serialized, in
+    lists of at most `chunk_size` actions and about `max_chunk_bytes`."""
+    chunk, size = [], 0
+    for action in actions:
+        # The source, plus about as much for the action line.
+        action_size = len(action['_source']) + 200
+        if chunk and (len(chunk) >= chunk_size or
+                      size + action_size > max_chunk_bytes):
+            yield chunk
+            chunk, size = [], 0
+        chunk.append(action)
+        size += action_size
+    if chunk:
+        yield chunk
+
+
+def get_id_ranges(qs, size):
+    """Split the objects of `qs` in ranges of `size` ids.
+
+    Return a list of (start, end) tuples, with `start` inclusive and `end`
+    exclusive, None for the last range.
+    """
+    qs = qs.order_by('pk').values_list('pk', flat=True)
+    ranges = []
+    start = qs.first()
+    while start is not None:
+        end = list(qs.filter(pk__gte=start)[size:size + 1])
+        end = end[0] if end else None
+        ranges.append((start, end))
+        start = end
+    return ranges
 
 
 def raise_if_reindex_in_progress(site):
@@ -136,6 +136,36 @@ SERVICES_DATABASE = {
     'PORT': DATABASES['default']['PORT'],
 }
 
+# When enabled, each services/update.py worker answers update checks from an
+# in-memory index of listed versions instead of querying MySQL per request.
+SERVICES_UPDATE_INDEX = False
+# How often (in seconds) a worker checks whether the index is stale.
+SERVICES_UPDATE_INDEX_POLL = 60
+# Rebuild the index at least this often (in seconds) even if the watermark
+# did not move, to pick up in-place edits that don't touch `modified`.
+SERVICES_UPDATE_INDEX_MAX_AGE = 60 * 60
+
+# Cache the responses of services/update.py and of services/theme_update.py.
+# Each worker keeps the last *_CACHE_SIZE responses in memory, and they are
+# shared through memcached for *_CACHE_TIMEOUT seconds. Changes to what they
+# serve bump a generation counter in memcached (`update:generation` or
+# `theme_update:generation`) to drop them all, and workers read it again every
+# *_CACHE_GENERATION_TTL seconds. theme_update.py also keeps the last
+# SERVICES_THEME_ICON_STORE_SIZE base64 encoded theme icons in memory.
+SERVICES_UPDATE_CACHE = False
+SERVICES_UPDATE_CACHE_SIZE = 10000
+SERVICES_UPDATE_CACHE_TIMEOUT = 60 * 60
+SERVICES_UPDATE_CACHE_GENERATION_TTL = 10
+SERVICES_THEME_UPDATE_CACHE = False
+SERVICES_THEME_UPDATE_CACHE_SIZE = 10000
+SERVICES_THEME_UPDATE_CACHE_TIMEOUT = 60 * 60
+SERVICES_THEME_UPDATE_CACHE_GENERATION_TTL = 10
+SERVICES_THEME_ICON_STORE_SIZE = 5000
+
+# When enabled, the add-on download and update series are read from the day
+# rollups (see `stats.rollups`) instead of the daily ES documents.
+STATS_ROLLUPS = False
+
 DATABASE_ROUTERS = ('multidb.PinningMasterSlaveRouter',)
 
 # Put the aliases for your slave databases in this list.
@@ -1157,6 +1187,8 @@ CELERY_ROUTES = {
         'queue': 'search'},
     'olympia.lib.es.management.commands.reindex.index_data': {
         'queue': 'search'},
+    'olympia.lib.es.management.commands.reindex.index_range': {
+        'queue': 'search'},
     'olympia.lib.es.management.commands.reindex.unflag_database': {
         'queue': 'search'},
     'olympia.lib.es.management.commands.reindex.update_aliases': {
@@ -1404,6 +1436,21 @@ REDIS_BACKENDS = {
 # Number of seconds before celery tasks will abort addon validation:
 VALIDATOR_TIMEOUT = 110
 
+# Keep this many addons-linter processes running in each celery worker process
+# instead of starting one for each validation (see devhub.linter). 0 disables
+# the pool.
+ADDONS_LINTER_POOL_SIZE = 0
+# Restart a linter process once it has validated this many files.
+ADDONS_LINTER_POOL_MAX_JOBS = 200
+# Kill a linter process that takes longer than this many seconds to validate a
+# file. Keep it below VALIDATOR_TIMEOUT.
+ADDONS_LINTER_POOL_TIMEOUT = 90
+NODE_BIN = 'node'
+
+# Total size in bytes of the validation results kept for reuse by files with
+# the same content. The cleanup cron drops the least recently used beyond it.
+VALIDATION_CACHE_SIZE = 1024 * 1024 * 1024
+
 # Max number of warnings/errors to show from validator. Set to None for no
 # limit.
 VALIDATOR_MESSAGE_LIMIT = 500
@@ -1428,6 +1475,13 @@ BLOCKLIST_COOKIE = 'BLOCKLIST_v1'
 FILE_VIEWER_SIZE_LIMIT = 1048576
 # The maximum file size that you can have inside a zip file.
 FILE_UNZIP_SIZE_LIMIT = 104857600
+# Disk space in bytes for the file viewer extractions, which are shared by
+# files with the same hash and kept across days. The cleanup cron deletes the
+# extractions that were opened longest ago until they fit.
+FILE_VIEWER_CACHE_SIZE = 10 * 1024 * 1024 * 1024
+# List and read add-ons without nested archives straight from the zip file
+# instead of extracting them for the file viewer.
+FILE_VIEWER_LAZY_LISTING = True
 
 # How long to delay tasks relying on file system to cope with NFS lag.
 NFS_LAG_DELAY = 3
@@ -1449,6 +1503,11 @@ ES_INDEXES = {
 }
 
 ES_TIMEOUT = 30
+# Maximum number of actions and size (in bytes) of each bulk indexing request.
+ES_BULK_CHUNK_SIZE = 500
+ES_BULK_MAX_CHUNK_BYTES = 10 * 1024 * 1024
+# Number of objects indexed by each task of the reindex command.
+ES_REINDEX_RANGE_SIZE = 5000
 ES_DEFAULT_NUM_REPLICAS = 2
 ES_DEFAULT_NUM_SHARDS = 5
 
@@ -0,0 +1,9 @@
+CREATE TABLE `blremovals` (
+    `id` int(11) AUTO_INCREMENT NOT NULL PRIMARY KEY,
+    `created` datetime NOT NULL,
+    `modified` datetime NOT NULL,
+    `block_id` varchar(255) NOT NULL,
+    `guid` varchar(255)
+) DEFAULT CHARSET=utf8;
+
+CREATE INDEX `blremovals_block_id` ON `blremovals` (`block_id`);
@@ -0,0 +1,17 @@
+CREATE TABLE `stats_rollups` (
+    `id` int(11) AUTO_INCREMENT NOT NULL PRIMARY KEY,
+    `addon_id` integer UNSIGNED NOT NULL,
+    `kind` varchar(16) NOT NULL,
+    `period` varchar(5) NOT NULL,
+    `start` date NOT NULL,
+    `days` integer UNSIGNED NOT NULL,
+    `count` integer UNSIGNED NOT NULL,
+    `sources` mediumtext,
+    `versions` mediumtext,
+    `status` mediumtext,
+    `apps` mediumtext,
+    `os` mediumtext,
+    `locales` mediumtext
+) DEFAULT CHARSET=utf8;
+ALTER TABLE `stats_rollups` ADD CONSTRAINT `addon_id_refs_id_stats_rollups` FOREIGN KEY (`addon_id`) REFERENCES `addons` (`id`);
+CREATE UNIQUE INDEX `stats_rollups_addon_kind_period_start` ON `stats_rollups` (`addon_id`, `kind`, `period`, `start`);
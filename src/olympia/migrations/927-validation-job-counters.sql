@@ -0,0 +1,25 @@
+ALTER TABLE `validation_job`
+    ADD COLUMN `total_count` integer UNSIGNED NOT NULL DEFAULT 0,
+    ADD COLUMN `completed_count` integer UNSIGNED NOT NULL DEFAULT 0,
+    ADD COLUMN `passing_count` integer UNSIGNED NOT NULL DEFAULT 0,
+    ADD COLUMN `failing_count` integer UNSIGNED NOT NULL DEFAULT 0,
+    ADD COLUMN `errors_count` integer UNSIGNED NOT NULL DEFAULT 0;
+
+-- Count the results of the existing jobs.
+UPDATE `validation_job` job
+    INNER JOIN (
+        SELECT validation_job_id,
+               COUNT(*) AS total,
+               SUM(completed IS NOT NULL) AS completed,
+               SUM(completed IS NOT NULL AND errors = 0
+                   AND task_error IS NULL) AS passing,
+               SUM(completed IS NOT NULL AND errors > 0) AS failing,
+               SUM(task_error IS NOT NULL) AS errors
+        FROM `validation_result`
+        GROUP BY validation_job_id
+    ) results ON results.validation_job_id = job.id
+    SET job.total_count = results.total,
+        job.completed_count = COALESCE(results.completed, 0),
+        job.passing_count = COALESCE(results.passing, 0),
+        job.failing_count = COALESCE(results.failing, 0),
+        job.errors_count = COALESCE(results.errors, 0);
@@ -0,0 +1,10 @@
+CREATE TABLE `cached_validations` (
+    `id` integer AUTO_INCREMENT NOT NULL PRIMARY KEY,
+    `created` datetime(6) NOT NULL,
+    `modified` datetime(6) NOT NULL,
+    `key` varchar(64) NOT NULL UNIQUE,
+    `validation` longtext NOT NULL,
+    `size` integer UNSIGNED NOT NULL,
+    `hits` integer UNSIGNED NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8;
+CREATE INDEX `cached_validations_modified_idx` ON `cached_validations` (`modified`);
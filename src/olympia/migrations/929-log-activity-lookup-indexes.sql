@@ -0,0 +1,21 @@
+-- The lookup tables keep a copy of the date of their log, to page through
+-- the logs of an add-on, a version or a user with their index only.
+UPDATE `log_activity_addon` la
+    INNER JOIN `log_activity` l ON l.id = la.activity_log_id
+    SET la.created = l.created
+    WHERE la.created != l.created;
+UPDATE `log_activity_version` lv
+    INNER JOIN `log_activity` l ON l.id = lv.activity_log_id
+    SET lv.created = l.created
+    WHERE lv.created != l.created;
+UPDATE `log_activity_user` lu
+    INNER JOIN `log_activity` l ON l.id = lu.activity_log_id
+    SET lu.created = l.created
+    WHERE lu.created != l.created;
+
+CREATE INDEX `log_activity_addon_created_idx`
+    ON `log_activity_addon` (`addon_id`, `created`, `activity_log_id`);
+CREATE INDEX `log_activity_version_created_idx`
+    ON `log_activity_version` (`version_id`, `created`, `activity_log_id`);
+CREATE INDEX `log_activity_user_created_idx`
+    ON `log_activity_user` (`user_id`, `created`, `activity_log_id`);
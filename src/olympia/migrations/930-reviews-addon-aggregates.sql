@@ -0,0 +1,30 @@
+-- Note: if the migration fails for you locally, remove the 'unsigned' next to addon_id below.
+CREATE TABLE `reviews_addon_aggregates` (
+    `created` datetime(6) NOT NULL,
+    `modified` datetime(6) NOT NULL,
+    `addon_id` integer UNSIGNED NOT NULL PRIMARY KEY,
+    `count` integer UNSIGNED NOT NULL,
+    `rated_count` integer UNSIGNED NOT NULL,
+    `rating_sum` integer UNSIGNED NOT NULL,
+    `ratings_1` integer UNSIGNED NOT NULL,
+    `ratings_2` integer UNSIGNED NOT NULL,
+    `ratings_3` integer UNSIGNED NOT NULL,
+    `ratings_4` integer UNSIGNED NOT NULL,
+    `ratings_5` integer UNSIGNED NOT NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8;
+ALTER TABLE `reviews_addon_aggregates` ADD CONSTRAINT `reviews_addon_aggregates_addon_id_fk` FOREIGN KEY (`addon_id`) REFERENCES `addons` (`id`) ON DELETE CASCADE;
+
+-- Aggregate the existing reviews, like ReviewAggregates.refresh() does.
+INSERT INTO `reviews_addon_aggregates`
+    (addon_id, created, modified, count, rated_count, rating_sum,
+     ratings_1, ratings_2, ratings_3, ratings_4, ratings_5)
+SELECT addon_id, NOW(), NOW(), COUNT(*), COUNT(rating),
+    COALESCE(SUM(rating), 0),
+    SUM(IF(is_latest AND rating = 1, 1, 0)),
+    SUM(IF(is_latest AND rating = 2, 1, 0)),
+    SUM(IF(is_latest AND rating = 3, 1, 0)),
+    SUM(IF(is_latest AND rating = 4, 1, 0)),
+    SUM(IF(is_latest AND rating = 5, 1, 0))
+FROM `reviews`
+WHERE reply_to IS NULL AND NOT deleted
+GROUP BY addon_id;
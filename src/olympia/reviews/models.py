@@ -2,7 +2,7 @@ from datetime import datetime, timedelta
 import logging
 
 from django.core.cache import cache
-from django.db import models
+from django.db import connection, models
 from django.db.models import Q
 from django.template import Context
 from django.utils.translation import ugettext_lazy as _
@@ -300,6 +300,89 @@ class ReviewFlag(ModelBase):
         unique_together = (('review', 'user'),)
 
 
+class ReviewAggregates(ModelBase):
+    """
+    The totals of the reviews of an add-on (not counting replies and deleted
+    reviews), to compute its ratings from. See refresh().
+    """
+    addon = models.OneToOneField(
+        'addons.Addon', primary_key=True, on_delete=models.CASCADE)
+    count = models.PositiveIntegerField(default=0)
+    # Reviews can be posted without a rating.
+    rated_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    # Only the latest review of each user counts in the bar chart, see
+    # GroupedRating.
+    ratings_1 = models.PositiveIntegerField(default=0)
+    ratings_2 = models.PositiveIntegerField(default=0)
+    ratings_3 = models.PositiveIntegerField(default=0)
+    ratings_4 = models.PositiveIntegerField(default=0)
+    ratings_5 = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'reviews_addon_aggregates'
+
+    def __unicode__(self):
+        return u'%s: %d' % (unicode(self.pk), self.count) if self.pk else u''
+
+    @property
+    def average_rating(self):
+        if self.rated_count:
+            return float(self.rating_sum) / self.rated_count
+
+    @property
+    def grouped_ratings(self):
+        return [(rating, getattr(self, 'ratings_%s' % rating))
+                for rating in range(1, 6)]
+
+    @classmethod
+    def refresh(cls, addons):
+        """
+        Compute the totals of the add-ons with the given ids again from
+        their reviews, with a query using the reviews index on the add-on.
+        Add-ons without reviews are left without totals.
+
+        The rows are written with INSERT ... ON DUPLICATE KEY UPDATE rather
+        than deleted and inserted again: two refreshes of an add-on without
+        a row yet would both lock the gap of its missing row, then deadlock
+        when inserting it.
+        """
+        addons = list(addons)
+        if not addons:
+            return
+        placeholders = ', '.join(['%s'] * len(addons))
+        cursor = connection.cursor()
+        cursor.execute("""
+            INSERT INTO reviews_addon_aggregates
+                (addon_id, created, modified, count, rated_count, rating_sum,
+                 ratings_1, ratings_2, ratings_3, ratings_4, ratings_5)
+            SELECT addon_id, NOW(), NOW(), COUNT(*), COUNT(rating),
+                COALESCE(SUM(rating), 0),
+                SUM(IF(is_latest AND rating = 1, 1, 0)),
+                SUM(IF(is_latest AND rating = 2, 1, 0)),
+                SUM(IF(is_latest AND rating = 3, 1, 0)),
+                SUM(IF(is_latest AND rating = 4, 1, 0)),
+                SUM(IF(is_latest AND rating = 5, 1, 0))
+            FROM reviews
+            WHERE addon_id IN (%s) AND reply_to IS NULL AND NOT deleted
+            GROUP BY addon_id
+            ON DUPLICATE KEY UPDATE
+                modified = VALUES(modified), count = VALUES(count),
+                rated_count = VALUES(rated_count),
+                rating_sum = VALUES(rating_sum),
+                ratings_1 = VALUES(ratings_1), ratings_2 = VALUES(ratings_2),
+                ratings_3 = VALUES(ratings_3), ratings_4 = VALUES(ratings_4),
+                ratings_5 = VALUES(ratings_5)""" % placeholders, addons)
+        # Then remove the totals of the add-ons left without reviews.
+        cursor.execute("""
+            DELETE FROM reviews_addon_aggregates
+            WHERE addon_id IN (%s) AND NOT EXISTS (
+                SELECT 1 FROM reviews
+                WHERE reviews.addon_id = reviews_addon_aggregates.addon_id
+                    AND reply_to IS NULL AND NOT deleted)
+            """ % placeholders, addons)
+
+
 class GroupedRating(object):
     """
     Group an add-on's ratings so we can have a graph of rating counts.
@@ -336,6 +419,13 @@ class GroupedRating(object):
         cache.set(cls.key(addon), ratings)
         return ratings
 
+    @classmethod
+    def set_many(cls, grouped_ratings):
+        """Cache the grouped ratings of several add-ons at once, given as
+        {addon id: grouped ratings}."""
+        cache.set_many(dict((cls.key(addon), ratings)
+                            for addon, ratings in grouped_ratings.items()))
+
 
 class Spam(object):
 
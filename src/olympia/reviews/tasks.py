@@ -1,6 +1,6 @@
 import logging
 
-from django.db.models import Count, Avg, F
+from django.db.models import Avg, F
 
 import caching.base as caching
 
@@ -8,7 +8,7 @@ from olympia.addons.models import Addon
 from olympia.amo.celery import task
 from olympia.amo.decorators import write
 
-from .models import Review, GroupedRating
+from .models import GroupedRating, Review, ReviewAggregates
 
 log = logging.getLogger('z.task')
 
@@ -44,22 +44,26 @@ def addon_review_aggregates(addons, **kw):
         addons = [addons]
     log.info('[%s@%s] Updating total reviews and average ratings.' %
              (len(addons), addon_review_aggregates.rate_limit))
-    addon_objs = list(Addon.objects.filter(pk__in=addons))
-    # The following returns something like
-    # [{'rating': 2.0, 'addon': 7L, 'count': 5},
-    #  {'rating': 3.75, 'addon': 6L, 'count': 8}, ...]
-    qs = (Review.without_replies.all().no_cache()
-          .values('addon')  # Group by addon id.
-          .annotate(rating=Avg('rating'), count=Count('addon'))  # Aggregates.
-          .order_by())  # Reset order by so that `created` is not included.
-    stats = dict((x['addon'], (x['rating'], x['count'])) for x in qs)
-    for addon in addon_objs:
-        rating, reviews = stats.get(addon.id, [0, 0])
-        addon.update(total_reviews=reviews, average_rating=rating)
-
-    # Delay bayesian calculations to avoid slave lag.
-    addon_bayesian_rating.apply_async(args=addons, countdown=5)
-    addon_grouped_rating.apply_async(args=addons)
+    # Only the reviews of these add-ons are aggregated again.
+    ReviewAggregates.refresh(addons)
+    stats = dict((x.addon_id, x) for x in
+                 ReviewAggregates.objects.no_cache().filter(addon__in=addons))
+    for addon in Addon.objects.no_cache().filter(pk__in=addons):
+        aggregates = stats.get(addon.id)
+        if aggregates is not None:
+            reviews, rating = aggregates.count, aggregates.average_rating
+        else:
+            reviews, rating = 0, 0
+        if (addon.total_reviews, addon.average_rating) != (reviews, rating):
+            addon.update(total_reviews=reviews, average_rating=rating)
+
+    # The bayesian ratings are computed by the database from the values we
+    # just wrote, so there's no slave lag to wait for.
+    addon_bayesian_rating(*addons)
+    empty = ReviewAggregates().grouped_ratings
+    GroupedRating.set_many(dict(
+        (addon, stats[addon].grouped_ratings if addon in stats else empty)
+        for addon in addons))
 
 
 @task
@@ -76,20 +80,15 @@ def addon_bayesian_rating(*addons, **kw):
     if avg['rating'] is None:
         return
     mc = avg['reviews'] * avg['rating']
-    for addon in Addon.objects.no_cache().filter(id__in=addons):
-        if addon.average_rating is None:
-            # Ignoring addons with no average rating.
-            continue
-
-        # Update the addon bayesian_rating atomically using F objects (unless
-        # it has no reviews, in which case directly set it to 0).
-        qs = Addon.objects.filter(id=addon.id)
-        if addon.total_reviews:
-            num = mc + F('total_reviews') * F('average_rating')
-            denom = avg['reviews'] + F('total_reviews')
-            qs.update(bayesian_rating=num / denom)
-        else:
-            qs.update(bayesian_rating=0)
+    # Ignoring addons with no average rating.
+    qs = Addon.objects.no_cache().filter(id__in=addons,
+                                         average_rating__isnull=False)
+    # Update the bayesian_rating of all the add-ons at once using F objects
+    # (unless they have no reviews, in which case directly set it to 0).
+    num = mc + F('total_reviews') * F('average_rating')
+    denom = avg['reviews'] + F('total_reviews')
+    qs.filter(total_reviews__gt=0).update(bayesian_rating=num / denom)
+    qs.filter(total_reviews=0).update(bayesian_rating=0)
 
 
 @task
@@ -1,7 +1,7 @@
 import mock
 
 from olympia.amo.tests import addon_factory, TestCase, user_factory
-from olympia.reviews.models import Review
+from olympia.reviews.models import GroupedRating, Review, ReviewAggregates
 from olympia.reviews.tasks import addon_review_aggregates
 
 
@@ -67,3 +67,48 @@ class TestAddonReviewAggregates(TestCase):
         assert addon.average_rating == 2.25
         assert addon2.bayesian_rating == 1.97915
         assert addon2.average_rating == 2.3333
+
+    @mock.patch.object(Review, 'refresh', lambda x, update_denorm=False: None)
+    def test_aggregates(self):
+        addon = addon_factory()
+        addon2 = addon_factory()
+        user = user_factory()
+        review = Review.objects.create(addon=addon, rating=3, user=user)
+        Review.objects.create(addon=addon, rating=4, user=user_factory())
+        Review.objects.create(addon=addon, rating=None, user=user_factory())
+        # Replies, deleted and older reviews.
+        Review.objects.create(
+            addon=addon, rating=5, user=user_factory(), reply_to=review)
+        Review.objects.create(
+            addon=addon, rating=1, user=user_factory(), deleted=True)
+        Review.objects.create(
+            addon=addon, rating=2, user=user, is_latest=False)
+
+        addon_review_aggregates([addon.pk, addon2.pk])
+        aggregates = ReviewAggregates.objects.no_cache().get(addon=addon)
+        assert aggregates.count == 4
+        assert aggregates.rated_count == 3
+        assert aggregates.average_rating == 3.0
+        assert aggregates.grouped_ratings == [
+            (1, 0), (2, 0), (3, 1), (4, 1), (5, 0)]
+        assert not ReviewAggregates.objects.filter(addon=addon2).exists()
+        assert GroupedRating.get(addon.pk, update_none=False) == (
+            aggregates.grouped_ratings)
+        assert GroupedRating.get(addon2.pk, update_none=False) == [
+            (1, 0), (2, 0), (3, 0), (4, 0), (5, 0)]
+        addon.reload()
+        assert addon.total_reviews == 4
+        assert addon.average_rating == 3.0
+
+        # Deleting a review is reflected the next time.
+        review.update(deleted=True)
+        addon_review_aggregates(addon.pk)
+        aggregates = ReviewAggregates.objects.no_cache().get(addon=addon)
+        assert aggregates.count == 3
+        assert aggregates.grouped_ratings == [
+            (1, 0), (2, 0), (3, 0), (4, 1), (5, 0)]
+
+        # The totals are removed with the last review.
+        Review.unfiltered.filter(addon=addon).update(deleted=True)
+        addon_review_aggregates(addon.pk)
+        assert not ReviewAggregates.objects.filter(addon=addon).exists()
@@ -1,5 +1,6 @@
 import logging
 
+from olympia import amo
 from olympia.amo.indexers import BaseSearchIndexer
 from olympia.addons.cron import reindex_addons
 from olympia.addons.indexers import AddonIndexer
@@ -86,17 +87,43 @@ def get_mappings():
     return {idxr.get_doctype_name(): idxr.get_mapping() for idxr in indexers}
 
 
-def reindex(index_name):
+def get_range_indexers():
+    """
+    Return the search-related documents that can be reindexed by id range,
+    by name: a (queryset of the objects to index, task indexing a list of
+    ids of those objects) tuple.
+    """
+    from olympia.addons.models import Addon
+    from olympia.addons.tasks import index_addons
+    from olympia.bandwagon.models import Collection
+    from olympia.bandwagon.tasks import index_collections
+    from olympia.users.models import UserProfile
+    from olympia.users.tasks import index_users
+
+    return {
+        'addons': (Addon.unfiltered.all(), index_addons),
+        'collections': (Collection.objects.exclude(
+            type=amo.COLLECTION_SYNCHRONIZED), index_collections),
+        'users': (UserProfile.objects.all(), index_users),
+    }
+
+
+def reindex(index_name, skip=()):
     """
     Reindex all search-related documents on `index_name` (which is not an
-    alias but the real index name).
+    alias but the real index name), except the ones named in `skip` (see
+    `get_range_indexers`), reindexed separately.
     """
     # FIXME: refactor these reindex functions, moving them to a reindex method
     # on the indexer class, and then simply go through indexers like
     # get_mapping() does.
-    reindexers = [reindex_addons, reindex_collections, reindex_users,
-                  compatibility_report]
-    for reindexer in reindexers:
+    reindexers = [('addons', reindex_addons),
+                  ('collections', reindex_collections),
+                  ('users', reindex_users),
+                  ('compat', compatibility_report)]
+    for name, reindexer in reindexers:
+        if name in skip:
+            continue
         log.info('Reindexing %r' % reindexer.__name__)
         try:
             reindexer(index_name)
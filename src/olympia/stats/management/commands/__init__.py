@@ -1,14 +1,27 @@
 import json
+import multiprocessing
 import os
+import time
 from datetime import datetime
 
 from django.core.files.base import ContentFile
 from django.core.files.storage import get_storage_class
 from django.forms.models import model_to_dict
 
+import commonware.log
+
+from olympia.stats.models import merge_counts
+
+
+log = commonware.log.getLogger('adi.pipeline')
 
 storage = get_storage_class()()
 
+# Rough upper bound of the size of a multi-row INSERT, well under the usual
+# MySQL max_allowed_packet.
+INSERT_MAX_BYTES = 8 * 1024 * 1024
+INSERT_MAX_ROWS = 1000
+
 
 IP_DENY_LIST = """
     -- Mozilla Network
@@ -75,3 +88,183 @@ def save_stats_to_file(model):
     name = name_tpl.format(date=date, model_name=model_name)
     filepath = os.path.join(path, name)
     storage.save(filepath, ContentFile(serialize_stats(model)))
+
+
+class ADIAggregate(object):
+    """
+    The counters of one add-on for one day, built from the hive files.
+
+    `fields` are the names of the dicts of counters (versions, statuses,
+    sources...) of the stats model this is going to be saved as: the
+    `update_*` methods of the commands work on an aggregate just like on the
+    stats model itself.
+    """
+
+    def __init__(self, addon_id, fields=()):
+        self.addon_id = addon_id
+        self.count = 0
+        self.fields = fields
+        for name in fields:
+            setattr(self, name, None)
+
+    def merge(self, other):
+        self.count += other.count
+        for name in self.fields:
+            counts = getattr(other, name)
+            if counts:
+                setattr(self, name, merge_counts(getattr(self, name), counts))
+
+    def to_model(self, model, day):
+        obj = model(addon_id=self.addon_id, date=day, count=self.count)
+        for name in self.fields:
+            setattr(obj, name, getattr(self, name))
+        return obj
+
+
+# What the pipeline workers need, inherited when the pool forks.
+_pipeline = None
+
+
+def split_files(filepaths, parts):
+    """
+    Split the `filepaths` (a list of (group, path)) into `parts` lists of
+    (group, path, start, end) byte ranges, one for each worker: each file is
+    cut in `parts` ranges of about the same size.
+    """
+    ranges = [[] for i in range(parts)]
+    for group, filepath in filepaths:
+        size = os.path.getsize(filepath)
+        for i in range(parts):
+            ranges[i].append((group, filepath, size * i // parts,
+                              size * (i + 1) // parts))
+    return ranges
+
+
+def read_lines(filepath, start, end):
+    """Yield the lines of `filepath` starting between `start` and `end`."""
+    with open(filepath, 'rb') as results_file:
+        if start:
+            # The line going over `start` belongs to the previous range.
+            results_file.seek(start - 1)
+            results_file.readline()
+        while results_file.tell() < end:
+            line = results_file.readline()
+            if not line:
+                break
+            yield line.decode('utf8')
+
+
+def _aggregate_ranges(ranges):
+    """Aggregate the lines of the (group, path, start, end) `ranges`."""
+    command, sep = _pipeline
+    results = {}
+    start = time.time()
+    total = 0
+    for group, filepath, range_start, range_end in ranges:
+        for line in read_lines(filepath, range_start, range_end):
+            total += 1
+            if (total % 1000000) == 0:
+                log.info('[%s] Processed %s lines (%d lines/s)' % (
+                    os.getpid(), total, total / (time.time() - start)))
+            command.process_line(group, line[:-1].split(sep), results)
+    return results, total
+
+
+def aggregate_files(command, filepaths, sep, jobs=1):
+    """
+    Feed every line of the `filepaths` (a list of (group, path)) to
+    `command.process_line(group, splitted_line, results)` and return the
+    resulting {addon_id: ADIAggregate} dict.
+
+    With more than one job, the files are split in byte ranges processed by
+    a pool of processes, and the partial results merged.
+    """
+    global _pipeline
+    start = time.time()
+    _pipeline = (command, sep)
+    ranges = split_files(filepaths, max(jobs, 1))
+    try:
+        if jobs > 1:
+            # The workers only parse the files, they don't use the database.
+            pool = multiprocessing.Pool(jobs)
+            try:
+                partials = pool.map(_aggregate_ranges, ranges)
+            finally:
+                pool.close()
+                pool.join()
+        else:
+            partials = [_aggregate_ranges(ranges[0])]
+    finally:
+        _pipeline = None
+
+    results, total = {}, 0
+    for partial, lines in partials:
+        total += lines
+        for addon_id, aggregate in partial.iteritems():
+            if addon_id in results:
+                results[addon_id].merge(aggregate)
+            else:
+                results[addon_id] = aggregate
+    elapsed = time.time() - start
+    log.info('Processed a total of %s lines for %s add-ons in %.1fs '
+             '(%d lines/s, %s jobs)' % (total, len(results), elapsed,
+                                        total / max(elapsed, 0.001), jobs))
+    return results
+
+
+def json_size(field):
+    """Length of `json.dumps(field)` for a flat dict of counters."""
+    if not field:
+        return 2
+    # Each entry is `"key": count, `: the trailing ", " of the last entry
+    # accounts for the two curly braces.
+    return sum(entry_size(key, count) for key, count in field.iteritems())
+
+
+def entry_size(key, count):
+    return len(json.dumps(key)) + len(json.dumps(count)) + 4
+
+
+def trim_field(field, max_size=2 ** 16):
+    """Trim (in-place) the dict provided, keeping the most used items.
+
+    The "locales" and "versions" fields are dicts which have the locale
+    or version as the key, and the count as the value. Their json version
+    must fit in the db TEXT field: the size is computed once and updated as
+    the least used items are removed, instead of serializing the whole dict
+    after each removal.
+
+    """
+    if not field:
+        return
+    size = json_size(field)
+    if size < max_size:
+        return
+    # Order by count (desc), for a dict like {'<locale>': <count>}.
+    values = list(reversed(sorted(field.items(), key=lambda v: v[1])))
+    while size >= max_size:
+        key, count = values.pop()  # Remove the least used (the last).
+        del field[key]  # Remove this entry from the dict.
+        size = size - entry_size(key, count) if field else 2
+
+
+def bulk_create_stats(model, objects):
+    """
+    Insert the `objects` with multi-row INSERTs as large as the database
+    allows, and return how many were inserted.
+    """
+    batch, batch_size, created = [], 0, 0
+    for obj in objects:
+        size = 256 + sum(json_size(value) for value in vars(obj).values()
+                         if isinstance(value, dict))
+        if batch and (batch_size + size > INSERT_MAX_BYTES or
+                      len(batch) >= INSERT_MAX_ROWS):
+            model.objects.bulk_create(batch)
+            created += len(batch)
+            batch, batch_size = [], 0
+        batch.append(obj)
+        batch_size += size
+    if batch:
+        model.objects.bulk_create(batch)
+        created += len(batch)
+    return created
@@ -0,0 +1,50 @@
+import logging
+from datetime import datetime, timedelta
+from optparse import make_option
+
+from django.core.management.base import BaseCommand, CommandError
+
+from olympia.stats.models import DownloadCount, UpdateCount
+from olympia.stats.rollups import update_rollups
+
+
+log = logging.getLogger('z.stats')
+
+HELP = """\
+(Re)build the stats rollups from the daily download and update counts, one
+day at a time. Rebuilding a day that was already rolled up is safe.
+
+    `--date=2011-08-15` or `--date=2011-08-15:2011-08-22`
+
+Without a date, the day before is processed.
+"""
+
+
+class Command(BaseCommand):
+    option_list = BaseCommand.option_list + (
+        make_option('--date',
+                    help='The date or date range to process. Use the format '
+                         'YYYY-MM-DD for a single date or '
+                         'YYYY-MM-DD:YYYY-MM-DD to process a range of dates '
+                         '(inclusive).'),
+    )
+    help = HELP
+
+    def handle(self, *args, **kw):
+        dates = kw['date']
+        if dates:
+            try:
+                dates = [datetime.strptime(d, '%Y-%m-%d').date()
+                         for d in dates.split(':')]
+            except ValueError:
+                raise CommandError('Invalid date: %s' % kw['date'])
+            start, end = dates[0], dates[-1]
+        else:
+            start = end = datetime.now().date() - timedelta(days=1)
+
+        day = start
+        while day <= end:
+            for model, kind in ((DownloadCount, 'downloads'),
+                                (UpdateCount, 'updates')):
+                update_rollups(kind, day, model.objects.filter(date=day))
+            day += timedelta(days=1)
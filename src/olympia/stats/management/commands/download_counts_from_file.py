@@ -1,4 +1,3 @@
-import codecs
 from datetime import datetime, timedelta
 from optparse import make_option
 from os import path, unlink
@@ -10,10 +9,13 @@ import commonware.log
 
 from olympia.addons.models import Addon
 from olympia.files.models import File
+from olympia.stats.rollups import update_rollups
 from olympia.stats.models import update_inc, DownloadCount
 from olympia.zadmin.models import DownloadSource
 
-from . import get_date_from_file, save_stats_to_file
+from . import (
+    ADIAggregate, aggregate_files, bulk_create_stats, get_date_from_file,
+    save_stats_to_file)
 
 
 log = commonware.log.getLogger('adi.downloadcountsfromfile')
@@ -61,8 +63,13 @@ class Command(BaseCommand):
                     dest='date', help='Date in the YYYY-MM-DD format.'),
         make_option('--separator', action='store', type='string', default='\t',
                     dest='separator', help='Field separator in file.'),
+        make_option('--jobs', action='store', type='int', default=1,
+                    dest='jobs', help='Number of processes to parse the '
+                                      'file with.'),
     )
 
+    fields = ('sources',)
+
     def handle(self, *args, **options):
         start = datetime.now()  # Measure the time it takes to run the script.
         day = options['date']
@@ -80,90 +87,91 @@ class Command(BaseCommand):
         # or it would just increment again the same data.
         DownloadCount.objects.filter(date=day).delete()
 
-        # Memoize the files to addon relations and the DownloadCounts.
-        download_counts = {}
         # Perf: preload all the files and slugs once and for all.
         # This builds two dicts:
         # - One where each key (the file_id we get from the hive query) has
         #   the addon_id as value.
         # - One where each key (the add-on slug) has the add-on_id as value.
-        files_to_addon = dict(File.objects.values_list('id',
-                                                       'version__addon_id'))
-        slugs_to_addon = dict(Addon.objects.public().values_list('slug', 'id'))
+        # And a set of the add-on ids, for the rows using those instead.
+        self.files_to_addon = dict(File.objects.values_list(
+            'id', 'version__addon_id'))
+        self.addons = set(self.files_to_addon.values())
+        self.slugs_to_addon = dict(
+            Addon.objects.public().values_list('slug', 'id'))
 
         # Only accept valid sources, which are listed in the DownloadSource
         # model. The source must either be exactly one of the "full" valid
         # sources, or prefixed by one of the "prefix" valid sources.
-        fulls = set(DownloadSource.objects.filter(type='full').values_list(
-            'name', flat=True))
-        prefixes = DownloadSource.objects.filter(type='prefix').values_list(
-            'name', flat=True)
-
-        with codecs.open(filepath, encoding='utf8') as count_file:
-            for index, line in enumerate(count_file):
-                if index and (index % 1000000) == 0:
-                    log.info('Processed %s lines' % index)
-
-                splitted = line[:-1].split(sep)
-
-                if len(splitted) != 4:
-                    log.debug('Badly formatted row: %s' % line)
-                    continue
-
-                day, counter, id_or_slug, src = splitted
-                try:
-                    # Clean up data.
-                    id_or_slug = id_or_slug.strip()
-                    counter = int(counter)
-                except ValueError:
-                    # Ignore completely invalid data.
-                    continue
-
-                if id_or_slug.strip().isdigit():
-                    # If it's a digit, then it should be a file id.
-                    try:
-                        id_or_slug = int(id_or_slug)
-                    except ValueError:
-                        continue
-
-                    # Does this file exist?
-                    if id_or_slug in files_to_addon:
-                        addon_id = files_to_addon[id_or_slug]
-                    # Maybe it's an add-on ?
-                    elif id_or_slug in files_to_addon.values():
-                        addon_id = id_or_slug
-                    else:
-                        # It's an integer we don't recognize, ignore the row.
-                        continue
-                else:
-                    # It's probably a slug.
-                    if id_or_slug in slugs_to_addon:
-                        addon_id = slugs_to_addon[id_or_slug]
-                    else:
-                        # We've exhausted all possibilities, ignore this row.
-                        continue
-
-                if not is_valid_source(src, fulls=fulls, prefixes=prefixes):
-                    continue
-
-                # Memoize the DownloadCount.
-                if addon_id in download_counts:
-                    dc = download_counts[addon_id]
-                else:
-                    dc = DownloadCount(date=day, addon_id=addon_id, count=0)
-                    download_counts[addon_id] = dc
-
-                # We can now fill the DownloadCount object.
-                dc.count += counter
-                dc.sources = update_inc(dc.sources, src, counter)
+        self.fulls = set(DownloadSource.objects.filter(
+            type='full').values_list('name', flat=True))
+        self.prefixes = list(DownloadSource.objects.filter(
+            type='prefix').values_list('name', flat=True))
+
+        download_counts = aggregate_files(self, [(None, filepath)], sep,
+                                          jobs=options['jobs'])
+        download_counts = [aggregate.to_model(DownloadCount, day)
+                           for aggregate in download_counts.values()]
 
         # Create in bulk: this is much faster.
-        DownloadCount.objects.bulk_create(download_counts.values(), 100)
-        for download_count in download_counts.values():
+        bulk_create_stats(DownloadCount, download_counts)
+        for download_count in download_counts:
             save_stats_to_file(download_count)
-        log.info('Processed a total of %s lines' % (index + 1))
+        update_rollups('downloads', day, download_counts)
         log.debug('Total processing time: %s' % (datetime.now() - start))
 
         # Clean up file.
         log.debug('Deleting {path}'.format(path=filepath))
         unlink(filepath)
+
+    def process_line(self, group, splitted, download_counts):
+        """Add the counts of a line to `download_counts`."""
+        if len(splitted) != 4:
+            log.debug('Badly formatted row: %s' % '\t'.join(splitted))
+            return
+
+        day, counter, id_or_slug, src = splitted
+        try:
+            # Clean up data.
+            id_or_slug = id_or_slug.strip()
+            counter = int(counter)
+        except ValueError:
+            # Ignore completely invalid data.
+            return
+
+        if id_or_slug.isdigit():
+            # If it's a digit, then it should be a file id.
+            try:
+                id_or_slug = int(id_or_slug)
+            except ValueError:
+                return
+
+            # Does this file exist?
+            if id_or_slug in self.files_to_addon:
+                addon_id = self.files_to_addon[id_or_slug]
+            # Maybe it's an add-on ?
+            elif id_or_slug in self.addons:
+                addon_id = id_or_slug
+            else:
+                # It's an integer we don't recognize, ignore the row.
+                return
+        else:
+            # It's probably a slug.
+            if id_or_slug in self.slugs_to_addon:
+                addon_id = self.slugs_to_addon[id_or_slug]
+            else:
+                # We've exhausted all possibilities, ignore this row.
+                return
+
+        if not is_valid_source(src, fulls=self.fulls, prefixes=self.prefixes):
+            return
+
+        # Memoize the counters of this add-on.
+        if addon_id in download_counts:
+            dc = download_counts[addon_id]
+        else:
+            dc = ADIAggregate(addon_id, fields=self.fields)
+            download_counts[addon_id] = dc
+
+        # We can now fill the counters.
+        dc.count += counter
+        dc.sources = update_inc(dc.sources, src, counter)
@@ -1,4 +1,3 @@
-import codecs
 from datetime import datetime, timedelta
 from optparse import make_option
 from os import path, unlink
@@ -12,7 +11,9 @@ from olympia import amo
 from olympia.addons.models import Addon, Persona
 from olympia.stats.models import ThemeUpdateCount
 
-from . import get_date_from_file, save_stats_to_file
+from . import (
+    ADIAggregate, aggregate_files, bulk_create_stats, get_date_from_file,
+    save_stats_to_file)
 
 
 log = commonware.log.getLogger('adi.themeupdatecount')
@@ -45,6 +46,9 @@ class Command(BaseCommand):
                     dest='date', help='Date in the YYYY-MM-DD format.'),
         make_option('--separator', action='store', type='string', default='\t',
                     dest='separator', help='Field separator in file.'),
+        make_option('--jobs', action='store', type='int', default=1,
+                    dest='jobs', help='Number of processes to parse the '
+                                      'file with.'),
     )
 
     def handle(self, *args, **options):
@@ -64,68 +68,65 @@ class Command(BaseCommand):
         # or it would just increment again the same data.
         ThemeUpdateCount.objects.filter(date=day).delete()
 
-        theme_update_counts = {}
-
         # Preload a set containing the ids of all the persona Add-on objects
         # that we care about. When looping, if we find an id that is not in
         # that set, we'll reject it.
-        addons = set(Addon.objects.filter(type=amo.ADDON_PERSONA,
-                                          status=amo.STATUS_PUBLIC,
-                                          persona__isnull=False)
-                                  .values_list('id', flat=True))
+        self.addons = set(Addon.objects.filter(type=amo.ADDON_PERSONA,
+                                               status=amo.STATUS_PUBLIC,
+                                               persona__isnull=False)
+                                       .values_list('id', flat=True))
         # Preload all the Personas once and for all. This builds a dict where
         # each key (the persona_id we get from the hive query) has the addon_id
         # as value.
-        persona_to_addon = dict(Persona.objects.values_list('persona_id',
-                                                            'addon_id'))
-
-        with codecs.open(filepath, encoding='utf8') as count_file:
-            for index, line in enumerate(count_file):
-                if index and (index % 1000000) == 0:
-                    log.info('Processed %s lines' % index)
-
-                splitted = line[:-1].split(sep)
-
-                if len(splitted) != 4:
-                    log.debug('Badly formatted row: %s' % line)
-                    continue
-
-                day, id_, src, count = splitted
-                try:
-                    id_, count = int(id_), int(count)
-                except ValueError:  # Badly formatted? Drop.
-                    continue
+        self.persona_to_addon = dict(Persona.objects.values_list('persona_id',
+                                                                 'addon_id'))
 
-                if src:
-                    src = src.strip()
-
-                # If src is 'gp', it's an old request for the persona id.
-                if id_ not in persona_to_addon and src == 'gp':
-                    continue  # No such persona.
-                addon_id = persona_to_addon[id_] if src == 'gp' else id_
-
-                # Does this addon exist?
-                if addon_id not in addons:
-                    continue
-
-                # Memoize the ThemeUpdateCount.
-                if addon_id in theme_update_counts:
-                    tuc = theme_update_counts[addon_id]
-                else:
-                    tuc = ThemeUpdateCount(addon_id=addon_id, date=day,
-                                           count=0)
-                    theme_update_counts[addon_id] = tuc
-
-                # We can now fill the ThemeUpdateCount object.
-                tuc.count += count
+        theme_update_counts = aggregate_files(self, [(None, filepath)], sep,
+                                              jobs=options['jobs'])
+        theme_update_counts = [
+            aggregate.to_model(ThemeUpdateCount, day)
+            for aggregate in theme_update_counts.values()]
 
         # Create in bulk: this is much faster.
-        ThemeUpdateCount.objects.bulk_create(theme_update_counts.values(), 100)
-        for theme_update_count in theme_update_counts.values():
+        bulk_create_stats(ThemeUpdateCount, theme_update_counts)
+        for theme_update_count in theme_update_counts:
             save_stats_to_file(theme_update_count)
-        log.info('Processed a total of %s lines' % (index + 1))
         log.debug('Total processing time: %s' % (datetime.now() - start))
 
         # Clean up file.
         log.debug('Deleting {path}'.format(path=filepath))
         unlink(filepath)
+
+    def process_line(self, group, splitted, theme_update_counts):
+        """Add the counts of a line to `theme_update_counts`."""
+        if len(splitted) != 4:
+            log.debug('Badly formatted row: %s' % '\t'.join(splitted))
+            return
+
+        day, id_, src, count = splitted
+        try:
+            id_, count = int(id_), int(count)
+        except ValueError:  # Badly formatted? Drop.
+            return
+
+        if src:
+            src = src.strip()
+
+        # If src is 'gp', it's an old request for the persona id.
+        if id_ not in self.persona_to_addon and src == 'gp':
+            return  # No such persona.
+        addon_id = self.persona_to_addon[id_] if src == 'gp' else id_
+
+        # Does this addon exist?
+        if addon_id not in self.addons:
+            return
+
+        # Memoize the counters of this add-on.
+        if addon_id in theme_update_counts:
+            tuc = theme_update_counts[addon_id]
+        else:
+            tuc = ADIAggregate(addon_id)
+            theme_update_counts[addon_id] = tuc
+
+        # We can now fill the counters.
+        tuc.count += count
@@ -1,5 +1,3 @@
-import codecs
-import json
 import re
 from datetime import datetime, timedelta
 from optparse import make_option
@@ -12,9 +10,12 @@ import commonware.log
 
 from olympia import amo
 from olympia.addons.models import Addon
+from olympia.stats.rollups import update_rollups
 from olympia.stats.models import update_inc, UpdateCount
 
-from . import get_date_from_file, save_stats_to_file
+from . import (
+    ADIAggregate, aggregate_files, bulk_create_stats, get_date_from_file,
+    save_stats_to_file, trim_field)
 
 
 log = commonware.log.getLogger('adi.updatecountsfromfile')
@@ -69,8 +70,13 @@ class Command(BaseCommand):
                     dest='date', help='Date in the YYYY-MM-DD format.'),
         make_option('--separator', action='store', type='string', default='\t',
                     dest='separator', help='Field separator in file.'),
+        make_option('--jobs', action='store', type='int', default=1,
+                    dest='jobs', help='Number of processes to parse the '
+                                      'files with.'),
     )
 
+    fields = ('versions', 'statuses', 'applications', 'oses', 'locales')
+
     def handle(self, *args, **options):
         start = datetime.now()  # Measure the time it takes to run the script.
         day = options['date']
@@ -92,94 +98,16 @@ class Command(BaseCommand):
         # or it would just increment again the same data.
         UpdateCount.objects.filter(date=day).delete()
 
-        # Memoize the addons and the UpdateCounts.
-        update_counts = {}
         # Perf: preload all the addons once and for all.
         # This builds a dict where each key (the addon guid we get from the
         # hive query) has the addon_id as value.
-        guids_to_addon = (dict(Addon.objects.public()
-                                            .exclude(guid__isnull=True)
-                                            .exclude(type=amo.ADDON_PERSONA)
-                                            .values_list('guid', 'id')))
-
-        index = -1
-        for group, filepath in group_filepaths:
-            with codecs.open(filepath, encoding='utf8') as results_file:
-                for line in results_file:
-                    index += 1
-                    if index and (index % 1000000) == 0:
-                        log.info('Processed %s lines' % index)
-
-                    splitted = line[:-1].split(sep)
-
-                    if ((group == 'app' and len(splitted) != 6) or
-                            (group != 'app' and len(splitted) != 5)):
-                        log.debug('Badly formatted row: %s' % line)
-                        continue
-
-                    if group == 'app':
-                        day, addon_guid, app_id, app_ver, count, \
-                            update_type = splitted
-                    else:
-                        day, addon_guid, data, count, update_type = splitted
-
-                    addon_guid = addon_guid.strip()
-                    if update_type:
-                        update_type.strip()
-
-                    # Old versions of Firefox don't provide the update type.
-                    # All the following are "empty-like" values.
-                    if update_type in ['0', 'NULL', 'None', '', '\N',
-                                       '%UPDATE_TYPE%']:
-                        update_type = None
-
-                    try:
-                        count = int(count)
-                        if update_type:
-                            update_type = int(update_type)
-                    except ValueError:  # Badly formatted? Drop.
-                        continue
-
-                    # The following is magic that I don't understand. I've just
-                    # been told that this is the way we can make sure a request
-                    # is valid:
-                    # > the lower bits for updateType (eg 112) should add to
-                    # > 16, if not, ignore the request.
-                    # > udpateType & 31 == 16 == valid request.
-                    if update_type and update_type & 31 != 16:
-                        log.debug("Update type doesn't add to 16: %s" %
-                                  update_type)
-                        continue
-
-                    # Does this addon exist?
-                    if addon_guid and addon_guid in guids_to_addon:
-                        addon_id = guids_to_addon[addon_guid]
-                    else:
-                        log.debug(u"Addon {guid} doesn't exist."
-                                  .format(guid=addon_guid.strip()))
-                        continue
-
-                    # Memoize the UpdateCount.
-                    if addon_guid in update_counts:
-                        uc = update_counts[addon_guid]
-                    else:
-                        uc = UpdateCount(date=day, addon_id=addon_id, count=0)
-                        update_counts[addon_guid] = uc
-
-                    # We can now fill the UpdateCount object.
-                    if group == 'version':
-                        self.update_version(uc, data, count)
-                        # Use this count to compute the global number of daily
-                        # users for this addon.
-                        uc.count += count
-                    elif group == 'status':
-                        self.update_status(uc, data, count)
-                    elif group == 'app':
-                        self.update_app(uc, app_id, app_ver, count)
-                    elif group == 'os':
-                        self.update_os(uc, data, count)
-                    elif group == 'locale':
-                        self.update_locale(uc, data, count)
+        self.guids_to_addon = dict(
+            Addon.objects.public().exclude(guid__isnull=True)
+                                  .exclude(type=amo.ADDON_PERSONA)
+                                  .values_list('guid', 'id'))
+
+        update_counts = aggregate_files(self, group_filepaths, sep,
+                                        jobs=options['jobs'])
 
         # Make sure the locales and versions fields aren't too big to fit in
         # the database. Those two fields are the only ones that are not fully
@@ -191,15 +119,17 @@ class Command(BaseCommand):
         # The database field (TEXT), can hold up to 2^16 = 64k characters.
         # If the field is longer than that, we we drop the least used items
         # (with the lower count) until the field fits.
-        for addon_guid, update_count in update_counts.iteritems():
+        update_counts = [aggregate.to_model(UpdateCount, day)
+                         for aggregate in update_counts.values()]
+        for update_count in update_counts:
             self.trim_field(update_count.locales)
             self.trim_field(update_count.versions)
 
         # Create in bulk: this is much faster.
-        UpdateCount.objects.bulk_create(update_counts.values(), 100)
-        for udate_count in update_counts.values():
+        bulk_create_stats(UpdateCount, update_counts)
+        for update_count in update_counts:
             save_stats_to_file(update_count)
-        log.info('Processed a total of %s lines' % (index + 1))
+        update_rollups('updates', day, update_counts)
         log.debug('Total processing time: %s' % (datetime.now() - start))
 
         # Clean up files.
@@ -207,6 +137,73 @@ class Command(BaseCommand):
             log.debug('Deleting {path}'.format(path=filepath))
             unlink(filepath)
 
+    def process_line(self, group, splitted, update_counts):
+        """Add the counts of a line of the `group` file to `update_counts`."""
+        if ((group == 'app' and len(splitted) != 6) or
+                (group != 'app' and len(splitted) != 5)):
+            log.debug('Badly formatted row: %s' % '\t'.join(splitted))
+            return
+
+        if group == 'app':
+            day, addon_guid, app_id, app_ver, count, update_type = splitted
+        else:
+            day, addon_guid, data, count, update_type = splitted
+
+        addon_guid = addon_guid.strip()
+        if update_type:
+            update_type.strip()
+
+        # Old versions of Firefox don't provide the update type.
+        # All the following are "empty-like" values.
+        if update_type in ['0', 'NULL', 'None', '', '\N', '%UPDATE_TYPE%']:
+            update_type = None
+
+        try:
+            count = int(count)
+            if update_type:
+                update_type = int(update_type)
+        except ValueError:  # Badly formatted? Drop.
+            return
+
+        # The following is magic that I don't understand. I've just been told
+        # that this is the way we can make sure a request is valid:
+        # > the lower bits for updateType (eg 112) should add to 16, if not,
+        # > ignore the request.
+        # > udpateType & 31 == 16 == valid request.
+        if update_type and update_type & 31 != 16:
+            log.debug("Update type doesn't add to 16: %s" % update_type)
+            return
+
+        # Does this addon exist?
+        if addon_guid and addon_guid in self.guids_to_addon:
+            addon_id = self.guids_to_addon[addon_guid]
+        else:
+            log.debug(u"Addon {guid} doesn't exist."
+                      .format(guid=addon_guid.strip()))
+            return
+
+        # Memoize the counters of this add-on.
+        if addon_id in update_counts:
+            uc = update_counts[addon_id]
+        else:
+            uc = ADIAggregate(addon_id, fields=self.fields)
+            update_counts[addon_id] = uc
+
+        # We can now fill the counters.
+        if group == 'version':
+            self.update_version(uc, data, count)
+            # Use this count to compute the global number of daily users for
+            # this addon.
+            uc.count += count
+        elif group == 'status':
+            self.update_status(uc, data, count)
+        elif group == 'app':
+            self.update_app(uc, app_id, app_ver, count)
+        elif group == 'os':
+            self.update_os(uc, data, count)
+        elif group == 'locale':
+            self.update_locale(uc, data, count)
+
     def update_version(self, update_count, version, count):
         """Update the versions on the update_count with the given version."""
         version = version[:32]  # Limit the version to a (random) length.
@@ -258,20 +255,5 @@ class Command(BaseCommand):
                                               count)
 
     def trim_field(self, field):
-        """Trim (in-place) the dict provided, keeping the most used items.
-
-        The "locales" and "versions" fields are dicts which have the locale
-        or version as the key, and the count as the value.
-
-        """
-        def fits(field):
-            """Does the json version of the field fits in the db TEXT field?"""
-            return len(json.dumps(field)) < (2 ** 16)  # Max len of TEXT field.
-
-        if fits(field):
-            return
-        # Order by count (desc), for a dict like {'<locale>': <count>}.
-        values = list(reversed(sorted(field.items(), key=lambda v: v[1])))
-        while not fits(field):
-            key, count = values.pop()  # Remove the least used (the last).
-            del field[key]  # Remove this entry from the dict.
+        """Trim (in-place) the dict provided, keeping the most used items."""
+        trim_field(field)
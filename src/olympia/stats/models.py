@@ -25,6 +25,23 @@ def update_inc(initial, key, count):
     return initial
 
 
+def merge_counts(initial, counts, sign=1):
+    """Add (or subtract, with `sign=-1`) the possibly nested dict of `int`
+    counters `counts` to `initial`. Subtracted counters reaching zero are
+    removed."""
+    initial = initial or {}
+    for key, value in (counts or {}).iteritems():
+        if isinstance(value, dict):
+            value = merge_counts(initial.get(key), value, sign)
+        else:
+            value = initial.get(key, 0) + sign * value
+        if value or sign > 0:
+            initial[key] = value
+        else:
+            initial.pop(key, None)
+    return initial
+
+
 class AddonCollectionCount(models.Model):
     addon = models.ForeignKey('addons.Addon')
     collection = models.ForeignKey('bandwagon.Collection')
@@ -84,6 +101,33 @@ class UpdateCount(StatsSearchMixin, models.Model):
         db_table = 'update_counts'
 
 
+class StatsRollup(models.Model):
+    """
+    Day, week and month totals of the download or update counts of an
+    add-on, with breakdowns normalized the way the dashboards render them.
+
+    Weeks start on Sundays and months on the 1st, like the dashboard's own
+    grouping. `days` is the number of daily counts summed into the row, to
+    compute averages of the update counts.
+    """
+    addon = models.ForeignKey('addons.Addon')
+    kind = models.CharField(max_length=16)  # 'downloads' or 'updates'.
+    period = models.CharField(max_length=5)  # 'day', 'week' or 'month'.
+    start = models.DateField()
+    days = models.PositiveIntegerField(default=0)
+    count = models.PositiveIntegerField(default=0)
+    sources = LargeStatsDictField(null=True)
+    versions = LargeStatsDictField(null=True)
+    status = LargeStatsDictField(null=True)
+    apps = LargeStatsDictField(null=True)
+    os = LargeStatsDictField(null=True)
+    locales = LargeStatsDictField(null=True)
+
+    class Meta:
+        db_table = 'stats_rollups'
+        unique_together = ('addon', 'kind', 'period', 'start')
+
+
 class ThemeUpdateCountManager(models.Manager):
 
     def get_range_days_avg(self, start, end, *extra_fields):
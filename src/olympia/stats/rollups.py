@@ -0,0 +1,149 @@
+"""
+Day, week and month rollups of the daily download and update counts.
+
+The rollups are filled incrementally by the `*_counts_from_file` commands as
+each day is ingested, so that the stats dashboards read the handful of rows
+they render instead of merging up to a year of daily documents.
+"""
+import datetime
+
+from django.db import transaction
+
+import commonware.log
+
+from olympia.stats.models import (
+    DownloadCount, StatsRollup, UpdateCount, merge_counts)
+from olympia.stats.search import update_count_breakdowns
+
+
+log = commonware.log.getLogger('z.stats.rollups')
+
+ROLLUP_KINDS = {DownloadCount: 'downloads', UpdateCount: 'updates'}
+ROLLUP_PERIODS = ('day', 'week', 'month')
+ROLLUP_FIELDS = ('sources', 'versions', 'status', 'apps', 'os', 'locales')
+
+# Number of add-ons whose rollups are updated per query.
+CHUNK_SIZE = 1000
+
+
+def period_start(period, day):
+    """The first day of the `period` containing `day`."""
+    if period == 'week':
+        # Weeks start on Sundays, like in the dashboards.
+        return day - datetime.timedelta(days=(day.weekday() + 1) % 7)
+    elif period == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def period_end(period, start):
+    """The last day of the `period` starting on `start`."""
+    if period == 'week':
+        return start + datetime.timedelta(days=6)
+    elif period == 'month':
+        next_month = (start.replace(day=28) + datetime.timedelta(days=4))
+        return next_month.replace(day=1) - datetime.timedelta(days=1)
+    return start
+
+
+def rollup_fields(obj):
+    """The breakdowns of a DownloadCount or UpdateCount, by rollup field."""
+    if isinstance(obj, DownloadCount):
+        return {'sources': obj.sources}
+    return update_count_breakdowns(obj)
+
+
+def add_to_rollup(rollup, entry, sign=1):
+    """Add (or subtract) an entry of (count, fields) to a StatsRollup."""
+    if entry is None:
+        return
+    count, fields = entry
+    rollup.days += sign
+    rollup.count += sign * count
+    for name in ROLLUP_FIELDS:
+        if fields.get(name):
+            counts = merge_counts(getattr(rollup, name), fields[name], sign)
+            setattr(rollup, name, counts or None)
+
+
+@transaction.atomic
+def update_rollups(kind, day, counts):
+    """
+    Store the daily `counts` (DownloadCount or UpdateCount objects of `day`)
+    as day rollups and add them to the week and month rollups.
+
+    The rollups previously stored for that day are subtracted first, so that
+    ingesting a day again doesn't count it twice.
+    """
+    if isinstance(day, basestring):
+        day = datetime.datetime.strptime(day, '%Y-%m-%d').date()
+    new = dict((obj.addon_id, (obj.count, rollup_fields(obj)))
+               for obj in counts)
+    old = {}
+    for rollup in StatsRollup.objects.filter(kind=kind, period='day',
+                                             start=day):
+        old[rollup.addon_id] = (rollup.count, dict(
+            (name, getattr(rollup, name)) for name in ROLLUP_FIELDS))
+
+    addon_ids = sorted(set(new) | set(old))
+    for i in range(0, len(addon_ids), CHUNK_SIZE):
+        chunk = addon_ids[i:i + CHUNK_SIZE]
+        rollups = []
+        for period in ROLLUP_PERIODS:
+            start = period_start(period, day)
+            qs = StatsRollup.objects.filter(kind=kind, period=period,
+                                            start=start, addon__in=chunk)
+            existing = dict((rollup.addon_id, rollup) for rollup in qs)
+            for addon_id in chunk:
+                rollup = existing.get(addon_id)
+                if rollup is None or period == 'day':
+                    # Day rollups are simply replaced.
+                    rollup = StatsRollup(addon_id=addon_id, kind=kind,
+                                         period=period, start=start)
+                else:
+                    rollup.pk = None
+                    add_to_rollup(rollup, old.get(addon_id), sign=-1)
+                add_to_rollup(rollup, new.get(addon_id))
+                if rollup.days > 0:
+                    rollups.append(rollup)
+            qs.delete()
+        StatsRollup.objects.bulk_create(rollups)
+    log.info('Updated the %s rollups of %s add-ons for %s' % (
+        kind, len(addon_ids), day))
+
+
+def get_series(kind, group, addon_id, date_range, field=None, mean=False):
+    """
+    Get a generator of dicts for the rollups of an add-on, like
+    `stats.views.get_series`: one per `group` ('day', 'week' or 'month')
+    overlapping the `date_range`, most recent first.
+
+    With `mean`, the count and breakdowns are averaged over the number of
+    days of the period instead of summed.
+    """
+    start, end = date_range
+    fields = ['start', 'days', 'count']
+    if field:
+        fields.append(field)
+    qs = (StatsRollup.objects.filter(kind=kind, period=group,
+                                     addon=addon_id,
+                                     start__range=(period_start(group, start),
+                                                   end))
+                             .only(*fields).order_by('-start'))
+    for rollup in qs[:365]:
+        rv = {'count': rollup.count, 'date': rollup.start,
+              'end': period_end(group, rollup.start)}
+        if field:
+            rv['data'] = getattr(rollup, field) or {}
+        if mean and rollup.days > 1:
+            rv['count'] = average(rv['count'], rollup.days)
+            if field:
+                rv['data'] = average(rv['data'], rollup.days)
+        yield rv
+
+
+def average(counts, days):
+    if isinstance(counts, dict):
+        return dict((key, average(value, days))
+                    for key, value in counts.iteritems())
+    return int(round(float(counts) / days))
@@ -41,17 +41,13 @@ def es_dict(items):
 """
 
 
-def extract_update_count(update, all_apps=None):
-    doc = {'addon': update.addon_id,
-           'date': update.date,
-           'count': update.count,
-           'id': update.id,
-           '_id': '{0}-{1}'.format(update.addon_id, update.date),
-           'versions': es_dict(update.versions),
-           'os': [],
-           'locales': [],
-           'apps': [],
-           'status': []}
+def update_count_breakdowns(update):
+    """
+    The normalized breakdowns of an UpdateCount, as plain dicts keyed like
+    the ES documents. Fields that are empty on the UpdateCount are None.
+    """
+    rv = dict.fromkeys(['versions', 'os', 'locales', 'apps', 'status'])
+    rv['versions'] = update.versions
 
     # Only count platforms we know about.
     if update.oses:
@@ -65,8 +61,8 @@ def extract_update_count(update, all_apps=None):
                 platform = amo.PLATFORMS[key]
 
             if platform is not None:
-                os[platform.name] += count
-                doc['os'] = es_dict((unicode(k), v) for k, v in os.items())
+                os[unicode(platform.name)] += count
+        rv['os'] = dict(os)
 
     # Case-normalize locales.
     if update.locales:
@@ -76,7 +72,7 @@ def extract_update_count(update, all_apps=None):
                 locales[locale.lower()] += int(count)
             except ValueError:
                 pass
-        doc['locales'] = es_dict(locales)
+        rv['locales'] = dict(locales)
 
     # Only count app/version combos we know about.
     if update.applications:
@@ -90,11 +86,35 @@ def extract_update_count(update, all_apps=None):
                     apps[app.guid][version] = int(count)
                 except ValueError:
                     pass
-        doc['apps'] = dict((app, es_dict(vals)) for app, vals in apps.items())
+        rv['apps'] = dict(apps)
 
     if update.statuses:
-        doc['status'] = es_dict((k, v) for k, v in update.statuses.items()
-                                if k != 'null')
+        rv['status'] = dict((k, v) for k, v in update.statuses.items()
+                            if k != 'null')
+    return rv
+
+
+def extract_update_count(update, all_apps=None):
+    breakdowns = update_count_breakdowns(update)
+    doc = {'addon': update.addon_id,
+           'date': update.date,
+           'count': update.count,
+           'id': update.id,
+           '_id': '{0}-{1}'.format(update.addon_id, update.date),
+           'versions': es_dict(breakdowns['versions']),
+           'os': [],
+           'locales': [],
+           'apps': [],
+           'status': []}
+    if breakdowns['os']:
+        doc['os'] = es_dict(breakdowns['os'])
+    if breakdowns['locales'] is not None:
+        doc['locales'] = es_dict(breakdowns['locales'])
+    if breakdowns['apps'] is not None:
+        doc['apps'] = dict((app, es_dict(vals))
+                           for app, vals in breakdowns['apps'].items())
+    if breakdowns['status'] is not None:
+        doc['status'] = es_dict(breakdowns['status'])
     return doc
 
 
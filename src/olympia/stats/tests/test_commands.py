@@ -1,6 +1,7 @@
 import json
 import os
 import shutil
+import tempfile
 from datetime import date, timedelta
 
 import mock
@@ -11,7 +12,8 @@ from olympia import amo
 from olympia.amo.tests import addon_factory, TestCase
 from olympia.addons.models import Persona
 from olympia.stats.management.commands import (
-    save_stats_to_file, serialize_stats)
+    ADIAggregate, bulk_create_stats, read_lines, save_stats_to_file,
+    serialize_stats, split_files)
 from olympia.stats.management.commands.download_counts_from_file import is_valid_source  # noqa
 from olympia.stats.management.commands.update_counts_from_file import Command
 from olympia.stats.models import (
@@ -75,6 +77,21 @@ class TestADICommand(FixturesFolderMixin, TestCase):
         # save_stats_to_file is called with a non-saved model.
         assert isinstance(mock_save_stats_to_file.call_args[0][0], UpdateCount)
 
+    @mock.patch(
+        'olympia.stats.management.commands.update_counts_from_file.'
+        'save_stats_to_file')
+    def test_update_counts_from_file_jobs(self, mock_save_stats_to_file):
+        management.call_command('update_counts_from_file', hive_folder,
+                                date=self.date, jobs=2)
+        assert UpdateCount.objects.all().count() == 1
+        update_count = UpdateCount.objects.last()
+        assert update_count.count == 5
+        assert update_count.versions == {u'3.8': 2, u'3.7': 3}
+        assert update_count.statuses == {u'userEnabled': 5}
+        assert update_count.oses == {u'WINNT': 5}
+        assert update_count.locales == {u'en-us': 1, u'en-US': 4}
+        assert mock_save_stats_to_file.call_count == 1
+
     def test_update_version(self):
         # Initialize the known addons and their versions.
         self.command.addons_versions = {3615: ['3.5', '3.6']}
@@ -172,6 +189,16 @@ class TestADICommand(FixturesFolderMixin, TestCase):
         # Fits in the database, so no truncation.
         assert len(json.dumps(uc.versions)) == (2 ** 16) - 1
 
+    def test_trim_field_json_size(self):
+        versions = dict((u'\xe9' * i, i) for i in range(1, 300))
+        self.command.trim_field(versions)
+        assert len(json.dumps(versions)) < 2 ** 16
+        versions[u'\xe9' * 300] = 300
+        self.command.trim_field(versions)
+        # Exactly the least used entries were removed.
+        assert len(json.dumps(versions)) < 2 ** 16
+        assert min(versions.values()) == 301 - len(versions)
+
     @mock.patch(
         'olympia.stats.management.commands.download_counts_from_file.'
         'save_stats_to_file')
@@ -252,6 +279,36 @@ class TestADICommand(FixturesFolderMixin, TestCase):
         # We round the results to cope with floating point imprecision.
         assert round(p2.movers, 5) == round((300.0 - 1700) / 1700, 5)
 
+    def test_split_files(self):
+        lines = [u'%s\t\xe9\n' % ('x' * i) for i in range(50)]
+        with tempfile.NamedTemporaryFile() as hive_file:
+            hive_file.write(u''.join(lines).encode('utf8'))
+            hive_file.flush()
+            for parts in (1, 2, 3, 7, 1000):
+                ranges = split_files([('group', hive_file.name)], parts)
+                assert len(ranges) == parts
+                read = []
+                for file_ranges in ranges:
+                    for group, path, start, end in file_ranges:
+                        assert group == 'group'
+                        read.extend(read_lines(path, start, end))
+                # Every line is read once, by exactly one of the workers.
+                assert read == lines
+
+    @mock.patch('olympia.stats.management.commands.INSERT_MAX_ROWS', 2)
+    def test_bulk_create_stats(self):
+        counts = []
+        for day in range(1, 6):
+            aggregate = ADIAggregate(3615, fields=('sources',))
+            aggregate.count = day
+            aggregate.sources = {'search': day}
+            counts.append(
+                aggregate.to_model(DownloadCount, '2014-07-%02d' % day))
+        with self.assertNumQueries(3):
+            assert bulk_create_stats(DownloadCount, counts) == 5
+        counts = DownloadCount.objects.values_list('count', flat=True)
+        assert sorted(counts) == [1, 2, 3, 4, 5]
+
     def test_is_valid_source(self):
         assert is_valid_source('foo',
                                fulls=['foo', 'bar'],
@@ -0,0 +1,80 @@
+from datetime import date
+
+from olympia.amo.tests import TestCase
+from olympia.stats import rollups
+from olympia.stats.models import DownloadCount, StatsRollup, UpdateCount
+
+
+class TestRollups(TestCase):
+    fixtures = ['stats/test_views.json', 'stats/test_models.json']
+
+    def get_rollup(self, kind, period, start):
+        return StatsRollup.objects.get(addon=4, kind=kind, period=period,
+                                       start=start)
+
+    def test_period_bounds(self):
+        day = date(2009, 6, 3)  # A Wednesday.
+        assert rollups.period_start('day', day) == day
+        assert rollups.period_start('week', day) == date(2009, 5, 31)
+        assert rollups.period_start('week', date(2009, 5, 31)) == date(
+            2009, 5, 31)
+        assert rollups.period_start('month', day) == date(2009, 6, 1)
+        assert rollups.period_end('week', date(2009, 5, 31)) == date(
+            2009, 6, 6)
+        assert rollups.period_end('month', date(2009, 2, 1)) == date(
+            2009, 2, 28)
+        assert rollups.period_end('month', date(2009, 12, 1)) == date(
+            2009, 12, 31)
+
+    def test_update_rollups(self):
+        for day in ('2009-06-01', '2009-06-02'):
+            rollups.update_rollups('updates', day,
+                                   UpdateCount.objects.filter(date=day))
+        week = self.get_rollup('updates', 'week', date(2009, 5, 31))
+        assert week.days == 2
+        assert week.count == 2500
+        assert week.os == {'Linux': 700, 'Windows': 900}
+        assert week.locales == {'en-us': 600, 'el': 800}
+        day = self.get_rollup('updates', 'day', date(2009, 6, 2))
+        assert day.count == 1500
+        assert day.versions == {'1.0': 550, '2.0': 950}
+
+    def test_update_rollups_again(self):
+        rollups.update_rollups(
+            'downloads', '2009-06-01',
+            DownloadCount.objects.filter(date='2009-06-01'))
+        # Ingesting a day again replaces its counts in the rollups.
+        DownloadCount.objects.filter(date='2009-06-01').update(count=15)
+        rollups.update_rollups(
+            'downloads', '2009-06-01',
+            DownloadCount.objects.filter(date='2009-06-01'))
+        month = self.get_rollup('downloads', 'month', date(2009, 6, 1))
+        assert month.days == 1
+        assert month.count == 15
+        assert month.sources == {'search': 3, 'api': 2}
+
+        # And without any counts, the rollups of that day are removed.
+        rollups.update_rollups('downloads', '2009-06-01', [])
+        assert not StatsRollup.objects.filter(addon=4).exists()
+
+    def test_get_series(self):
+        for day in ('2009-06-01', '2009-06-02'):
+            rollups.update_rollups('updates', day,
+                                   UpdateCount.objects.filter(date=day))
+        date_range = (date(2009, 6, 1), date(2009, 6, 30))
+        assert list(rollups.get_series('updates', 'day', 4, date_range,
+                                       field='os')) == [
+            {'count': 1500, 'date': date(2009, 6, 2),
+             'end': date(2009, 6, 2),
+             'data': {'Linux': 400, 'Windows': 500}},
+            {'count': 1000, 'date': date(2009, 6, 1),
+             'end': date(2009, 6, 1),
+             'data': {'Linux': 300, 'Windows': 400}},
+        ]
+        # Averaged over the days of the week.
+        assert list(rollups.get_series('updates', 'week', 4, date_range,
+                                       field='os', mean=True)) == [
+            {'count': 1250, 'date': date(2009, 5, 31),
+             'end': date(2009, 6, 6),
+             'data': {'Linux': 350, 'Windows': 450}},
+        ]
@@ -5,8 +5,10 @@ import os
 import shutil
 import json
 
+from django.core import management
 from django.http import Http404
 from django.test.client import RequestFactory
+from django.test.utils import override_settings
 
 import mock
 from pyquery import PyQuery as pq
@@ -714,6 +716,68 @@ class TestResponses(ESStatsTest):
 
 
 # Test the SQL query by using known dates, for weeks and months etc.
+@override_settings(STATS_ROLLUPS=True)
+class TestRollupResponses(StatsTest):
+
+    def setUp(self):
+        super(TestRollupResponses, self).setUp()
+        management.call_command('build_stats_rollups',
+                                date='2009-06-01:2009-09-30')
+
+    def test_downloads_json(self):
+        r = self.get_view_response('stats.downloads_series', group='day',
+                                   format='json')
+        assert r.status_code == 200
+        assert [row['date'] for row in json.loads(r.content)] == [
+            '2009-09-03', '2009-08-03', '2009-07-03', '2009-06-28',
+            '2009-06-20', '2009-06-12', '2009-06-07', '2009-06-01']
+
+    def test_downloads_by_month_json(self):
+        # The rows stay daily, the dashboards group them themselves.
+        r = self.get_view_response('stats.downloads_series', group='month',
+                                   format='json')
+        assert r.status_code == 200
+        assert json.loads(r.content)[:2] == [
+            {"count": 10, "date": "2009-09-03", "end": "2009-09-03"},
+            {"count": 10, "date": "2009-08-03", "end": "2009-08-03"},
+        ]
+
+    def test_sources_by_week_json(self):
+        r = self.get_view_response('stats.sources_series', group='week',
+                                   format='json')
+        assert r.status_code == 200
+        assert json.loads(r.content)[-2:] == [
+            {"count": 10, "date": "2009-06-07", "end": "2009-06-07",
+             "data": {"search": 3, "api": 2}},
+            {"count": 10, "date": "2009-06-01", "end": "2009-06-01",
+             "data": {"search": 3, "api": 2}},
+        ]
+
+    def test_usage_by_os_json(self):
+        r = self.get_view_response('stats.os_series', group='day',
+                                   format='json')
+        assert r.status_code == 200
+        self.assertListEqual(json.loads(r.content), [
+            {"count": 1500, "date": "2009-06-02", "end": "2009-06-02",
+             "data": {"Linux": 400, "Windows": 500}},
+            {"count": 1000, "date": "2009-06-01", "end": "2009-06-01",
+             "data": {"Linux": 300, "Windows": 400}},
+        ])
+
+    def test_usage_by_app_by_week_json(self):
+        r = self.get_view_response('stats.apps_series', group='week',
+                                   format='json')
+        assert r.status_code == 200
+        self.assertListEqual(json.loads(r.content), [
+            {"count": 1500, "date": "2009-06-02", "end": "2009-06-02",
+             "data": {
+                 "{ec8030f7-c20a-464f-9b0e-13a3a9e97384}": {"4.0": 1500}}},
+            {"count": 1000, "date": "2009-06-01", "end": "2009-06-01",
+             "data": {
+                 "{ec8030f7-c20a-464f-9b0e-13a3a9e97384}": {"4.0": 1000}}},
+        ])
+
+
 class TestSiteQuery(TestCase):
 
     def setUp(self):
@@ -40,6 +40,7 @@ from olympia.bandwagon.views import get_collection
 from olympia.stats.forms import DateForm
 from olympia.zadmin.models import SiteEvent
 
+from . import rollups
 from .models import (
     CollectionCount, Contribution, DownloadCount, ThemeUserCount, UpdateCount)
 
@@ -96,6 +97,20 @@ def get_series(model, extra_field=None, source=None, **filters):
         yield rv
 
 
+def get_addon_series(model, addon, date_range, source=None):
+    """
+    get_series() for the daily counts of an add-on, read from the day
+    rollups when `settings.STATS_ROLLUPS` is enabled. The series stay daily
+    either way, the dashboards group them by week or month themselves.
+    Theme user counts have no rollups and always come from ES.
+    """
+    if settings.STATS_ROLLUPS and model in rollups.ROLLUP_KINDS:
+        return rollups.get_series(rollups.ROLLUP_KINDS[model], 'day',
+                                  addon.id, date_range, field=source)
+    return get_series(model, source=source, addon=addon.id,
+                      date__range=date_range)
+
+
 def csv_fields(series):
     """
     Figure out all the keys in the `data` dict for csv columns.
@@ -161,8 +176,8 @@ def overview_series(request, addon, group, start, end, format):
     date_range = check_series_params_or_404(group, start, end, format)
     check_stats_permission(request, addon)
 
-    dls = get_series(DownloadCount, addon=addon.id, date__range=date_range)
-    updates = get_series(UpdateCount, addon=addon.id, date__range=date_range)
+    dls = get_addon_series(DownloadCount, addon, date_range)
+    updates = get_addon_series(UpdateCount, addon, date_range)
 
     series = zip_overview(dls, updates)
 
@@ -207,7 +222,7 @@ def downloads_series(request, addon, group, start, end, format):
     date_range = check_series_params_or_404(group, start, end, format)
     check_stats_permission(request, addon)
 
-    series = get_series(DownloadCount, addon=addon.id, date__range=date_range)
+    series = get_addon_series(DownloadCount, addon, date_range)
 
     if format == 'csv':
         return render_csv(request, addon, series, ['date', 'count'])
@@ -222,8 +237,8 @@ def sources_series(request, addon, group, start, end, format):
     date_range = check_series_params_or_404(group, start, end, format)
     check_stats_permission(request, addon)
 
-    series = get_series(DownloadCount, source='sources',
-                        addon=addon.id, date__range=date_range)
+    series = get_addon_series(DownloadCount, addon, date_range,
+                              source='sources')
 
     if format == 'csv':
         series, fields = csv_fields(series)
@@ -240,9 +255,9 @@ def usage_series(request, addon, group, start, end, format):
     date_range = check_series_params_or_404(group, start, end, format)
     check_stats_permission(request, addon)
 
-    series = get_series(
+    series = get_addon_series(
         ThemeUserCount if addon.type == amo.ADDON_PERSONA else UpdateCount,
-        addon=addon.id, date__range=date_range)
+        addon, date_range)
 
     if format == 'csv':
         return render_csv(request, addon, series, ['date', 'count'])
@@ -265,8 +280,8 @@ def usage_breakdown_series(request, addon, group,
         'versions': 'versions',
         'statuses': 'status',
     }
-    series = get_series(UpdateCount, source=fields[field],
-                        addon=addon.id, date__range=date_range)
+    series = get_addon_series(UpdateCount, addon, date_range,
+                              source=fields[field])
     if field == 'locales':
         series = process_locales(series)
 
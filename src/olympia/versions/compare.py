@@ -1,9 +1,14 @@
 import re
+import threading
+from collections import OrderedDict
 
 from django.utils.encoding import force_bytes
 
 MAXVERSION = 2 ** 63 - 1
 
+# Number of version strings whose version_int is kept in memory.
+VERSION_INT_CACHE_SIZE = 20000
+
 version_re = re.compile(r"""(?P<major>\d+|\*)      # major (x in x.y)
                             \.?(?P<minor1>\d+|\*)? # minor1 (y in x.y)
                             \.?(?P<minor2>\d+|\*)? # minor2 (z in x.y.z)
@@ -59,17 +64,88 @@ def version_dict(version):
     return d
 
 
+def version_tuple(version):
+    """
+    Turn a version string into the (major, minor1, minor2, minor3, alpha,
+    alpha_ver, pre, pre_ver) tuple of integers packed by `version_int`.
+
+    Tuples compare like the versions they represent, even when a part is too
+    large to fit in its slot of the version_int.
+    """
+    match = version_re.match(force_bytes(version) or '')
+    if match is None:
+        return (0, 0, 0, 0, 2, 0, 1, 0)
+    (major, minor1, minor2, minor3, alpha, alpha_ver, pre,
+     pre_ver) = match.groups()
+    return (_number(major), _number(minor1), _number(minor2),
+            _number(minor3), _ALPHAS.get(alpha, 2), _number(alpha_ver),
+            0 if pre else 1, _number(pre_ver))
+
+
+_ALPHAS = {'a': 0, 'b': 1}
+
+
+def _number(value):
+    if not value:
+        return 0
+    return 99 if value == '*' else int(value)
+
+
+def _version_int(version):
+    (major, minor1, minor2, minor3, alpha, alpha_ver, pre,
+     pre_ver) = version_tuple(version)
+    if minor1 < 100 and minor2 < 100 and minor3 < 100 and alpha_ver < 100:
+        # Every part fits in its slot: pack them without going through a
+        # string, e.g. 3.5.0a1pre2 is 3 05 00 00 0 01 0 02.
+        value = (major * 10 ** 12 + minor1 * 10 ** 10 + minor2 * 10 ** 8 +
+                 minor3 * 10 ** 6 + alpha * 10 ** 5 + alpha_ver * 10 ** 3 +
+                 pre * 10 ** 2 + pre_ver)
+    else:
+        value = int("%d%02d%02d%02d%d%02d%d%02d" % (
+            major, minor1, minor2, minor3, alpha, alpha_ver, pre, pre_ver))
+    return min(value, MAXVERSION)
+
+
+_version_int_cache = OrderedDict()
+_version_int_lock = threading.Lock()
+
+
 def version_int(version):
-    d = version_dict(force_bytes(version))
-    for key in ['alpha_ver', 'major', 'minor1', 'minor2', 'minor3',
-                'pre_ver']:
-        if not d[key]:
-            d[key] = 0
-    atrans = {'a': 0, 'b': 1}
-    d['alpha'] = atrans.get(d['alpha'], 2)
-    d['pre'] = 0 if d['pre'] else 1
-
-    v = "%d%02d%02d%02d%d%02d%d%02d" % (
-        d['major'], d['minor1'], d['minor2'], d['minor3'], d['alpha'],
-        d['alpha_ver'], d['pre'], d['pre_ver'])
-    return min(int(v), MAXVERSION)
+    """
+    Turn a version string into an integer that compares like the version.
+
+    Results for strings are kept in a bounded LRU cache, since the same
+    handful of application and add-on versions are converted over and over.
+    """
+    if not isinstance(version, basestring):
+        return _version_int(version)
+    with _version_int_lock:
+        value = _version_int_cache.pop(version, None)
+        if value is not None:
+            # Re-insert to mark it as the most recently used.
+            _version_int_cache[version] = value
+            return value
+    value = _version_int(version)
+    with _version_int_lock:
+        _version_int_cache[version] = value
+        if len(_version_int_cache) > VERSION_INT_CACHE_SIZE:
+            _version_int_cache.popitem(last=False)
+    return value
+
+
+def version_ints(versions):
+    """
+    Return the `version_int` of every version in `versions`, converting each
+    distinct version only once.
+    """
+    seen = {}
+    results = []
+    for version in versions:
+        key = version if isinstance(version, basestring) else (
+            type(version), version)
+        try:
+            value = seen[key]
+        except KeyError:
+            value = seen[key] = version_int(version)
+        results.append(value)
+    return results
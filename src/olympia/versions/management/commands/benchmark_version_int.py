@@ -0,0 +1,72 @@
+import random
+import timeit
+from optparse import make_option
+
+from django.core.management.base import BaseCommand
+from django.utils.encoding import force_bytes
+
+from olympia.applications.models import AppVersion
+from olympia.versions import compare
+from olympia.versions.models import Version
+
+
+HELP = """\
+Time version_int over a corpus of add-on and application version strings
+taken from the database, shuffled and repeated like update pings would.
+
+    `./manage.py benchmark_version_int --limit=10000 --repeat=5`
+"""
+
+
+def legacy_version_int(version):
+    """version_int as it was before the fast path, for comparison."""
+    d = compare.version_dict(force_bytes(version))
+    for key in ['alpha_ver', 'major', 'minor1', 'minor2', 'minor3',
+                'pre_ver']:
+        if not d[key]:
+            d[key] = 0
+    d['alpha'] = {'a': 0, 'b': 1}.get(d['alpha'], 2)
+    d['pre'] = 0 if d['pre'] else 1
+    v = "%d%02d%02d%02d%d%02d%d%02d" % (
+        d['major'], d['minor1'], d['minor2'], d['minor3'], d['alpha'],
+        d['alpha_ver'], d['pre'], d['pre_ver'])
+    return min(int(v), compare.MAXVERSION)
+
+
+class Command(BaseCommand):
+    option_list = BaseCommand.option_list + (
+        make_option('--limit', type='int', default=10000,
+                    help='Number of add-on versions to load.'),
+        make_option('--repeat', type='int', default=5,
+                    help='Number of timed passes over the corpus.'),
+    )
+    help = HELP
+
+    def handle(self, *args, **kw):
+        versions = list(Version.unfiltered.values_list('version', flat=True)
+                        .order_by('-id')[:kw['limit']])
+        app_versions = list(AppVersion.objects.values_list('version',
+                                                           flat=True))
+        # Application versions dominate real traffic: weigh them like the
+        # update service sees them.
+        corpus = versions + app_versions * max(
+            1, len(versions) // max(len(app_versions), 1))
+        random.Random(0).shuffle(corpus)
+
+        mismatches = sum(1 for version in corpus
+                         if compare.version_int(version) !=
+                         legacy_version_int(version))
+        self.stdout.write('%d strings (%d distinct), %d mismatches' % (
+            len(corpus), len(set(corpus)), mismatches))
+
+        timings = [
+            ('legacy', lambda: [legacy_version_int(v) for v in corpus]),
+            ('uncached', lambda: [compare._version_int(v) for v in corpus]),
+            ('cached', lambda: [compare.version_int(v) for v in corpus]),
+            ('batch', lambda: compare.version_ints(corpus)),
+            ('tuple', lambda: [compare.version_tuple(v) for v in corpus]),
+        ]
+        for name, func in timings:
+            best = min(timeit.repeat(func, number=1, repeat=kw['repeat']))
+            self.stdout.write('%-10s %10.3f us/version' % (
+                name, best * 10 ** 6 / max(len(corpus), 1)))
@@ -1,6 +1,7 @@
 # -*- coding: utf-8 -*-
 import hashlib
 import os
+import random
 
 from datetime import datetime, timedelta
 
@@ -9,6 +10,7 @@ from django.core.files.storage import default_storage as storage
 from django.core.files import temp
 from django.core.files.base import File as DjangoFile
 from django.test.utils import override_settings
+from django.utils.encoding import force_bytes
 
 import mock
 import pytest
@@ -34,8 +36,10 @@ from olympia.users.models import UserProfile
 from olympia.versions import feeds, views
 from olympia.versions.models import (
     Version, ApplicationsVersions, source_upload_path)
+from olympia.versions import compare
 from olympia.versions.compare import (
-    MAXVERSION, version_int, dict_from_int, version_dict)
+    MAXVERSION, version_int, version_ints, version_tuple, dict_from_int,
+    version_dict)
 
 
 pytestmark = pytest.mark.django_db
@@ -80,6 +84,72 @@ def test_version_int_unicode():
     assert version_int(u'\u2322 ugh stephend') == 200100
 
 
+def reference_version_int(version):
+    """The original, uncached version_int, built on version_dict."""
+    d = version_dict(force_bytes(version))
+    for key in ['alpha_ver', 'major', 'minor1', 'minor2', 'minor3',
+                'pre_ver']:
+        if not d[key]:
+            d[key] = 0
+    d['alpha'] = {'a': 0, 'b': 1}.get(d['alpha'], 2)
+    d['pre'] = 0 if d['pre'] else 1
+    v = "%d%02d%02d%02d%d%02d%d%02d" % (
+        d['major'], d['minor1'], d['minor2'], d['minor3'], d['alpha'],
+        d['alpha_ver'], d['pre'], d['pre_ver'])
+    return min(int(v), MAXVERSION)
+
+
+def random_versions(count, seed=42):
+    rand = random.Random(seed)
+    junk = '0123456789.*abpre|-+ x'
+    suffixes = ['', 'a', 'b', 'pre', 'a1', 'b2pre1', 'a123', 'pre3', 'x']
+    for i in range(count):
+        yield ''.join(rand.choice(junk)
+                      for j in range(rand.randint(0, 12)))
+        yield '.'.join(str(rand.randint(0, 150))
+                       for j in range(rand.randint(1, 5))) + (
+            rand.choice(suffixes))
+
+
+def test_version_int_matches_reference():
+    versions = ['', '0', '*', '3.6.*', '1.100', '1.2.3.400', '1.0a123',
+                '9999999', u'\u2322 ugh', None, 3, MAXVERSION + 1]
+    versions.extend(random_versions(5000))
+    for version in versions:
+        expected = reference_version_int(version)
+        # Twice, to go through the cache the second time.
+        assert version_int(version) == expected, version
+        assert version_int(version) == expected, version
+
+
+def test_version_ints():
+    versions = list(random_versions(500)) + [None, 3, u'3.0', '3.0']
+    assert version_ints(versions) == [
+        reference_version_int(version) for version in versions]
+    assert version_ints(iter(['1.0', '1.0'])) == [version_int('1.0')] * 2
+
+
+def test_version_tuple_compare():
+    assert version_tuple('3.6.*') == version_tuple('3.6.99')
+    assert version_tuple('3.6.*') > version_tuple('3.6.8')
+    assert version_tuple('3.0a1') < version_tuple('3.0b1')
+    assert version_tuple('3.0b1') < version_tuple('3.0')
+    assert version_tuple('3.0pre') < version_tuple('3.0')
+    # Parts too large for their version_int slot still compare correctly.
+    assert version_tuple('1.100') > version_tuple('1.99')
+    assert version_tuple('') == version_tuple('0')
+
+
+@mock.patch.object(compare, 'VERSION_INT_CACHE_SIZE', 2)
+def test_version_int_cache_bounded():
+    compare._version_int_cache.clear()
+    version_int('1.0')
+    version_int('2.0')
+    version_int('1.0')
+    version_int('3.0')
+    assert compare._version_int_cache.keys() == ['1.0', '3.0']
+
+
 def test_dict_from_int():
     d = dict_from_int(3050000001002)
     assert d['major'] == 3
@@ -5,7 +5,7 @@ import hashlib
 import caching
 
 from django.conf import settings
-from django.db import models
+from django.db import connection, models
 from django.db.models import F
 
 from olympia import amo
@@ -58,6 +58,13 @@ class ValidationJob(ModelBase):
     finish_email = models.EmailField(null=True, max_length=75)
     completed = models.DateTimeField(null=True, db_index=True)
     creator = models.ForeignKey('users.UserProfile', null=True)
+    # Counters of the results of the job, incremented by the validation
+    # tasks (see increment_stats()) and recounted when the job finishes.
+    total_count = models.PositiveIntegerField(default=0)
+    completed_count = models.PositiveIntegerField(default=0)
+    passing_count = models.PositiveIntegerField(default=0)
+    failing_count = models.PositiveIntegerField(default=0)
+    errors_count = models.PositiveIntegerField(default=0)
 
     def result_passing(self):
         return self.result_set.exclude(completed=None).filter(errors=0,
@@ -100,12 +107,45 @@ class ValidationJob(ModelBase):
             self._stats = self._count_stats()
         return self._stats
 
+    @classmethod
+    def increment_stats(cls, job_id, **counts):
+        """
+        Atomically add `counts` to the counters of a job, e.g.
+        `increment_stats(job_id, completed=1, passing=1)`.
+        """
+        cls.objects.filter(pk=job_id).update(**dict(
+            ('%s_count' % name, F('%s_count' % name) + count)
+            for name, count in counts.items()))
+
+    def reconcile_stats(self):
+        """
+        Recount the counters from the results of the job, in a single scan.
+
+        The counters are only incremented by the tasks, so this fixes them up
+        if a task was retried or died, e.g. once the job is finished.
+        """
+        sql = """SELECT COUNT(*),
+                        SUM(completed IS NOT NULL),
+                        SUM(completed IS NOT NULL AND errors = 0
+                            AND task_error IS NULL),
+                        SUM(completed IS NOT NULL AND errors > 0),
+                        SUM(task_error IS NOT NULL)
+                 FROM validation_result
+                 WHERE validation_job_id = %s"""
+        cursor = connection.cursor()
+        cursor.execute(sql, [self.pk])
+        counts = [int(count or 0) for count in cursor.fetchone()]
+        self.update(**dict(zip(
+            ('total_count', 'completed_count', 'passing_count',
+             'failing_count', 'errors_count'), counts)))
+        self.__dict__.pop('_stats', None)
+
     def _count_stats(self):
-        total = self.result_set.count()
-        completed = self.result_completed().count()
-        passing = self.result_passing().count()
-        errors = self.result_errors().count()
-        failing = self.result_failing().count()
+        total = self.total_count
+        completed = self.completed_count
+        passing = self.passing_count
+        errors = self.errors_count
+        failing = self.failing_count
         return {
             'job_id': self.pk,
             'total': total,
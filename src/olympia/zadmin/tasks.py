@@ -11,7 +11,6 @@ from urlparse import urljoin
 
 from django.conf import settings
 from django.core.exceptions import ObjectDoesNotExist
-from django.db import connection
 from django.db.models import Sum
 from django.template import Context, Template
 from django.utils import translation
@@ -54,17 +53,20 @@ def admin_email(all_recipients, subject, body, preview_only=False,
         send(subject, body, recipient_list=[recipient], from_email=from_email)
 
 
-def tally_job_results(job_id, **kw):
-    sql = """select sum(1),
-                    sum(case when completed IS NOT NULL then 1 else 0 end)
-             from validation_result
-             where validation_job_id=%s"""
-    cursor = connection.cursor()
-    cursor.execute(sql, [job_id])
-    total, completed = cursor.fetchone()
-    if completed == total:
+def tally_job_results(job_id, **counts):
+    """
+    Count a validated file in the counters of the job, along with `counts`
+    (e.g. `passing=1`), and finish the job once all its files are validated.
+    """
+    ValidationJob.increment_stats(job_id, completed=1, **counts)
+    job = ValidationJob.objects.no_cache().get(pk=job_id)
+    if job.completed_count < job.total_count:
+        return
+    # Every file looks validated: recount the results once to make sure that
+    # no retried task was counted twice.
+    job.reconcile_stats()
+    if job.completed_count == job.total_count:
         # The job has finished.
-        job = ValidationJob.objects.get(pk=job_id)
         job.update(completed=datetime.now())
         if job.finish_email:
             send_mail(u'Behold! Validation results for %s %s->%s'
@@ -100,7 +102,7 @@ def bulk_validate_file(result_id, **kw):
                      'targetapp_maxVersion': {guid: target.version}}
         validation = run_validator(res.file.file_path, for_appversions=ver,
                                    test_all_tiers=True, overrides=overrides,
-                                   compat=True)
+                                   compat=True, hash_=res.file.hash)
     except:
         task_error = sys.exc_info()
         log.exception(
@@ -115,7 +117,13 @@ def bulk_validate_file(result_id, **kw):
         log.info('[1@None] File %s (%s) errors=%s'
                  % (res.file, file_base, res.errors))
     res.save()
-    tally_job_results(res.validation_job.id)
+    if task_error:
+        outcome = 'errors'
+    elif res.errors:
+        outcome = 'failing'
+    else:
+        outcome = 'passing'
+    tally_job_results(res.validation_job_id, **{outcome: 1})
 
 
 @task
@@ -165,9 +173,14 @@ def add_validation_jobs(pks, job_pk, **kw):
 
         log.info('Adding %s files for validation for '
                  'addon: %s for job: %s' % (len(ids), addon.pk, job_pk))
-        for id in ids:
-            result = ValidationResult.objects.create(validation_job_id=job_pk,
-                                                     file_id=id)
+        results = [ValidationResult.objects.create(validation_job_id=job_pk,
+                                                   file_id=id)
+                   for id in ids]
+        # Count the files of the add-on before validating any of them, so
+        # that the job doesn't look finished after the first one.
+        if results:
+            ValidationJob.increment_stats(job_pk, total=len(results))
+        for result in results:
             bulk_validate_file.delay(result.pk)
 
 
@@ -171,7 +171,9 @@ class BulkValidationTest(TestCase):
                   valid=0,
                   completed=datetime.now())
         kw.update(kwargs)
-        return ValidationResult.objects.create(**kw)
+        result = ValidationResult.objects.create(**kw)
+        job.reconcile_stats()
+        return result
 
     def start_validation(self, new_max='3.7a3'):
         self.new_max = self.appversion(new_max)
@@ -857,6 +859,57 @@ class TestBulkValidationTask(BulkValidationTest):
             % (self.curr_max.version, self.new_max.version))
         assert mail.outbox[0].to == ['fliggy@mozilla.com']
 
+    @mock.patch('olympia.zadmin.tasks.run_validator')
+    def test_counters(self, run_validator):
+        run_validator.return_value = json.dumps({
+            'errors': 0, 'warnings': 0, 'notices': 0, 'messages': [],
+            'compatibility_summary': {
+                'errors': 0, 'warnings': 0, 'notices': 0},
+            'metadata': {}})
+        job = self.create_job(finish_email='fliggy@mozilla.com')
+        results = [self.create_result(job, self.create_file(), completed=None)
+                   for i in range(2)]
+        assert job.total_count == 2
+        assert job.completed_count == 0
+
+        tasks.bulk_validate_file(results[0].pk)
+        job = ValidationJob.objects.no_cache().get(pk=job.pk)
+        assert job.completed_count == 1
+        assert job.passing_count == 1
+        assert job.failing_count == 0
+        assert job.completed is None
+        assert len(mail.outbox) == 0
+
+        run_validator.side_effect = RuntimeError('validation error')
+        tasks.bulk_validate_file(results[1].pk)
+        job = ValidationJob.objects.no_cache().get(pk=job.pk)
+        assert job.stats['total'] == 2
+        assert job.stats['completed'] == 2
+        assert job.stats['passing'] == 1
+        assert job.stats['errors'] == 1
+        self.assertCloseToNow(job.completed)
+        assert len(mail.outbox) == 1
+
+    def test_tally_reconciles(self):
+        job = self.create_job()
+        self.create_result(job, self.create_file(), errors=1)
+        self.create_result(job, self.create_file(), completed=None)
+        # A retried task counted its file twice: the job looks finished.
+        tasks.tally_job_results(job.pk, failing=1)
+        job = ValidationJob.objects.no_cache().get(pk=job.pk)
+        assert job.completed_count == 1
+        assert job.failing_count == 1
+        assert job.completed is None
+
+    def test_stats_use_counters(self):
+        job = self.create_job()
+        self.create_result(job, self.create_file(), errors=1)
+        job = ValidationJob.objects.no_cache().get(pk=job.pk)
+        with self.assertNumQueries(0):
+            assert job.stats['total'] == 1
+            assert job.stats['failing'] == 1
+            assert job.stats['percent_complete'] == 100
+
     @mock.patch('validator.validate.validate')
     def test_validator_bulk_compat_flag(self, validate):
         try:
@@ -127,7 +127,9 @@ def application_versions_json(request):
 def validation(request, form=None):
     if not form:
         form = BulkValidationForm()
-    jobs = ValidationJob.objects.order_by('-created')
+    # The stats counters are incremented by the tasks without going through
+    # the cache, so don't read stale ones from it.
+    jobs = ValidationJob.objects.no_cache().order_by('-created')
     return render(request, 'zadmin/validation.html',
                   {'form': form,
                    'notify_form': NotifyForm(text='validation'),
@@ -183,7 +185,7 @@ def start_validation(request):
 @json_view
 def job_status(request):
     ids = json.loads(request.POST['job_ids'])
-    jobs = ValidationJob.objects.filter(pk__in=ids)
+    jobs = ValidationJob.objects.no_cache().filter(pk__in=ids)
     all_stats = {}
     for job in jobs:
         status = job.stats